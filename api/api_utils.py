@@ -1,25 +1,26 @@
-import shutil
-import tempfile
+import os
 import asyncio
-from typing import Tuple
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.document_loaders import (
-    CSVLoader,
-    UnstructuredExcelLoader,
-    PyMuPDFLoader,
-    Docx2txtLoader
-)
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_pinecone import PineconeVectorStore
+import logging
+from typing import Optional, Tuple
+from langchain_text_splitters import CharacterTextSplitter
 from dotenv import load_dotenv
+from api.registry import get_vectorstore, get_embedding, get_file_registry, get_bm25_store, invalidate_file
+from api.bm25 import BM25Builder
+from api.ingest import ingest_chunks, IngestStats
+from api.loaders import save_upload, iter_documents, iter_chunks
+from api.chunking import iter_tabular_chunks, TABULAR_TYPES
+from api.jobs import Job, JobCancelled, CANCELLED, DONE, get_job_manager
+from api.metrics import timer, timed_iter
 
 load_dotenv()
 
-INDEX_NAME = "csv-ai"
+logger = logging.getLogger(__name__)
+
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
-
-embedding = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# "rows" packs whole CSV/Excel rows under a repeated header; "characters"
+# runs them through the character splitter like other documents.
+TABULAR_CHUNKING = os.getenv("TABULAR_CHUNKING", "rows")
 
 text_splitter = CharacterTextSplitter(
     chunk_size=CHUNK_SIZE,
@@ -27,81 +28,183 @@ text_splitter = CharacterTextSplitter(
     add_start_index=True
 )
 
-async def load_split_store_document(file_obj, file_id: str) -> Tuple[PineconeVectorStore, object]:
+async def save_and_claim(file_obj, file_id: str) -> Tuple[str, Optional[str], str]:
+    """Save an upload and claim its fingerprint for ``file_id``.
+
+    Returns ``(file_id, temp_path, filename)``. If identical content is
+    already indexed (or being indexed), its file_id is returned and
+    ``temp_path`` is None; otherwise the caller owns the temp file and
+    hands it to ``ingest_file``.
+    """
     filename = getattr(file_obj, "filename", None)
     if not filename:
         raise ValueError("❌ Uploaded file has no valid filename.")
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=filename) as tmp:
-        shutil.copyfileobj(file_obj.file, tmp)
-        temp_file_path = tmp.name
-
-    loader = None
-    if filename.endswith(".csv"):
-        try:
-            loader = CSVLoader(file_path=temp_file_path, encoding="utf-8")
-            documents = loader.load()
-        except Exception:
-            loader = CSVLoader(file_path=temp_file_path, encoding="cp1252")
-            documents = loader.load()
-    elif filename.endswith((".xls", ".xlsx")):
-        loader = UnstructuredExcelLoader(file_path=temp_file_path)
-        documents = loader.load()
-    elif filename.endswith(".pdf"):
-        loader = PyMuPDFLoader(file_path=temp_file_path)
-        documents = loader.load()
-    elif filename.endswith(".docx"):
-        loader = Docx2txtLoader(file_path=temp_file_path)
-        documents = loader.load()
-    else:
-        raise ValueError(f"❌ Unsupported file type: {filename}")
-
-    chunks = text_splitter.split_documents(documents)
-    for chunk in chunks:
-        chunk.metadata["file_id"] = file_id
-
-    def _store():
-        vectorstore = PineconeVectorStore.from_documents(
-            documents=chunks,
-            embedding=embedding,
-            index_name=INDEX_NAME,
-        )
-        retriever = vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 5}
-        )
-        return vectorstore, retriever
-
-    return await asyncio.to_thread(_store)
+    temp_file_path, digest = await save_upload(file_obj, suffix=filename)
+    # A job abandoned by a dead worker must not be handed out below as the
+    # owner of this content.
+    await asyncio.to_thread(recover_abandoned_jobs)
+
+    # The loader depends on the extension, so it is part of the fingerprint.
+    fingerprint = f"{os.path.splitext(filename)[1].lower()}:{digest}"
+    try:
+        file_id, is_new = get_file_registry().claim(fingerprint, file_id)
+    except Exception:
+        os.remove(temp_file_path)
+        raise
+    if not is_new:
+        os.remove(temp_file_path)
+        return file_id, None, filename
+    return file_id, temp_file_path, filename
+
+
+def ingest_file(temp_file_path: str, filename: str, file_id: str, on_progress=None) -> IngestStats:
+    """Index a claimed temp file under ``file_id`` and remove it afterwards.
+
+    On failure the claim is dropped and any vectors that already landed are
+    deleted, so a retry starts clean.
+    """
+    report = on_progress or (lambda event, count: None)
+    try:
+        report("parsed", 0)
+        return _ingest_file(temp_file_path, filename, file_id, report)
+    except Exception:
+        _discard_file(file_id)
+        raise
+    finally:
+        os.remove(temp_file_path)
+
+
+def _discard_file(file_id: str):
+    # Drop the claim and whatever a failed ingest already wrote.
+    get_file_registry().forget(file_id)
+    try:
+        get_vectorstore().delete(filter={"file_id": file_id})
+    except Exception:
+        logger.warning("Could not remove partial vectors for %s", file_id, exc_info=True)
+    _delete_keyword_index(file_id)
+    invalidate_file(file_id)
+
+
+def recover_abandoned_jobs():
+    """Clean up after ingest jobs whose worker died: see JobManager.recover_abandoned."""
+    get_job_manager().recover_abandoned(lambda job: _discard_file(job.file_id))
+
+
+async def load_split_store_document(file_obj, file_id: str) -> Tuple[str, Optional[IngestStats]]:
+    """Index an upload under ``file_id`` before returning.
+
+    Returns the file_id the content is stored under and the ingest stats.
+    If identical content is already indexed, its file_id is returned with
+    ``None`` stats and nothing is re-ingested.
+    """
+    file_id, temp_file_path, filename = await save_and_claim(file_obj, file_id)
+    if temp_file_path is None:
+        return file_id, None
+
+    stats = []
+
+    def _run(job):
+        stats.append(ingest_file(temp_file_path, filename, file_id, job.progress))
+        return stats[-1].to_dict()
+
+    # Run as a job in this request so a delete of the file cancels it.
+    job = await asyncio.to_thread(get_job_manager().run, file_id, filename, _run)
+    if job.stage == CANCELLED:
+        raise JobCancelled(f"Ingestion of {filename} was cancelled")
+    if job.stage != DONE:
+        raise RuntimeError(job.error or f"Ingestion of {filename} failed")
+    return file_id, stats[0]
+
+
+async def submit_ingest_job(file_obj, file_id: str) -> Tuple[str, Optional[Job], bool]:
+    """Save an upload and queue its ingestion as a background job.
+
+    Returns ``(file_id, job, deduplicated)``. For identical content that was
+    already uploaded, ``job`` is the one still ingesting it, or None once it
+    is fully indexed.
+    """
+    file_id, temp_file_path, filename = await save_and_claim(file_obj, file_id)
+    jobs = get_job_manager()
+    if temp_file_path is None:
+        active = jobs.active_for_file(file_id)
+        return file_id, active[0] if active else None, True
+
+    def _run(job):
+        return ingest_file(temp_file_path, filename, file_id, job.progress).to_dict()
+
+    def _discard(job):
+        get_file_registry().forget(file_id)
+        os.remove(temp_file_path)
+
+    return file_id, jobs.submit(file_id, filename, _run, _discard), False
+
+
+def _ingest_file(temp_file_path: str, filename: str, file_id: str, report) -> IngestStats:
+    # Rows/pages are read, split and tagged lazily; ingest_chunks pulls them
+    # in batches, so the whole document never sits in memory at once.
+    pages = 0
+
+    def _counted():
+        nonlocal pages
+        for document in timed_iter("parse_seconds", iter_documents(temp_file_path, filename)):
+            pages += 1
+            report("parsed", 1)
+            yield document
+
+    def _chunks():
+        nonlocal pages
+        if TABULAR_CHUNKING == "rows" and filename.endswith(TABULAR_TYPES):
+            # Reading rows dominates packing them, so the whole stream counts as parsing.
+            for chunk in timed_iter("parse_seconds", iter_tabular_chunks(temp_file_path, filename)):
+                pages += chunk.metadata["rows"]
+                report("parsed", chunk.metadata["rows"])
+                yield chunk
+        else:
+            yield from timed_iter("split_seconds", iter_chunks(_counted(), text_splitter))
+
+    bm25_store = get_bm25_store()
+    keywords = BM25Builder() if bm25_store is not None else None
+
+    def _tagged():
+        for chunk in _chunks():
+            chunk.metadata["file_id"] = file_id
+            if keywords is not None:
+                keywords.add(chunk.page_content)
+            yield chunk
+
+    # Exclusive of the nested parse/split timers: tagging and BM25 postings.
+    tagged = timed_iter("keyword_index_seconds", _tagged())
+    stats = ingest_chunks(tagged, get_vectorstore(), get_embedding(), on_progress=report)
+    if keywords is not None:
+        with timer("keyword_index_seconds"):
+            bm25_store.save(file_id, keywords)
+    stats.pages = pages
+    stats.pages_per_sec = pages / stats.seconds if stats.seconds else 0.0
+    return stats
+
+
+def _delete_keyword_index(file_id: str):
+    store = get_bm25_store()
+    if store is not None:
+        store.delete(file_id)
 
 
 async def delete_doc_from_pinecone(file_id: str) -> bool:
     def _delete():
         try:
-            vectorstore = PineconeVectorStore(
-                index_name=INDEX_NAME, 
-                embedding=embedding
-            )
+            # Other uploads of the same content still point at these vectors.
+            remaining = get_file_registry().release(file_id)
+            if remaining is not None and remaining > 0:
+                return True
+            # Stop any ingestion still writing vectors for this file.
+            get_job_manager().cancel_file(file_id)
+            vectorstore = get_vectorstore()
             vectorstore.delete(filter={"file_id": file_id})
+            _delete_keyword_index(file_id)
+            invalidate_file(file_id)
             return True
         except Exception:
             return False
 
     return await asyncio.to_thread(_delete)
-
-
-async def load_retriever_by_file_id(file_id: str):
-    def _load():
-        vectorstore = PineconeVectorStore(
-            index_name=INDEX_NAME, 
-            embedding=embedding
-        )
-        retriever = vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"filter": {"file_id": file_id}, "k": 5}
-        )
-        return retriever
-
-    return await asyncio.to_thread(_load)
-
-
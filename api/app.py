@@ -1,106 +1,306 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from starlette.background import BackgroundTask
 import os
-from api.api_utils import load_split_store_document, delete_doc_from_pinecone, load_retriever_by_file_id
+import re
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from api.api_utils import load_split_store_document, submit_ingest_job, delete_doc_from_pinecone, recover_abandoned_jobs
+from api.jobs import get_job_manager
+from api.chat_service import retrieve_context, chat_chain, chat_inputs
+from api.registry import warm_up, is_ready, get_embedding_cache, get_summary_cache, get_query_cache
+from api.loaders import save_upload
+from api.parallel_loaders import shutdown_pool
 import uuid
-import tempfile
-from langchain_community.document_loaders import CSVLoader, UnstructuredExcelLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
-from langchain.chains import LLMChain
+from api.llm import get_llm
+from api.summarizer import summarize_file, stream_summary, summary_cache_key, SUMMARY_MODES
+from api.metrics import (
+    observe, record, timer, snapshot, counters, start_request, prometheus_text, start_metrics_export, stop_metrics_export
+)
+from api.request_profiler import RequestProfiler, wants_profile
 from pydantic import BaseModel
+from typing import List
 from dotenv import load_dotenv
-from langchain_pinecone import PineconeVectorStore
-from langchain_huggingface import HuggingFaceEmbeddings
-INDEX_NAME = "csv-ai"
 
 
 
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model and vector-store client in the background so
+    # the server starts accepting connections straight away; /ready reports
+    # when they are warm.
+    warm_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    # Jobs left unfinished by a previous run would otherwise keep their
+    # claims, and dedupe would hand out file_ids that have no vectors.
+    await asyncio.to_thread(recover_abandoned_jobs)
+    start_metrics_export()
+    yield
+    stop_metrics_export()
+    if not warm_task.done():
+        warm_task.cancel()
+    get_job_manager().shutdown()
+    shutdown_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def _route_name(request: Request) -> str:
+    # The route template ("/chat/{file_id}"), so ids don't become metric names.
+    route = request.scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return re.sub(r"[^a-z0-9]+", "_", path.lower()).strip("_") or "root"
+
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    # Stages timed while the request runs are reported in a Server-Timing
+    # header. For streaming endpoints that covers the work done before the
+    # first byte; the LLM stream itself is only in the histograms.
+    stages = start_request()
+    profiler = None
+    if wants_profile(request):
+        profiler = RequestProfiler()
+        profiler.start()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        total = time.perf_counter() - start
+        if profiler is not None:
+            profile_path = profiler.stop(_route_name(request))
+    observe(f"http_{request.method.lower()}_{_route_name(request)}_seconds", total)
+    timing = [f"{name.removesuffix('_seconds')};dur={seconds * 1000:.1f}" for name, seconds in stages.items()]
+    timing.append(f"total;dur={total * 1000:.1f}")
+    response.headers["Server-Timing"] = ", ".join(timing)
+    if profiler is not None:
+        response.headers["X-Profile-Path"] = profile_path
+    return response
 
 @app.get("/")
 def home():
     return {'message':'Welcome to the CSV-AI API !!!'}
 
 
+@app.get("/ready")
+def ready():
+    if not is_ready():
+        return JSONResponse(status_code=503, content={"ready": False})
+    return {"ready": True}
+
+
+@app.get("/embedding-cache")
+def embedding_cache_stats():
+    cache = get_embedding_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
 @app.get("/about")
 def about():
     return {'message':'CSV-AI is a tool where you can Interacting, Analyzing and Summarizing CSV Files'}
 
 
 @app.post("/summarize")        
-async def summarize(file:UploadFile=File(...), model_name:str=Form(...),api_key:str=Form(...)):
+async def summarize(file:UploadFile=File(...), model_name:str=Form(...),api_key:str=Form(...),mode:str=Form("profile")):
+    if mode not in SUMMARY_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(SUMMARY_MODES)}")
     try:
-        contents=await file.read()
-        with tempfile.NamedTemporaryFile(delete=False) as f:
-            f.write(contents)
-            temp_file_path=f.name
-        
+        temp_file_path, file_hash = await save_upload(file)
         try:
-            loader = CSVLoader(temp_file_path)
-            data =loader.load()
-        except:
-            loader = UnstructuredExcelLoader(temp_file_path)
-            data=loader.load()
-            
-            
-        os.remove(temp_file_path)
-        
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000,chunk_overlap=200)
-        texts=text_splitter.split_documents(data)
-        
-        llm = ChatGoogleGenerativeAI(model=model_name, google_api_key=api_key)
-        
-        
-        structured_summary_prompt = PromptTemplate.from_template("""
-        You are a helpful AI assistant. Summarize the following content in a **structured and detailed Markdown format**.
-
-        The summary should include:
-        - A high-level overview of the dataset
-        - Key statistics (means, counts, etc.)
-        - Notable trends or patterns
-        - Anomalies or issues
-        - Final conclusion
-
-        If possible, use:
-        - `###` headings for sections
-        - Bullet points
-        - Code blocks (```python) for examples
-        - Tables if relevant
-
-        --- Begin Dataset Content ---
-        {input}
-        --- End Dataset Content ---
-
-        Return only the structured summary.
-        """)
-        # chain = structured_summary_prompt | llm
-        
-        chain = LLMChain(llm=llm, prompt=structured_summary_prompt)
-        input_text = "\n".join([t.page_content for t in texts])
-        result = chain.run(input=input_text)
-        return JSONResponse(content={"summary": result})
+            cache = get_summary_cache()
+            cache_key = summary_cache_key(file_hash, model_name, mode)
+            if cache is not None:
+                cached = await asyncio.to_thread(cache.get, cache_key)
+                if cached is not None:
+                    return JSONResponse(content={**json.loads(cached), "cache": "hit"})
+
+            llm = get_llm(model_name, api_key)
+            with timer("summarize_seconds"):
+                result, timings = await summarize_file(temp_file_path, file.filename or "", llm, mode)
+        finally:
+            os.remove(temp_file_path)
+
+        content = {"summary": result, "timings": timings}
+        if cache is None:
+            return JSONResponse(content={**content, "cache": "disabled"})
+        await asyncio.to_thread(cache.set, cache_key, json.dumps(content).encode("utf-8"))
+        return JSONResponse(content={**content, "cache": "miss"})
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"{str(e)}") 
     
 
+def sse_event(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+def _remove_upload(path: str):
+    # Called by both the stream's finally and the response's background
+    # task; whichever runs second finds the file gone.
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@app.post("/summarize/stream")
+async def summarize_stream(file:UploadFile=File(...), model_name:str=Form(...),api_key:str=Form(...),mode:str=Form("profile")):
+    # Server-sent events: a "token" data event per chunk of the summary, then
+    # a "done" event with timings and cache status (or "error").
+    if mode not in SUMMARY_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(SUMMARY_MODES)}")
+    temp_file_path, file_hash = await save_upload(file)
+    filename = file.filename or ""
+
+    async def _events():
+        try:
+            cache = get_summary_cache()
+            cache_key = summary_cache_key(file_hash, model_name, mode)
+            if cache is not None:
+                cached = await asyncio.to_thread(cache.get, cache_key)
+                if cached is not None:
+                    content = json.loads(cached)
+                    yield sse_event({"token": content["summary"]})
+                    yield sse_event({"timings": content["timings"], "cache": "hit"}, event="done")
+                    return
+
+            start = time.perf_counter()
+            timings = {}
+            tokens = []
+            llm = get_llm(model_name, api_key)
+            async for token in stream_summary(temp_file_path, filename, llm, mode, timings):
+                if not tokens:
+                    observe("summarize_time_to_first_token_seconds", time.perf_counter() - start)
+                tokens.append(token)
+                yield sse_event({"token": token})
+            record("summarize_seconds", time.perf_counter() - start)
+
+            content = {"summary": "".join(tokens), "timings": timings}
+            if cache is not None:
+                await asyncio.to_thread(cache.set, cache_key, json.dumps(content).encode("utf-8"))
+            yield sse_event({"timings": timings, "cache": "miss" if cache is not None else "disabled"}, event="done")
+        except Exception as e:
+            yield sse_event({"detail": str(e)}, event="error")
+        finally:
+            _remove_upload(temp_file_path)
+
+    # The generator's finally does not run if the client goes away before
+    # the body starts streaming, so the response cleans up after itself too.
+    try:
+        return StreamingResponse(
+            _events(), media_type="text/event-stream",
+            background=BackgroundTask(_remove_upload, temp_file_path),
+        )
+    except BaseException:
+        _remove_upload(temp_file_path)
+        raise
+
+
+@app.get("/stats")
+def stats():
+    return {**snapshot(), "counters": counters()}
+
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/query-cache")
+def query_cache_stats():
+    cache = get_query_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+UPLOAD_TYPES = (".csv", ".xls", ".xlsx", ".pdf", ".docx")
+# Files ingested at the same time by /upload-docs.
+BULK_UPLOAD_CONCURRENCY = int(os.getenv("BULK_UPLOAD_CONCURRENCY", "4"))
+
+
+async def _upload_one(file: UploadFile) -> dict:
+    start = time.perf_counter()
+    file_id, stats = await load_split_store_document(file, str(uuid.uuid4()))
+    result = {"file_id": file_id, "deduplicated": stats is None, "seconds": time.perf_counter() - start}
+    if stats is not None:
+        result["stats"] = stats.to_dict()
+    return result
+
+
 @app.post("/upload-doc")
-async def upload_doc(file: UploadFile = File(...)):
-    if not file.filename.endswith((".csv", ".xls", ".xlsx", ".pdf", ".docx")):
+async def upload_doc(file: UploadFile = File(...), wait: bool = False):
+    if not file.filename.endswith(UPLOAD_TYPES):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload CSV / Excel / PDF / DOCX")
 
-    file_id = str(uuid.uuid4())
+    if not wait:
+        # Ingest in the background; poll /jobs/{job_id} for progress.
+        try:
+            file_id, job, deduplicated = await submit_ingest_job(file, str(uuid.uuid4()))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
+        if job is None:
+            return JSONResponse({"message": "✅ File already processed.", "file_id": file_id, "deduplicated": True})
+        return JSONResponse(status_code=202, content={
+            "message": "⏳ File accepted for processing.",
+            "file_id": file_id,
+            "job_id": job.id,
+            "deduplicated": deduplicated,
+        })
 
     try:
-        await load_split_store_document(file, file_id)
-        return JSONResponse({"message": "✅ File processed successfully.", "file_id": file_id})
+        result = await _upload_one(file)
+        if result["deduplicated"]:
+            return JSONResponse({"message": "✅ File already processed.", **result})
+        return JSONResponse({"message": "✅ File processed successfully.", **result})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File processing failed: {str(e)}")
 
+
+@app.post("/upload-docs")
+async def upload_docs(files: List[UploadFile] = File(...)):
+    invalid = [file.filename for file in files if not file.filename.endswith(UPLOAD_TYPES)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid file type: {', '.join(invalid)}. Please upload CSV / Excel / PDF / DOCX")
+
+    semaphore = asyncio.Semaphore(BULK_UPLOAD_CONCURRENCY)
+    start = time.perf_counter()
+
+    async def _bounded(file: UploadFile) -> dict:
+        async with semaphore:
+            try:
+                return {"filename": file.filename, **await _upload_one(file)}
+            except Exception as e:
+                return {"filename": file.filename, "error": f"File processing failed: {str(e)}"}
+
+    # One failing file does not abort the others; each reports its own result.
+    results = await asyncio.gather(*(_bounded(file) for file in files))
+    seconds = time.perf_counter() - start
+    pages = sum(result.get("stats", {}).get("pages", 0) for result in results)
+    return {
+        "files": results,
+        "seconds": seconds,
+        "pages": pages,
+        "pages_per_sec": pages / seconds if seconds else 0.0,
+        "failed": sum("error" in result for result in results),
+    }
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job.to_dict()
+
+
 @app.delete("/delete-doc/{file_id}")
 async def delete_doc(file_id: str):
     try:
@@ -120,21 +320,59 @@ class QueryInput(BaseModel):
 @app.post("/load-retriever/{file_id}")
 async def retrieve_chunks(file_id: str, body: QueryInput):
     try:
-        embedding = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-        vectorstore = PineconeVectorStore(index_name=INDEX_NAME, embedding=embedding)
+        return {"context": await retrieve_context(file_id, body.query, {})}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Retrieval failed: {str(e)}")
 
-        retriever = vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 5, "filter": {"file_id": file_id}}
-        )
 
-        docs = retriever.invoke(body.query)
+class ChatInput(BaseModel):
+    query: str
+    model_name: str
+    api_key: str
+    history: List[dict] = []
+    summary: str = ""
 
-        if not docs:
-            return {"context": ["No relevant information found in the document for your query."]}
 
-        chunks = [doc.page_content for doc in docs]
-        return {"context": chunks}
+@app.post("/chat/{file_id}")
+async def chat(file_id: str, body: ChatInput):
+    # Retrieval and generation in one request, so a chat turn is a single
+    # round trip from the UI.
+    timings = {}
+    try:
+        context = await retrieve_context(file_id, body.query, timings)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Retrieval failed: {str(e)}")
+    try:
+        chain = chat_chain(get_llm(body.model_name, body.api_key))
+        with timer("llm_seconds") as llm_timer:
+            answer = await chain.ainvoke(chat_inputs(body.query, body.history, context, body.summary))
+        timings["llm_seconds"] = llm_timer.seconds
+        return {"answer": answer, "context": context, "timings": timings}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"LLM error: {str(e)}")
 
+
+@app.post("/chat/{file_id}/stream")
+async def chat_stream(file_id: str, body: ChatInput):
+    timings = {}
+    try:
+        context = await retrieve_context(file_id, body.query, timings)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Retrieval failed: {str(e)}")
+
+    async def _events():
+        try:
+            start = time.perf_counter()
+            chain = chat_chain(get_llm(body.model_name, body.api_key))
+            async for token in chain.astream(chat_inputs(body.query, body.history, context, body.summary)):
+                if "first_token_seconds" not in timings:
+                    timings["first_token_seconds"] = time.perf_counter() - start
+                    observe("chat_time_to_first_token_seconds", timings["first_token_seconds"])
+                yield sse_event({"token": token})
+            timings["llm_seconds"] = time.perf_counter() - start
+            record("llm_seconds", timings["llm_seconds"])
+            yield sse_event({"timings": timings}, event="done")
+        except Exception as e:
+            yield sse_event({"detail": str(e)}, event="error")
+
+    return StreamingResponse(_events(), media_type="text/event-stream")
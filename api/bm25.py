@@ -0,0 +1,181 @@
+import os
+import re
+import json
+import math
+import zlib
+import shutil
+import hashlib
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Identifiers such as "SKU-1042", "a.b@c.com" or "2024-01-31" are kept whole
+# as well as split into their parts, so exact lookups match either way.
+_COMPOUND = re.compile(r"\w+(?:[-_./@:]\w+)+")
+_WORD = re.compile(r"\w+")
+
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    text = text.lower()
+    return _WORD.findall(text) + _COMPOUND.findall(text)
+
+
+class BM25Builder:
+    """Collects postings while chunks stream through ingestion."""
+
+    def __init__(self):
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.lengths = array("I")
+        self.texts: List[bytes] = []
+
+    def add(self, text: str):
+        doc = len(self.lengths)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            docs, tfs = self.postings.setdefault(term, (array("I"), array("H")))
+            docs.append(doc)
+            tfs.append(min(tf, 65535))
+        self.lengths.append(sum(counts.values()))
+        self.texts.append(zlib.compress(text.encode("utf-8")))
+
+    def save(self, path: str):
+        """Write the index to ``path`` (a directory), replacing any previous one."""
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+        terms = sorted(self.postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(self.postings[term][0])
+        doc_ids = np.empty(offsets[-1], dtype=np.uint32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        for i, term in enumerate(terms):
+            docs, counts = self.postings[term]
+            doc_ids[offsets[i]:offsets[i + 1]] = docs
+            tfs[offsets[i]:offsets[i + 1]] = counts
+
+        text_offsets = np.zeros(len(self.texts) + 1, dtype=np.int64)
+        with open(os.path.join(tmp_path, "texts.bin"), "wb") as f:
+            for i, blob in enumerate(self.texts):
+                f.write(blob)
+                text_offsets[i + 1] = text_offsets[i] + len(blob)
+
+        np.savez(
+            os.path.join(tmp_path, "postings.npz"),
+            offsets=offsets, doc_ids=doc_ids, tfs=tfs,
+            lengths=np.frombuffer(self.lengths, dtype=np.uint32), text_offsets=text_offsets,
+        )
+        with open(os.path.join(tmp_path, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+
+class BM25Index:
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "terms.json"), encoding="utf-8") as f:
+            self.term_ids = {term: i for i, term in enumerate(json.load(f))}
+        data = np.load(os.path.join(path, "postings.npz"))
+        self.offsets = data["offsets"]
+        self.doc_ids = data["doc_ids"]
+        self.tfs = data["tfs"]
+        self.lengths = data["lengths"].astype(np.float32)
+        self.text_offsets = data["text_offsets"]
+        self.avgdl = float(self.lengths.mean()) if len(self.lengths) else 0.0
+        self._texts_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Top ``k`` ``(doc, score)`` pairs by BM25."""
+        n = len(self.lengths)
+        if not n:
+            return []
+        scores = np.zeros(n, dtype=np.float32)
+        norm = K1 * (1 - B + B * self.lengths / self.avgdl)
+        for term in set(tokenize(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.tfs[start:end].astype(np.float32)
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tf * (K1 + 1) / (tf + norm[docs])
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        top = hits[np.argsort(-scores[hits])[:k]]
+        return [(int(doc), float(scores[doc])) for doc in top]
+
+    def text(self, doc: int) -> str:
+        start, end = self.text_offsets[doc], self.text_offsets[doc + 1]
+        with self._texts_lock, open(os.path.join(self.path, "texts.bin"), "rb") as f:
+            f.seek(start)
+            return zlib.decompress(f.read(end - start)).decode("utf-8")
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int, rrf_k: int = 60) -> List[str]:
+    """Fuse ranked lists of texts; each text scores sum(1 / (rrf_k + rank))."""
+    scores = {}
+    for ranking in rankings:
+        for rank, text in enumerate(ranking):
+            scores[text] = scores.get(text, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+class BM25Store:
+    """Per-file BM25 indexes under ``directory``; recently used ones stay loaded."""
+
+    def __init__(self, directory: str, max_loaded: int = 32):
+        self.directory = directory
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, file_id: str) -> str:
+        name = hashlib.sha256(file_id.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, name)
+
+    def save(self, file_id: str, builder: BM25Builder):
+        builder.save(self.path(file_id))
+        with self._lock:
+            self._loaded.pop(file_id, None)
+
+    def get(self, file_id: str) -> Optional[BM25Index]:
+        with self._lock:
+            index = self._loaded.get(file_id)
+            if index is not None:
+                self._loaded.move_to_end(file_id)
+                return index
+        path = self.path(file_id)
+        if not os.path.isdir(path):
+            return None
+        index = BM25Index(path)
+        with self._lock:
+            self._loaded[file_id] = index
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return index
+
+    def forget(self, file_id: str):
+        """Drop the loaded copy, e.g. after another process changed the index."""
+        with self._lock:
+            self._loaded.pop(file_id, None)
+
+    def forget_all(self):
+        with self._lock:
+            self._loaded.clear()
+
+    def delete(self, file_id: str):
+        self.forget(file_id)
+        shutil.rmtree(self.path(file_id), ignore_errors=True)
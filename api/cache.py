@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+
+class SQLiteCache:
+    """Small persistent key/value cache on SQLite.
+
+    Entries are evicted least-recently-used first once the stored values
+    exceed ``max_bytes``, and treated as missing after ``ttl`` seconds when a
+    TTL is given. Safe to share between threads, and between processes
+    using the same file: the stored size is read from the database inside
+    each write transaction rather than tracked per process.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl: Optional[float] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("BEGIN IMMEDIATE")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        # Total stored bytes, kept current by triggers so every process
+        # sharing the file sees the same number without summing the table.
+        self._conn.execute("CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO totals (id, size) SELECT 0, COALESCE(SUM(size), 0) FROM entries")
+        for name, event, change in (
+            ("entries_insert", "INSERT", "NEW.size"),
+            ("entries_delete", "DELETE", "-OLD.size"),
+            ("entries_resize", "UPDATE OF size", "NEW.size - OLD.size"),
+        ):
+            self._conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON entries"
+                f" BEGIN UPDATE totals SET size = size + {change} WHERE id = 0; END"
+            )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit.
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value, created FROM entries WHERE key IN ({','.join('?' * len(part))})",
+                    part
+                ).fetchall()
+                for key, value, created in rows:
+                    if self.ttl is None or now - created <= self.ttl:
+                        found[key] = value
+            if found:
+                self._conn.executemany(
+                    "UPDATE entries SET accessed = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key: str, value: bytes):
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, bytes]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two processes never
+            # evict against the same total.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # An upsert rather than INSERT OR REPLACE: REPLACE deletes
+                # without firing the delete trigger.
+                self._conn.executemany(
+                    "INSERT INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size,"
+                    " created = excluded.created, accessed = excluded.accessed",
+                    [(key, value, len(value), now, now) for key, value in items.items()]
+                )
+                self._evict()
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute("SELECT size FROM totals WHERE id = 0").fetchone()[0]
+
+    def _evict(self):
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+        size = self._stored_bytes()
+        while size > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed LIMIT 256"
+            ).fetchall()
+            if not rows:
+                break
+            for key, row_size in rows:
+                if size <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                size -= row_size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def _bytes(self) -> int:
+        with self._lock:
+            return self._stored_bytes()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+            "bytes": self._bytes(),
+            "max_bytes": self.max_bytes,
+        }
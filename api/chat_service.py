@@ -0,0 +1,97 @@
+import os
+import time
+import asyncio
+from typing import List
+
+from langchain_core.output_parsers import StrOutputParser
+
+from api.jobs import get_job_manager
+from api.metrics import record, increment, timer
+from api.prompts import chat_prompt
+from api.bm25 import reciprocal_rank_fusion
+from api.registry import get_embedding, get_vectorstore, get_query_cache, get_bm25_store, sync_invalidations
+
+RETRIEVAL_K = 5
+# With a keyword index, this many dense and this many BM25 candidates are
+# fused by reciprocal rank into the final RETRIEVAL_K.
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+
+NO_CONTEXT = "No relevant information found in the document for your query."
+
+
+def format_history(messages: List[dict]) -> str:
+    history_str = ""
+    for m in messages:
+        if m["role"] in ["user", "assistant"]:
+            prefix = "User" if m["role"] == "user" else "Assistant"
+            history_str += f"{prefix}: {m['content']}\n"
+    return history_str
+
+
+def _hybrid_search(file_id: str, query: str, vector, timings: dict) -> List[str]:
+    store = get_bm25_store()
+    keywords = store.get(file_id) if store is not None else None
+    k = HYBRID_CANDIDATES if keywords is not None else RETRIEVAL_K
+    with timer("vector_search_seconds"):
+        results = get_vectorstore().similarity_search_by_vector_with_score(vector, k=k, filter={"file_id": file_id})
+    dense = [doc.page_content for doc, _ in results]
+    if keywords is None:
+        # Still ingesting, or the index is disabled: dense search only.
+        return dense
+
+    with timer("bm25_search_seconds") as t:
+        sparse = [keywords.text(doc) for doc, _ in keywords.search(query, HYBRID_CANDIDATES)]
+    timings["bm25_seconds"] = t.seconds
+    return reciprocal_rank_fusion([dense, sparse], RETRIEVAL_K)
+
+
+def _search(file_id: str, query: str, timings: dict) -> List[str]:
+    # Other workers may have deleted or re-indexed files since the last query.
+    sync_invalidations()
+    cache = get_query_cache()
+    if cache is not None:
+        cached = cache.get_exact(file_id, query)
+        if cached is not None:
+            timings["retrieval_cache"] = "exact"
+            return cached
+
+    with timer("query_embed_seconds"):
+        vector = get_embedding().embed_query(query)
+    if cache is not None:
+        cached = cache.get_similar(file_id, vector)
+        if cached is not None:
+            timings["retrieval_cache"] = "semantic"
+            return cached
+
+    chunks = _hybrid_search(file_id, query, vector, timings)
+    timings["retrieval_cache"] = "miss"
+    # Results over a partial index would go stale as the rest lands.
+    if cache is not None and not get_job_manager().active_for_file(file_id):
+        cache.put(file_id, query, vector, chunks)
+    return chunks
+
+
+async def retrieve_context(file_id: str, query: str, timings: dict) -> List[str]:
+    start = time.perf_counter()
+    chunks = await asyncio.to_thread(_search, file_id, query, timings)
+    timings["retrieve_seconds"] = time.perf_counter() - start
+    increment(f"retrieval_cache_{timings['retrieval_cache']}")
+    record(f"retrieve_{timings['retrieval_cache']}_seconds", timings["retrieve_seconds"])
+    if not chunks:
+        return [NO_CONTEXT]
+    return chunks
+
+
+def chat_chain(llm):
+    return chat_prompt | llm | StrOutputParser()
+
+
+def chat_inputs(query: str, history: List[dict], context_chunks: List[str], summary: str = "") -> dict:
+    history_str = format_history(history)
+    if summary:
+        history_str = f"Summary of earlier conversation:\n{summary}\n\nRecent messages:\n{history_str}"
+    return {
+        "history": history_str,
+        "context": "\n\n".join(context_chunks),
+        "question": query
+    }
@@ -0,0 +1,94 @@
+import io
+import csv
+import os
+from typing import Iterable, Iterator, List, Tuple
+
+import pandas as pd
+from langchain_core.documents import Document
+
+from api.history import count_tokens
+from api.loaders import iter_csv_records
+from api.parallel_loaders import iter_excel_frames
+
+# Upper bound per chunk, header included. A single row that is larger on
+# its own still becomes one chunk rather than being cut mid-record.
+TABULAR_CHUNK_TOKENS = int(os.getenv("TABULAR_CHUNK_TOKENS", "300"))
+TABULAR_TYPES = (".csv", ".xls", ".xlsx")
+
+
+def _csv_line(values: Iterable) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(values)
+    return buffer.getvalue()
+
+
+def pack_rows(
+    header: List[str],
+    rows: Iterable[Tuple[int, list]],
+    metadata: dict,
+    max_tokens: int = TABULAR_CHUNK_TOKENS,
+) -> Iterator[Document]:
+    """Pack whole rows into chunks of at most ``max_tokens``, header first.
+
+    ``rows`` yields ``(row_number, values)``. Every chunk starts with the
+    header line, there is no overlap, and ``row_start``/``row_end``
+    (inclusive) record which rows it holds.
+    """
+    header_line = _csv_line(header)
+    header_tokens = count_tokens(header_line) + 1
+    lines = []
+    tokens = header_tokens
+    first = last = None
+
+    def _chunk():
+        return Document(
+            page_content="\n".join([header_line] + lines),
+            metadata={**metadata, "row_start": first, "row_end": last, "rows": len(lines)},
+        )
+
+    for number, values in rows:
+        line = _csv_line(values)
+        line_tokens = count_tokens(line) + 1
+        if lines and tokens + line_tokens > max_tokens:
+            yield _chunk()
+            lines = []
+            tokens = header_tokens
+        if not lines:
+            first = number
+        lines.append(line)
+        tokens += line_tokens
+        last = number
+    if lines:
+        yield _chunk()
+
+
+def _frame_rows(frames: Iterable[pd.DataFrame]) -> Iterator[Tuple[int, list]]:
+    number = 0
+    for frame in frames:
+        for values in frame.itertuples(index=False, name=None):
+            yield number, [value.strip() for value in values]
+            number += 1
+
+
+def iter_csv_chunks(path: str, max_tokens: int = TABULAR_CHUNK_TOKENS) -> Iterator[Document]:
+    # Ragged rows are packed as they are, with fewer or more fields than
+    # the header.
+    records = iter_csv_records(path)
+    header = next(records, None)
+    if header is None:
+        return
+    rows = ((number, [value.strip() for value in values]) for number, values in enumerate(records))
+    yield from pack_rows([column.strip() for column in header], rows, {"source": path}, max_tokens)
+
+
+def iter_excel_chunks(path: str, max_tokens: int = TABULAR_CHUNK_TOKENS) -> Iterator[Document]:
+    for sheet, frame in iter_excel_frames(path):
+        header = [str(column).strip() for column in frame.columns]
+        metadata = {"source": path, "page_name": sheet}
+        yield from pack_rows(header, _frame_rows([frame.fillna("")]), metadata, max_tokens)
+
+
+def iter_tabular_chunks(path: str, filename: str, max_tokens: int = TABULAR_CHUNK_TOKENS) -> Iterator[Document]:
+    if filename.endswith(".csv"):
+        return iter_csv_chunks(path, max_tokens)
+    return iter_excel_chunks(path, max_tokens)
@@ -0,0 +1,266 @@
+import os
+import time
+import shutil
+import logging
+import weakref
+import tempfile
+import threading
+from dataclasses import replace
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from api.query_engine import NO_MATCH, QueryPlan, execute
+
+logger = logging.getLogger(__name__)
+
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", "cache/datasets")
+DATASET_CACHE_MAX_MB = int(os.getenv("DATASET_CACHE_MAX_MB", "20480"))
+# Uploads at least this large are analyzed out of core instead of as one
+# in-memory DataFrame. Keep it below Streamlit's server.maxUploadSize
+# (.streamlit/config.toml), or no upload can reach it.
+OUT_OF_CORE_MIN_MB = int(os.getenv("OUT_OF_CORE_MIN_MB", "512"))
+DATASET_ROWS_PER_FILE = int(os.getenv("DATASET_ROWS_PER_FILE", "2000000"))
+DATASET_ROWS_PER_GROUP = int(os.getenv("DATASET_ROWS_PER_GROUP", "100000"))
+CSV_BLOCK_BYTES = 64 * 1024 * 1024
+CSV_SPOOL_BLOCK_BYTES = 1024 * 1024
+
+
+def _write_csv_dataset(source, directory: str, column_types: Optional[dict] = None):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    reader = pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_BYTES),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types),
+    )
+    ds.write_dataset(
+        reader,
+        directory,
+        format="parquet",
+        basename_template="part-{i}.parquet",
+        max_rows_per_file=DATASET_ROWS_PER_FILE,
+        max_rows_per_group=DATASET_ROWS_PER_GROUP,
+        existing_data_behavior="delete_matching",
+    )
+    return reader.schema
+
+
+def convert_csv(source, directory: str):
+    """Stream a CSV into a directory of Parquet files, one block at a time.
+
+    Column types are inferred from the first block. If a later block does
+    not fit them (typically an integer column that turns out to hold
+    floats), the conversion is redone with integer columns read as float64.
+    """
+    try:
+        return _write_csv_dataset(source, directory)
+    except pa.ArrowInvalid as e:
+        logger.info("Retrying conversion with widened integer columns: %s", e)
+        if hasattr(source, "seek"):
+            source.seek(0)
+        schema = pa_csv.open_csv(source, read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_BYTES)).schema
+        widened = {field.name: pa.float64() for field in schema if pa.types.is_integer(field.type)}
+        return _write_csv_dataset(source, directory, widened)
+
+
+class LazyFrame:
+    """Read-only, DataFrame-like view over a Parquet dataset on disk.
+
+    Nothing is loaded up front. Query plans push their filters down into the
+    scan (row groups are skipped using Parquet statistics where possible)
+    and read only the columns they use.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.dataset = ds.dataset(directory, format="parquet")
+        self.schema = self.dataset.schema
+        self._rows = None
+
+    @property
+    def columns(self) -> pd.Index:
+        return pd.Index(self.schema.names)
+
+    @property
+    def dtypes(self) -> pd.Series:
+        return pd.Series([str(field.type) for field in self.schema], index=self.columns, name="dtype")
+
+    @property
+    def shape(self):
+        if self._rows is None:
+            self._rows = self.dataset.count_rows()
+        return self._rows, len(self.schema)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    @property
+    def files(self):
+        return self.dataset.files
+
+    def disk_mb(self) -> float:
+        return sum(os.path.getsize(path) for path in self.files) / (1024 * 1024)
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        return self.dataset.head(n).to_pandas()
+
+    def to_pandas(self, columns=None, filter=None) -> pd.DataFrame:
+        return self.dataset.to_table(columns=columns, filter=filter).to_pandas()
+
+    def filter_expression(self, filters):
+        # Same semantics as query_engine._filter: numbers compare as floats,
+        # everything else as case-insensitive text.
+        expression = None
+        for column, op, raw in filters:
+            field_type = self.schema.field(column).type
+            if pa.types.is_integer(field_type) or pa.types.is_floating(field_type):
+                field, value = ds.field(column), float(raw)
+            else:
+                field, value = pc.utf8_lower(ds.field(column).cast(pa.string())), raw.lower()
+            clause = {
+                "==": field == value, "!=": field != value,
+                ">": field > value, ">=": field >= value,
+                "<": field < value, "<=": field <= value,
+            }[op]
+            expression = clause if expression is None else expression & clause
+        return expression
+
+    def execute_plan(self, plan: QueryPlan):
+        if plan.op == "n_columns":
+            return len(self.schema)
+        if plan.op == "columns":
+            return self.dtypes
+        if plan.op == "shape":
+            rows, columns = self.shape
+            return {"rows": rows, "columns": columns}
+
+        expression = self.filter_expression(plan.filters)
+        if plan.op == "count" and plan.group_by is None:
+            rows = self.dataset.count_rows(filter=expression)
+            if plan.filters and not rows:
+                raise ValueError(NO_MATCH)
+            return rows
+        if plan.op == "top":
+            best = self._top_rows(plan, expression)
+            if plan.filters and best.empty:
+                raise ValueError(NO_MATCH)
+            return best
+
+        # Everything else needs at most two columns of the matching rows.
+        columns = [name for name in (plan.group_by, plan.column) if name is not None]
+        df = self.to_pandas(columns=columns, filter=expression)
+        if plan.filters and df.empty:
+            raise ValueError(NO_MATCH)
+        return execute(df, replace(plan, filters=[]))
+
+    def _top_rows(self, plan: QueryPlan, expression):
+        # Keep the running top n across batches instead of loading every row.
+        best = None
+        for batch in self.dataset.to_batches(filter=expression):
+            frame = batch.to_pandas()
+            if best is not None:
+                frame = pd.concat([best, frame], ignore_index=True)
+            best = frame.nsmallest(plan.n, plan.column) if plan.ascending else frame.nlargest(plan.n, plan.column)
+        if best is None:
+            return pd.DataFrame(columns=self.columns)
+        return best
+
+
+class DatasetStore:
+    """Converted datasets kept under ``directory/<key>``, evicted LRU by size.
+
+    A dataset is never evicted while a LazyFrame handed out for it is still
+    alive (e.g. held by Streamlit's resource cache): its files would vanish
+    under the next query.
+    """
+
+    def __init__(self, directory: str = DATASET_CACHE_DIR, max_bytes: int = DATASET_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._open_frames = weakref.WeakSet()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _open(self, path: str) -> LazyFrame:
+        # Called with the lock held, so eviction cannot remove the directory
+        # between the check and the frame being registered.
+        frame = LazyFrame(path)
+        self._open_frames.add(frame)
+        return frame
+
+    def load(self, key: str, source) -> LazyFrame:
+        """``source`` is a CSV path or a seekable binary file object."""
+        path = self.path(key)
+        with self._lock:
+            if os.path.isdir(path):
+                os.utime(path)
+                return self._open(path)
+
+        start = time.perf_counter()
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            if isinstance(source, str):
+                convert_csv(source, tmp_path)
+            else:
+                # Spool uploads to disk in blocks so Arrow reads a real file
+                # (and can re-read it for the widened retry).
+                with tempfile.NamedTemporaryFile(suffix=".csv", dir=self.directory) as spool:
+                    source.seek(0)
+                    shutil.copyfileobj(source, spool, CSV_SPOOL_BLOCK_BYTES)
+                    spool.flush()
+                    convert_csv(spool.name, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Another session finished converting the same file first.
+            if not os.path.isdir(path):
+                raise
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        with self._lock:
+            frame = self._open(path)
+        logger.info(
+            "Converted %s to %d Parquet files (%.1f MB) in %.1f s",
+            key, len(frame.files), frame.disk_mb(), time.perf_counter() - start
+        )
+        self._evict(keep=path)
+        return frame
+
+    def _evict(self, keep: str):
+        with self._lock:
+            in_use = {frame.directory for frame in list(self._open_frames)}
+            entries = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if name.endswith(".tmp") or not os.path.isdir(path):
+                    continue
+                size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+                entries.append((os.stat(path).st_mtime, size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep or path in in_use:
+                    continue
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+
+_dataset_store = None
+_dataset_store_lock = threading.Lock()
+
+
+def get_dataset_store() -> DatasetStore:
+    global _dataset_store
+    if _dataset_store is None:
+        with _dataset_store_lock:
+            if _dataset_store is None:
+                _dataset_store = DatasetStore()
+    return _dataset_store
@@ -1,23 +1,197 @@
-from pymongo import MongoClient
 import os
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import List, Optional
 from dotenv import load_dotenv
 
+from api.metrics import timer
+
 load_dotenv()
 
 MONGO_URI=os.getenv("MONGO_URI")
-client=MongoClient(MONGO_URI)
-db=client["CSV-AI"]
-collection=db["users_history"]
+# "mongo", "sqlite" or "memory"; defaults to Mongo when MONGO_URI is set.
+HISTORY_BACKEND=os.getenv("HISTORY_BACKEND", "mongo" if MONGO_URI else "sqlite")
+HISTORY_SQLITE_PATH=os.getenv("HISTORY_SQLITE_PATH", "cache/history.sqlite")
+
+
+class MongoHistoryStore:
+    """One document per message in ``history_turns``, ordered by ``seq``.
+
+    Appending a turn inserts only the new messages, so write cost no longer
+    grows with the length of the conversation.
+    """
+
+    def __init__(self, uri: str):
+        from pymongo import MongoClient, ASCENDING, ReturnDocument
+        self._return_after = ReturnDocument.AFTER
+        client=MongoClient(uri)
+        db=client["CSV-AI"]
+        self.turns=db["history_turns"]
+        self.sessions=db["history_sessions"]
+        # Old format: one document per session holding the whole list.
+        self.legacy=db["users_history"]
+        self.turns.create_index([("session_id", ASCENDING), ("seq", ASCENDING)], unique=True)
+        self.sessions.create_index([("session_id", ASCENDING)], unique=True)
+
+    def append(self, session_id: str, messages: List[dict]):
+        if not messages:
+            return
+        counter=self.sessions.find_one_and_update(
+            {"session_id": session_id},
+            {"$inc": {"count": len(messages)}},
+            upsert=True,
+            return_document=self._return_after
+        )
+        first=counter["count"] - len(messages)
+        self.turns.insert_many([
+            {"session_id": session_id, "seq": first + i, "role": m["role"], "content": m["content"]}
+            for i, m in enumerate(messages)
+        ], ordered=False)
+
+    def count(self, session_id: str) -> int:
+        doc=self.sessions.find_one({"session_id": session_id}, {"count": 1})
+        return doc["count"] if doc else 0
+
+    def get(self, session_id: str, limit: Optional[int] = None, skip: int = 0) -> List[dict]:
+        cursor=self.turns.find({"session_id": session_id}, {"_id": 0, "role": 1, "content": 1}).sort("seq", -1).skip(skip)
+        if limit is not None:
+            cursor=cursor.limit(limit)
+        messages=list(cursor)[::-1]
+        if not messages and skip == 0:
+            doc=self.legacy.find_one({"session_id": session_id})
+            if doc and doc.get("history"):
+                # Move a session saved in the old format over to per-message rows.
+                self.append(session_id, doc["history"])
+                self.legacy.delete_one({"session_id": session_id})
+                return doc["history"][-limit:] if limit else doc["history"]
+        return messages
+
+    def delete(self, session_id: str):
+        self.turns.delete_many({"session_id": session_id})
+        self.sessions.delete_one({"session_id": session_id})
+        self.legacy.delete_one({"session_id": session_id})
+
+
+class SQLiteHistoryStore:
+    def __init__(self, path: str):
+        directory=os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock=threading.Lock()
+        self._conn=sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL,"
+            " PRIMARY KEY (session_id, seq))"
+        )
+        self._conn.commit()
+
+    def append(self, session_id: str, messages: List[dict]):
+        if not messages:
+            return
+        with self._lock:
+            # Other API workers append to the same file: take the write lock
+            # before reading MAX(seq) so two of them cannot pick the same seq.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                first=self._count(session_id)
+                self._conn.executemany(
+                    "INSERT INTO history (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                    [(session_id, first + i, m["role"], m["content"]) for i, m in enumerate(messages)]
+                )
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def _count(self, session_id: str) -> int:
+        row=self._conn.execute("SELECT MAX(seq) FROM history WHERE session_id = ?", (session_id,)).fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            return self._count(session_id)
+
+    def get(self, session_id: str, limit: Optional[int] = None, skip: int = 0) -> List[dict]:
+        with self._lock:
+            rows=self._conn.execute(
+                "SELECT role, content FROM history WHERE session_id = ? ORDER BY seq DESC LIMIT ? OFFSET ?",
+                (session_id, -1 if limit is None else limit, skip)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in reversed(rows)]
 
-def get_history(session_id:str):
-    doc=collection.find_one({"session_id":session_id})
-    return doc["history"] if doc else []
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM history WHERE session_id = ?", (session_id,))
+            self._conn.commit()
 
+
+class MemoryHistoryStore:
+    def __init__(self):
+        self._lock=threading.Lock()
+        self._sessions=defaultdict(list)
+
+    def append(self, session_id: str, messages: List[dict]):
+        with self._lock:
+            self._sessions[session_id].extend({"role": m["role"], "content": m["content"]} for m in messages)
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._sessions.get(session_id, []))
+
+    def get(self, session_id: str, limit: Optional[int] = None, skip: int = 0) -> List[dict]:
+        with self._lock:
+            history=self._sessions.get(session_id, [])
+            end=len(history) - skip
+            start=0 if limit is None else max(0, end - limit)
+            return [dict(m) for m in history[start:max(end, 0)]]
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+_store=None
+_store_lock=threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if HISTORY_BACKEND == "mongo":
+                    _store=MongoHistoryStore(MONGO_URI)
+                elif HISTORY_BACKEND == "sqlite":
+                    _store=SQLiteHistoryStore(HISTORY_SQLITE_PATH)
+                elif HISTORY_BACKEND == "memory":
+                    _store=MemoryHistoryStore()
+                else:
+                    raise ValueError(f"Unknown HISTORY_BACKEND: {HISTORY_BACKEND}")
+    return _store
+
+@timer("history_read_seconds")
+def get_history(session_id:str, limit:Optional[int]=None, skip:int=0):
+    # Most recent ``limit`` messages, skipping the newest ``skip``; oldest first.
+    return get_store().get(session_id, limit=limit, skip=skip)
+
+@timer("history_read_seconds")
+def count_history(session_id:str):
+    return get_store().count(session_id)
+
+@timer("history_write_seconds")
+def append_history(session_id:str, messages:list):
+    get_store().append(session_id, messages)
+
+@timer("history_write_seconds")
 def save_history(session_id:str, history:list):
-    collection.update_one(
-        {"session_id":session_id},
-        {"$set":{"history":history}},
-        upsert=True
-    )
+    # Kept for callers that hold the whole list: only the tail that is not
+    # stored yet gets written.
+    store=get_store()
+    store.append(session_id, history[store.count(session_id):])
+
+@timer("history_write_seconds")
 def delete_history(session_id:str):
-    collection.delete_one({"session_id":session_id})
\ No newline at end of file
+    get_store().delete(session_id)
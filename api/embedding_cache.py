@@ -0,0 +1,44 @@
+import hashlib
+from array import array
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from api.cache import SQLiteCache
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that skips texts it has already embedded.
+
+    Document vectors are stored in ``cache`` under the model name and the
+    SHA-256 of the chunk text, so identical chunks -- repeated rows, or the
+    same file uploaded again -- are only ever encoded once. Queries are not
+    cached here.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str, cache: SQLiteCache):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.cache = cache
+
+    def _key(self, text: str) -> str:
+        return f"{self.model_name}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            new = {key: array("f", vector).tobytes() for key, vector in zip(missing, vectors)}
+            self.cache.set_many(new)
+            cached.update(new)
+
+        return [array("f", cached[key]).tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
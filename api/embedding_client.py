@@ -0,0 +1,51 @@
+import os
+import time
+import logging
+from typing import List
+
+import httpx
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_SERVER_TIMEOUT = float(os.getenv("EMBEDDING_SERVER_TIMEOUT", "120"))
+# How long to keep retrying while the server is still starting (loading the
+# model) before giving up.
+EMBEDDING_SERVER_CONNECT_WAIT = float(os.getenv("EMBEDDING_SERVER_CONNECT_WAIT", "120"))
+
+
+class RemoteEmbeddings(Embeddings):
+    """Embeddings computed by the shared inference worker (api/embedding_server.py).
+
+    Vectors come back as raw float32 rows rather than JSON. The client is
+    thread-safe, so ingest threads and request handlers share one pool of
+    connections.
+    """
+
+    def __init__(self, url: str, timeout: float = EMBEDDING_SERVER_TIMEOUT, connect_wait: float = EMBEDDING_SERVER_CONNECT_WAIT):
+        self.url = url.rstrip("/")
+        self.connect_wait = connect_wait
+        self._client = httpx.Client(timeout=timeout)
+
+    def _post(self, texts: List[str]) -> np.ndarray:
+        deadline = time.monotonic() + self.connect_wait
+        while True:
+            try:
+                response = self._client.post(f"{self.url}/embed", json={"texts": texts})
+                break
+            except httpx.ConnectError:
+                if time.monotonic() >= deadline:
+                    raise
+                logger.info("Embedding server at %s not up yet, retrying", self.url)
+                time.sleep(1.0)
+        response.raise_for_status()
+        return np.frombuffer(response.content, dtype=np.float32).reshape(len(texts), -1)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._post(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._post([text])[0].tolist()
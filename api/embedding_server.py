@@ -0,0 +1,130 @@
+"""Shared embedding inference worker.
+
+    python -m api.embedding_server
+
+Loads the sentence-transformer once and serves ``POST /embed`` to every API
+worker (set EMBEDDING_SERVER_URL there). Requests arriving while the model
+is busy are merged into one batch of up to EMBED_SERVER_MAX_BATCH texts, so
+single-query requests from many workers share a forward pass. Queries and
+documents go through the same encoder: all-MiniLM-L6-v2 embeds both the
+same way.
+"""
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import List
+
+import numpy as np
+from fastapi import FastAPI, Response
+from pydantic import BaseModel
+
+from api.metrics import observe, increment, snapshot, counters
+from api.registry import load_local_embedding
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_SERVER_HOST = os.getenv("EMBEDDING_SERVER_HOST", "127.0.0.1")
+EMBEDDING_SERVER_PORT = int(os.getenv("EMBEDDING_SERVER_PORT", "8100"))
+EMBED_SERVER_MAX_BATCH = int(os.getenv("EMBED_SERVER_MAX_BATCH", "256"))
+# Extra time the batcher waits for more requests once it has one.
+EMBED_SERVER_MAX_WAIT_MS = float(os.getenv("EMBED_SERVER_MAX_WAIT_MS", "2"))
+
+
+class EmbeddingBatcher:
+    def __init__(self, embedding, max_batch: int = EMBED_SERVER_MAX_BATCH, max_wait: float = EMBED_SERVER_MAX_WAIT_MS / 1000):
+        self.embedding = embedding
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = asyncio.Queue()
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future))
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while size < self.max_batch:
+            # Take whatever queued up during the previous forward pass, then
+            # wait at most max_wait for stragglers.
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def run(self):
+        while True:
+            batch = await self._next_batch()
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = await asyncio.to_thread(self.embedding.embed_documents, texts)
+            except Exception as e:
+                logger.exception("Embedding a batch of %d texts failed", len(texts))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            observe("embed_server_batch_texts", len(texts))
+            observe("embed_server_batch_requests", len(batch))
+            increment("embed_server_texts", len(texts))
+            matrix = np.asarray(vectors, dtype=np.float32)
+            offset = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(matrix[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+_batcher = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _batcher
+    embedding = await asyncio.to_thread(load_local_embedding)
+    await asyncio.to_thread(embedding.embed_query, "warm up")
+    _batcher = EmbeddingBatcher(embedding)
+    task = asyncio.create_task(_batcher.run())
+    yield
+    task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class EmbedInput(BaseModel):
+    texts: List[str]
+
+
+@app.post("/embed")
+async def embed(body: EmbedInput):
+    # Raw little-endian float32 rows; the client knows how many texts it sent.
+    matrix = await _batcher.embed(body.texts) if body.texts else np.empty((0, 0), dtype=np.float32)
+    return Response(content=matrix.tobytes(), media_type="application/octet-stream")
+
+
+@app.get("/ready")
+def ready():
+    return {"ready": _batcher is not None}
+
+
+@app.get("/stats")
+def stats():
+    return {**snapshot(), "counters": counters()}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=EMBEDDING_SERVER_HOST, port=EMBEDDING_SERVER_PORT)
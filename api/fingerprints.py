@@ -0,0 +1,109 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+# Invalidation records older than this are pruned; a worker that has not
+# looked for that long drops all of its per-file caches instead.
+INVALIDATION_LOG_SECONDS = 24 * 3600
+
+
+class FileRegistry:
+    """Maps upload fingerprints to the ``file_id`` whose vectors hold them.
+
+    Every upload of the same content takes a reference on the same
+    ``file_id``; vectors should only be purged once the last reference is
+    released. Updates run in ``BEGIN IMMEDIATE`` transactions, so API
+    workers in other processes sharing the file see consistent counts.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " fingerprint TEXT PRIMARY KEY, file_id TEXT NOT NULL UNIQUE, refs INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS invalidations ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT, file_id TEXT NOT NULL, origin TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @contextmanager
+    def _write(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def claim(self, fingerprint: str, file_id: str) -> Tuple[str, bool]:
+        """Return ``(file_id, is_new)``, reusing the existing id for a known fingerprint."""
+        with self._write() as conn:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO files (fingerprint, file_id, refs) VALUES (?, ?, 1)", (fingerprint, file_id)
+            ).rowcount
+            if inserted:
+                return file_id, True
+            conn.execute("UPDATE files SET refs = refs + 1 WHERE fingerprint = ?", (fingerprint,))
+            row = conn.execute("SELECT file_id FROM files WHERE fingerprint = ?", (fingerprint,)).fetchone()
+            return row[0], False
+
+    def release(self, file_id: str) -> Optional[int]:
+        """Drop one reference and return how many are left, or None for an unknown id."""
+        with self._write() as conn:
+            row = conn.execute("SELECT refs FROM files WHERE file_id = ?", (file_id,)).fetchone()
+            if row is None:
+                return None
+            refs = row[0] - 1
+            if refs > 0:
+                conn.execute("UPDATE files SET refs = ? WHERE file_id = ?", (refs, file_id))
+            else:
+                conn.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+            return refs
+
+    def forget(self, file_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+            self._conn.commit()
+
+    def log_invalidation(self, file_id: str, origin: str):
+        """Tell other processes sharing the registry that ``file_id`` changed."""
+        now = time.time()
+        with self._write() as conn:
+            conn.execute(
+                "INSERT INTO invalidations (file_id, origin, created) VALUES (?, ?, ?)", (file_id, origin, now)
+            )
+            conn.execute("DELETE FROM invalidations WHERE created < ?", (now - INVALIDATION_LOG_SECONDS,))
+
+    def invalidations_since(self, seq: Optional[int], origin: str) -> Tuple[int, Optional[List[str]]]:
+        """Return ``(latest_seq, file_ids)`` logged by other origins after ``seq``.
+
+        ``file_ids`` is None when records after ``seq`` were already pruned,
+        meaning every file may have changed. Pass ``seq=None`` to start
+        from the latest record.
+        """
+        with self._lock:
+            # fetchall() so no statement is left open: an unfinished one would
+            # pin this connection to an old WAL snapshot.
+            rows = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'invalidations'").fetchall()
+            latest = rows[0][0] if rows else 0
+            if seq is None or seq >= latest:
+                return latest, []
+            oldest = self._conn.execute("SELECT MIN(seq) FROM invalidations").fetchall()[0][0]
+            if oldest is None or oldest > seq + 1:
+                return latest, None
+            rows = self._conn.execute(
+                "SELECT file_id FROM invalidations WHERE seq > ? AND seq <= ? AND origin != ?", (seq, latest, origin)
+            ).fetchall()
+            return latest, list(dict.fromkeys(file_id for file_id, in rows))
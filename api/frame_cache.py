@@ -0,0 +1,125 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Tuple
+
+import pandas as pd
+
+from api.frames import read_compact_frame, memory_mb
+
+logger = logging.getLogger(__name__)
+
+FRAME_CACHE_DIR = os.getenv("FRAME_CACHE_DIR", "cache/frames")
+FRAME_CACHE_MAX_MB = int(os.getenv("FRAME_CACHE_MAX_MB", "2048"))
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def stream_hash(fileobj, block_size: int = 1024 * 1024) -> str:
+    """``content_hash`` of a seekable file object, read in blocks."""
+    hasher = hashlib.sha256()
+    fileobj.seek(0)
+    while block := fileobj.read(block_size):
+        hasher.update(block)
+    fileobj.seek(0)
+    return hasher.hexdigest()
+
+
+class FrameCache:
+    """Parsed DataFrames stored as Parquet files keyed by content hash.
+
+    Reloading a column-oriented Parquet file is much faster than parsing
+    the original CSV/Excel again, and keeps the compact dtypes (categories,
+    downcast numerics) chosen when the file was first parsed. Files are
+    evicted least-recently-used first (by modification time, refreshed on
+    every hit) once the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory: str = FRAME_CACHE_DIR, max_bytes: int = FRAME_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def load(self, key: str, data: bytes, filename: str) -> Tuple[pd.DataFrame, dict]:
+        """Return ``(df, info)``.
+
+        ``info["source"]`` is ``"parquet"`` or ``"parsed"``; parsed loads also
+        carry the FrameLoadStats fields (memory used and saved).
+        """
+        path = self.path(key)
+        if os.path.exists(path):
+            start = time.perf_counter()
+            try:
+                df = pd.read_parquet(path)
+                os.utime(path)
+                seconds = time.perf_counter() - start
+                logger.info("Frame cache hit for %s in %.2f s", filename, seconds)
+                return df, {"source": "parquet", "memory_mb": memory_mb(df), "seconds": seconds}
+            except Exception as e:
+                logger.warning("Discarding unreadable cached frame %s: %s", path, e)
+                self._remove(path)
+
+        # Parsed straight from memory, so no temp file is written.
+        df, stats = read_compact_frame(data, filename)
+        self.store(key, df)
+        return df, {"source": "parsed", **stats.to_dict()}
+
+    def store(self, key: str, df: pd.DataFrame):
+        path = self.path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            df.to_parquet(tmp_path, index=True)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            # Columns pyarrow cannot represent (e.g. mixed object types) just
+            # mean this frame is re-parsed next time.
+            logger.info("Not caching frame %s as Parquet: %s", key, e)
+            self._remove(tmp_path)
+            return
+        self._evict()
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if not name.endswith(".parquet"):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+
+
+_frame_cache = None
+_frame_cache_lock = threading.Lock()
+
+
+def get_frame_cache() -> FrameCache:
+    global _frame_cache
+    if _frame_cache is None:
+        with _frame_cache_lock:
+            if _frame_cache is None:
+                _frame_cache = FrameCache()
+    return _frame_cache
@@ -0,0 +1,164 @@
+import io
+import os
+import time
+import logging
+from dataclasses import dataclass, asdict
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger(__name__)
+
+# Rows per chunk when reading a CSV; the first chunk is also the sample the
+# category decisions are made on.
+FRAME_CHUNK_ROWS = int(os.getenv("FRAME_CHUNK_ROWS", "100000"))
+# String columns whose distinct/non-null ratio in the sample is at most this
+# are stored as ``category``.
+CATEGORY_MAX_RATIO = float(os.getenv("FRAME_CATEGORY_MAX_RATIO", "0.5"))
+# "c" reads in chunks and compacts each one; "pyarrow" uses the multithreaded
+# pyarrow parser and Arrow-backed dtypes (whole file at once).
+FRAME_ENGINE = os.getenv("FRAME_ENGINE", "c")
+
+
+@dataclass
+class FrameLoadStats:
+    rows: int = 0
+    columns: int = 0
+    naive_mb: float = 0.0
+    memory_mb: float = 0.0
+    saved_mb: float = 0.0
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    return float(df.memory_usage(deep=True).sum()) / (1024 * 1024)
+
+
+def _is_text(series: pd.Series) -> bool:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return False
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+
+def category_columns(sample: pd.DataFrame, max_ratio: float = CATEGORY_MAX_RATIO) -> List[str]:
+    """Text columns of ``sample`` with few enough distinct values to be categories."""
+    columns = []
+    for name in sample.columns:
+        series = sample[name]
+        if not _is_text(series):
+            continue
+        non_null = series.count()
+        if non_null and series.nunique() / non_null <= max_ratio:
+            columns.append(name)
+    return columns
+
+
+def _downcast(series: pd.Series) -> pd.Series:
+    # Only plain NumPy dtypes; Arrow-backed columns keep their widths.
+    if not isinstance(series.dtype, np.dtype) or pd.api.types.is_bool_dtype(series):
+        return series
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+        narrow = series.astype(np.float32)
+        # Only when every value survives the round trip exactly.
+        if np.array_equal(narrow.to_numpy(np.float64), series.to_numpy(), equal_nan=True):
+            return narrow
+    return series
+
+
+def compact_frame(df: pd.DataFrame, categories: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Downcast numeric columns and turn low-cardinality text into categories.
+
+    ``categories`` overrides which columns become categorical; by default it
+    is decided from ``df`` itself.
+    """
+    if categories is None:
+        categories = category_columns(df)
+    categories = set(categories)
+    for name in df.columns:
+        series = df[name]
+        if name in categories and _is_text(series):
+            df[name] = series.astype("category")
+        else:
+            df[name] = _downcast(series)
+    return df
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate compacted chunks without losing categorical columns.
+
+    Each chunk has its own categories, which would make ``pd.concat`` fall
+    back to object; they are unified first.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    for name in frames[0].columns:
+        if all(isinstance(frame[name].dtype, pd.CategoricalDtype) for frame in frames):
+            categories = union_categoricals([frame[name] for frame in frames], ignore_order=True).categories
+            for frame in frames:
+                frame[name] = frame[name].cat.set_categories(categories)
+    df = pd.concat(frames, ignore_index=True)
+    # Chunks may have been downcast to different widths; narrow once more.
+    for name in df.columns:
+        df[name] = _downcast(df[name])
+    return df
+
+
+def read_compact_csv(source, chunksize: int = FRAME_CHUNK_ROWS, engine: str = FRAME_ENGINE, **kwargs):
+    """Read a CSV into a compact DataFrame and return ``(df, stats)``.
+
+    With the default engine the file is read in chunks: each chunk is
+    measured, then compacted before the next one is read, so peak memory is
+    the compact frame plus one raw chunk rather than the whole raw frame.
+    """
+    start = time.perf_counter()
+    stats = FrameLoadStats()
+    if engine == "pyarrow":
+        df = pd.read_csv(source, engine="pyarrow", dtype_backend="pyarrow", **kwargs)
+        stats.naive_mb = memory_mb(df)
+        df = compact_frame(df)
+    else:
+        frames = []
+        categories = None
+        with pd.read_csv(source, chunksize=chunksize, **kwargs) as reader:
+            for chunk in reader:
+                stats.naive_mb += memory_mb(chunk)
+                if categories is None:
+                    categories = category_columns(chunk)
+                frames.append(compact_frame(chunk, categories))
+        df = concat_frames(frames) if frames else pd.DataFrame()
+    return df, _finish(df, stats, start)
+
+
+def read_compact_excel(source, **kwargs):
+    start = time.perf_counter()
+    stats = FrameLoadStats()
+    df = pd.read_excel(source, **kwargs)
+    stats.naive_mb = memory_mb(df)
+    df = compact_frame(df)
+    return df, _finish(df, stats, start)
+
+
+def read_compact_frame(data: bytes, filename: str, **kwargs):
+    """Parse an uploaded CSV/Excel file held in memory into a compact frame."""
+    if filename.endswith(".csv"):
+        return read_compact_csv(io.BytesIO(data), **kwargs)
+    return read_compact_excel(io.BytesIO(data), **kwargs)
+
+
+def _finish(df: pd.DataFrame, stats: FrameLoadStats, start: float) -> FrameLoadStats:
+    stats.rows, stats.columns = df.shape
+    stats.memory_mb = memory_mb(df)
+    stats.saved_mb = max(stats.naive_mb - stats.memory_mb, 0.0)
+    stats.seconds = time.perf_counter() - start
+    logger.info(
+        "Loaded %d x %d frame: %.1f MB (%.1f MB saved vs default dtypes) in %.2f s",
+        stats.rows, stats.columns, stats.memory_mb, stats.saved_mb, stats.seconds
+    )
+    return stats
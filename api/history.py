@@ -0,0 +1,91 @@
+from collections import deque
+from typing import Callable, List, Optional
+
+DEFAULT_WINDOW_TOKENS = 2000
+DEFAULT_SUMMARY_TOKENS = 400
+# Per evicted message, how much of it the default summarizer keeps.
+SUMMARY_LINE_CHARS = 200
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    # Roughly four characters per token for English text.
+    return len(text) // 4 + 1
+
+
+def extractive_summary(summary: str, message: dict, max_tokens: int) -> str:
+    """Default rolling summarizer: one truncated line per evicted message."""
+    prefix = "User" if message["role"] == "user" else "Assistant"
+    content = " ".join(message["content"].split())
+    if len(content) > SUMMARY_LINE_CHARS:
+        content = content[:SUMMARY_LINE_CHARS] + "…"
+    lines = (summary.splitlines() if summary else []) + [f"{prefix}: {content}"]
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class ConversationWindow:
+    """Token-budgeted view of a conversation for prompt building.
+
+    Recent messages are kept verbatim while they fit in ``max_tokens``;
+    older ones are folded one at a time into a rolling ``summary`` by
+    ``summarizer(summary, message, summary_max_tokens)``. Token counts are
+    computed once per message, so adding a message and building a prompt
+    cost O(window) regardless of how long the conversation has run.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_WINDOW_TOKENS,
+        summary_max_tokens: int = DEFAULT_SUMMARY_TOKENS,
+        summarizer: Optional[Callable[[str, dict, int], str]] = None,
+    ):
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.summarizer = summarizer or extractive_summary
+        self.summary = ""
+        self._window = deque()
+        self._window_tokens = 0
+
+    @classmethod
+    def from_messages(cls, messages: List[dict], **kwargs) -> "ConversationWindow":
+        window = cls(**kwargs)
+        for message in messages:
+            window.add(message)
+        return window
+
+    def add(self, message: dict):
+        if message.get("role") not in ("user", "assistant"):
+            return
+        tokens = count_tokens(message["content"])
+        self._window.append((message, tokens))
+        self._window_tokens += tokens
+        # Always keep the newest message, even if it alone exceeds the budget.
+        while len(self._window) > 1 and self._window_tokens > self.max_tokens:
+            evicted, evicted_tokens = self._window.popleft()
+            self._window_tokens -= evicted_tokens
+            self.summary = self.summarizer(self.summary, evicted, self.summary_max_tokens)
+
+    def clear(self):
+        self.summary = ""
+        self._window.clear()
+        self._window_tokens = 0
+
+    @property
+    def messages(self) -> List[dict]:
+        return [message for message, _ in self._window]
+
+    @property
+    def tokens(self) -> int:
+        return self._window_tokens
@@ -0,0 +1,151 @@
+import os
+import queue
+import logging
+import resource
+import threading
+import contextvars
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from itertools import islice
+from typing import Callable, Iterable, Optional
+
+from langchain_core.documents import Document
+
+from api.metrics import timer
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", str(min(4, os.cpu_count() or 1))))
+UPSERT_QUEUE_SIZE = int(os.getenv("UPSERT_QUEUE_SIZE", "4"))
+
+_DONE = object()
+
+
+@dataclass
+class IngestStats:
+    chunks: int = 0
+    batches: int = 0
+    # Source documents read: pages, sheets or CSV rows depending on the format.
+    pages: int = 0
+    seconds: float = 0.0
+    chunks_per_sec: float = 0.0
+    pages_per_sec: float = 0.0
+    # Highest resident memory sampled while this ingest ran (0 where /proc
+    # is unavailable); process_peak_rss_mb is the peak of the whole process
+    # lifetime, so it includes earlier uploads.
+    peak_rss_mb: float = 0.0
+    process_peak_rss_mb: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb() -> float:
+    """Resident memory right now, from /proc/self/statm; 0.0 where it is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def iter_batches(items: Iterable, size: int):
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def ingest_chunks(
+    chunks: Iterable[Document],
+    vectorstore,
+    embedding,
+    batch_size: int = EMBED_BATCH_SIZE,
+    workers: int = EMBED_WORKERS,
+    queue_size: int = UPSERT_QUEUE_SIZE,
+    on_progress: Optional[Callable[[str, int], None]] = None,
+) -> IngestStats:
+    """Embed and upsert ``chunks`` as a pipeline.
+
+    Chunks are pulled lazily into fixed-size batches and embedded on a pool
+    of ``workers`` threads (the encoder releases the GIL). Finished batches
+    go through a bounded queue to a single upsert thread, so embedding of
+    the next batches overlaps with the network/disk write of the previous
+    ones and at most ``workers + queue_size`` batches are held in memory.
+
+    ``on_progress(event, count)`` is called with ``"embedded"`` and
+    ``"upserted"`` as each batch finishes; an exception raised from it
+    stops the pipeline.
+    """
+    report = on_progress or (lambda event, count: None)
+    stats = IngestStats(peak_rss_mb=current_rss_mb())
+    start = time.perf_counter()
+    upserts = queue.Queue(maxsize=queue_size)
+    upsert_error = []
+
+    def _upsert_loop():
+        while (item := upserts.get()) is not _DONE:
+            if upsert_error:
+                continue
+            texts, vectors, metadatas = item
+            try:
+                with timer("upsert_batch_seconds"):
+                    vectorstore.add_embeddings(texts, vectors, metadatas)
+                report("upserted", len(texts))
+            except Exception as e:
+                upsert_error.append(e)
+
+    # Worker threads run in the caller's context so their stage timings are
+    # attributed to the request doing the ingest.
+    upserter = threading.Thread(target=contextvars.copy_context().run, args=(_upsert_loop,), name="ingest-upsert", daemon=True)
+    upserter.start()
+
+    def _embed(batch):
+        texts = [doc.page_content for doc in batch]
+        with timer("embed_batch_seconds"):
+            vectors = embedding.embed_documents(texts)
+        return texts, vectors, [doc.metadata for doc in batch]
+
+    def _hand_off(embedded):
+        report("embedded", len(embedded[0]))
+        upserts.put(embedded)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest-embed") as pool:
+            in_flight = deque()
+            for batch in iter_batches(chunks, batch_size):
+                if upsert_error:
+                    break
+                in_flight.append(pool.submit(contextvars.copy_context().run, _embed, batch))
+                stats.chunks += len(batch)
+                stats.batches += 1
+                # Sampled once per batch, while the most batches are in flight.
+                stats.peak_rss_mb = max(stats.peak_rss_mb, current_rss_mb())
+                if len(in_flight) >= workers:
+                    _hand_off(in_flight.popleft().result())
+            while in_flight:
+                _hand_off(in_flight.popleft().result())
+    finally:
+        upserts.put(_DONE)
+        upserter.join()
+
+    if upsert_error:
+        raise upsert_error[0]
+
+    stats.seconds = time.perf_counter() - start
+    stats.chunks_per_sec = stats.chunks / stats.seconds if stats.seconds else 0.0
+    stats.peak_rss_mb = max(stats.peak_rss_mb, current_rss_mb())
+    stats.process_peak_rss_mb = peak_rss_mb()
+    logger.info(
+        "Ingested %d chunks in %d batches: %.1fs, %.1f chunks/sec, peak RSS during ingest %.0f MB",
+        stats.chunks, stats.batches, stats.seconds, stats.chunks_per_sec, stats.peak_rss_mb
+    )
+    return stats
@@ -0,0 +1,398 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+# Finished jobs kept for polling; the oldest are dropped past this count.
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", "1000"))
+# Job status shared by all API worker processes; set to an empty string
+# when running a single worker.
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "cache/jobs.sqlite")
+# A running job publishes its progress, and picks up cancellation requests
+# from other workers, at most this often.
+JOB_SYNC_SECONDS = float(os.getenv("JOB_SYNC_SECONDS", "1"))
+# Every worker refreshes its unfinished jobs every JOB_SYNC_SECONDS, so a
+# queued or running job not heard from for this long died with its worker
+# (one whose process is known to have exited is cleaned up straight away).
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+
+QUEUED = "queued"
+RUNNING = "ingesting"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _start_time(pid: int) -> str:
+    # Process start time (clock ticks since boot), so a recycled pid is not
+    # mistaken for the process that used it before. Empty where /proc is
+    # missing.
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return ""
+
+
+def process_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{_start_time(os.getpid())}"
+
+
+def owner_alive(owner: Optional[str]) -> bool:
+    """False only for a process on this host that has provably exited."""
+    parts = (owner or "").rsplit(":", 2)
+    if len(parts) != 3 or parts[0] != socket.gethostname() or not parts[2]:
+        return True
+    return _start_time(int(parts[1])) == parts[2]
+
+
+@dataclass
+class Job:
+    id: str
+    file_id: str
+    filename: str
+    stage: str = QUEUED
+    rows_parsed: int = 0
+    chunks_embedded: int = 0
+    vectors_upserted: int = 0
+    error: Optional[str] = None
+    stats: Optional[dict] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+    _store: Optional["JobStore"] = field(default=None, repr=False)
+    _synced: float = field(default=0.0, repr=False)
+    _discard: Optional[Callable[["Job"], None]] = field(default=None, repr=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Job":
+        return cls(**{f.name: data[f.name] for f in fields(cls) if not f.name.startswith("_")})
+
+    def sync(self):
+        self._synced = time.monotonic()
+        self._store.save(self)
+        if self._store.cancel_requested(self.id):
+            self._cancel.set()
+
+    def progress(self, event: str, count: int):
+        """Progress callback for the ingest pipeline; also the cancellation point."""
+        if self._store is not None and time.monotonic() - self._synced >= JOB_SYNC_SECONDS:
+            self.sync()
+        if self._cancel.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled")
+        if event == "parsed":
+            self.rows_parsed += count
+        elif event == "embedded":
+            self.chunks_embedded += count
+        elif event == "upserted":
+            self.vectors_upserted += count
+
+    def cancel(self):
+        self._cancel.set()
+
+    def to_dict(self) -> dict:
+        data = {f.name: getattr(self, f.name) for f in fields(self) if not f.name.startswith("_")}
+        data["seconds"] = ((self.finished or time.time()) - self.started) if self.started else 0.0
+        # Vectors that already landed can be searched while the rest is ingested.
+        data["queryable"] = self.vectors_upserted > 0
+        return data
+
+
+class JobStore:
+    """Job status in SQLite, shared by the API worker processes.
+
+    Each worker runs the jobs it accepted; through the store any worker can
+    answer a status poll, find the job still ingesting a file, or ask for
+    a job to be cancelled.
+    """
+
+    def __init__(self, path: str, max_finished: int = MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, file_id TEXT NOT NULL, stage TEXT NOT NULL, data TEXT NOT NULL,"
+            " cancel INTEGER NOT NULL DEFAULT 0, updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_file_id ON jobs (file_id)")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(jobs)").fetchall()]
+        if "owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        self._conn.commit()
+        self.owner = process_owner()
+
+    def save(self, job: Job):
+        data = {f.name: getattr(job, f.name) for f in fields(job) if not f.name.startswith("_")}
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, file_id, stage, data, updated, owner) VALUES (?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET stage = excluded.stage, data = excluded.data, updated = excluded.updated",
+                (job.id, job.file_id, job.stage, json.dumps(data), time.time(), self.owner)
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_dict(json.loads(row[0])) if row else None
+
+    def _active_clause(self) -> tuple:
+        return (
+            f"stage NOT IN ({','.join('?' * len(FINISHED))}) AND updated >= ?",
+            (*FINISHED, time.time() - JOB_STALE_SECONDS),
+        )
+
+    def active_for_file(self, file_id: str) -> List[Job]:
+        clause, params = self._active_clause()
+        with self._lock:
+            rows = self._conn.execute(f"SELECT data FROM jobs WHERE file_id = ? AND {clause}", (file_id, *params)).fetchall()
+        return [Job.from_dict(json.loads(row[0])) for row in rows]
+
+    def request_cancel(self, file_id: str) -> int:
+        clause, params = self._active_clause()
+        with self._lock:
+            cursor = self._conn.execute(f"UPDATE jobs SET cancel = 1 WHERE file_id = ? AND {clause}", (file_id, *params))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def touch(self, job_ids: List[str]):
+        if not job_ids:
+            return
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET updated = ? WHERE id IN ({','.join('?' * len(job_ids))})", (time.time(), *job_ids)
+            )
+            self._conn.commit()
+
+    def take_abandoned(self) -> List[Job]:
+        """Mark unfinished jobs whose worker is gone as failed and return them.
+
+        A worker is gone when it exited (checked for processes on this host)
+        or has not refreshed its jobs for JOB_STALE_SECONDS. Each abandoned
+        job is returned to exactly one caller, across processes, so its
+        cleanup runs once.
+        """
+        unfinished = f"SELECT id, owner, updated, data FROM jobs WHERE stage NOT IN ({','.join('?' * len(FINISHED))})"
+
+        def _abandoned(rows):
+            stale = time.time() - JOB_STALE_SECONDS
+            return [(job_id, data) for job_id, owner, updated, data in rows if updated < stale or not owner_alive(owner)]
+
+        with self._lock:
+            if not _abandoned(self._conn.execute(unfinished, FINISHED).fetchall()):
+                return []
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                jobs = []
+                now = time.time()
+                for job_id, data in _abandoned(self._conn.execute(unfinished, FINISHED).fetchall()):
+                    job = Job.from_dict(json.loads(data))
+                    job.stage, job.finished = FAILED, now
+                    job.error = "The worker running this job stopped before it finished"
+                    data = {f.name: getattr(job, f.name) for f in fields(job) if not f.name.startswith("_")}
+                    self._conn.execute(
+                        "UPDATE jobs SET stage = ?, data = ?, updated = ? WHERE id = ?", (FAILED, json.dumps(data), now, job_id)
+                    )
+                    jobs.append(job)
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+        return jobs
+
+    def prune(self):
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM jobs WHERE stage IN ({','.join('?' * len(FINISHED))}) AND id NOT IN"
+                f" (SELECT id FROM jobs WHERE stage IN ({','.join('?' * len(FINISHED))}) ORDER BY updated DESC LIMIT ?)",
+                (*FINISHED, *FINISHED, self.max_finished)
+            )
+            self._conn.commit()
+
+
+class JobManager:
+    """Runs ingestion jobs on a bounded thread pool and keeps their status."""
+
+    def __init__(self, workers: int = INGEST_JOB_WORKERS, max_finished: int = MAX_FINISHED_JOBS, store: Optional[JobStore] = None):
+        self.max_finished = max_finished
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        if store is not None:
+            threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def _heartbeat(self):
+        # Keeps queued jobs (and running ones between progress calls) from
+        # looking abandoned to the other workers.
+        while not self._stopped.wait(JOB_SYNC_SECONDS):
+            with self._lock:
+                job_ids = [job.id for job in self._jobs.values() if job.stage not in FINISHED]
+            try:
+                self.store.touch(job_ids)
+            except Exception:
+                logger.exception("Could not refresh the status of %d jobs", len(job_ids))
+
+    def submit(self, file_id: str, filename: str, func: Callable[[Job], Optional[dict]],
+               discard: Optional[Callable[[Job], None]] = None) -> Job:
+        """Queue ``func(job)``; its return value becomes ``job.stats``.
+
+        ``discard(job)`` releases what the job holds (claim, temp file) if
+        the manager shuts down before the job starts.
+        """
+        job = self._register(Job(id=str(uuid.uuid4()), file_id=file_id, filename=filename, _store=self.store, _discard=discard))
+        self._executor.submit(self._run, job, func)
+        return job
+
+    def run(self, file_id: str, filename: str, func: Callable[[Job], Optional[dict]]) -> Job:
+        """Run ``func(job)`` in the calling thread and return the finished job.
+
+        The job is tracked like a submitted one, so ``cancel_file`` (from
+        any worker) stops it and its status can be polled.
+        """
+        job = Job(id=str(uuid.uuid4()), file_id=file_id, filename=filename, _store=self.store, stage=RUNNING, started=time.time())
+        self._execute(self._register(job), func)
+        return job
+
+    def _register(self, job: Job) -> Job:
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        if self.store is not None:
+            self.store.save(job)
+            self.store.prune()
+        return job
+
+    def _run(self, job: Job, func):
+        # Always call func, even for a job cancelled while queued, so it can
+        # clean up (the first progress call raises JobCancelled). Only a job
+        # already discarded by shutdown() is skipped.
+        with self._lock:
+            if job.stage != QUEUED:
+                return
+            job.stage, job.started = RUNNING, time.time()
+        self._execute(job, func)
+
+    def _execute(self, job: Job, func):
+        try:
+            if self.store is not None:
+                job.sync()
+            job.stats = func(job)
+            job.stage = DONE
+        except JobCancelled:
+            job.stage = CANCELLED
+        except Exception as e:
+            logger.exception("Ingest job %s for %s failed", job.id, job.filename)
+            job.stage, job.error = FAILED, str(e)
+        finally:
+            job.finished = time.time()
+            if self.store is not None:
+                try:
+                    self.store.save(job)
+                except Exception:
+                    logger.exception("Could not store the status of job %s", job.id)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """This worker's job, or a status snapshot of one run by another worker."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.get(job_id)
+        return job
+
+    def active_for_file(self, file_id: str) -> List[Job]:
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.file_id == file_id and job.stage not in FINISHED]
+        if self.store is not None:
+            local = {job.id for job in jobs}
+            jobs += [job for job in self.store.active_for_file(file_id) if job.id not in local]
+        return jobs
+
+    def cancel_file(self, file_id: str) -> int:
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.file_id == file_id and job.stage not in FINISHED]
+        for job in jobs:
+            job.cancel()
+        if self.store is not None:
+            # Jobs in other workers stop at their next sync.
+            return max(len(jobs), self.store.request_cancel(file_id))
+        return len(jobs)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.stage in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def recover_abandoned(self, cleanup: Callable[[Job], None]) -> List[Job]:
+        """Fail the jobs whose worker stopped mid-way and ``cleanup`` each one."""
+        if self.store is None:
+            return []
+        jobs = self.store.take_abandoned()
+        for job in jobs:
+            logger.warning("Ingest job %s for %s was abandoned by its worker; cleaning up", job.id, job.filename)
+            try:
+                cleanup(job)
+            except Exception:
+                logger.exception("Could not clean up abandoned job %s", job.id)
+        return jobs
+
+    def shutdown(self):
+        with self._lock:
+            for job in self._jobs.values():
+                job.cancel()
+            queued = [job for job in self._jobs.values() if job.stage == QUEUED]
+            for job in queued:
+                job.stage, job.finished = CANCELLED, time.time()
+        self._stopped.set()
+        # Running jobs stop at their next progress call and clean up
+        # themselves; queued ones never start, so release what they hold.
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for job in queued:
+            try:
+                if job._discard is not None:
+                    job._discard(job)
+                if self.store is not None:
+                    self.store.save(job)
+            except Exception:
+                logger.exception("Could not discard queued job %s", job.id)
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                _job_manager = JobManager(store=JobStore(JOB_DB_PATH) if JOB_DB_PATH else None)
+    return _job_manager
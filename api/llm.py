@@ -0,0 +1,19 @@
+import os
+from functools import lru_cache
+from langchain_core.language_models import FakeStreamingListLLM
+
+FAKE_MODEL_PREFIX = "fake"
+# "fake*" model names give a local stand-in so the pipelines can be
+# exercised without a Google API key. Only for tests and benchmarks: the
+# model name comes straight from API requests.
+ALLOW_FAKE_LLM = os.getenv("ALLOW_FAKE_LLM", "").lower() in ("1", "true", "yes")
+
+
+# Clients are cached per (model, key) so each request reuses the same
+# client and its connection pool instead of building a new one.
+@lru_cache(maxsize=32)
+def get_llm(model_name: str, api_key: str):
+    if ALLOW_FAKE_LLM and model_name.startswith(FAKE_MODEL_PREFIX):
+        return FakeStreamingListLLM(responses=[f"{model_name} response"])
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    return ChatGoogleGenerativeAI(model=model_name, google_api_key=api_key)
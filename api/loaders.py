@@ -0,0 +1,115 @@
+import os
+import csv
+import codecs
+import hashlib
+import tempfile
+from typing import Iterable, Iterator, Tuple
+
+import pandas as pd
+from langchain_core.documents import Document
+
+from api.parallel_loaders import iter_pdf_documents, iter_excel_documents
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+CSV_ROWS_PER_BLOCK = 10000
+
+
+async def save_upload(upload, suffix: str = "") -> Tuple[str, str]:
+    """Copy an UploadFile to a temp file in fixed-size blocks.
+
+    Returns the temp path and the SHA-256 of the content; the caller owns
+    (and must remove) the file.
+    """
+    hasher = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        try:
+            while block := await upload.read(UPLOAD_BLOCK_SIZE):
+                hasher.update(block)
+                tmp.write(block)
+        except BaseException:
+            tmp.close()
+            os.remove(tmp.name)
+            raise
+        return tmp.name, hasher.hexdigest()
+
+
+def detect_encoding(path: str) -> str:
+    # Same fallback as CSVLoader (utf-8, then cp1252), decided up front by
+    # streaming through the file so rows can be yielded lazily afterwards.
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        with open(path, "rb") as f:
+            while block := f.read(UPLOAD_BLOCK_SIZE):
+                decoder.decode(block)
+            decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return "cp1252"
+    return "utf-8"
+
+
+def iter_csv_frames(path: str, chunksize: int = CSV_ROWS_PER_BLOCK, encoding: str = None, **kwargs) -> Iterator[pd.DataFrame]:
+    """Typed frames for statistics. An empty file yields nothing; rows with
+    too many fields are skipped (with a warning) rather than failing the
+    file or shifting the first column into the index."""
+    kwargs = {"index_col": False, "on_bad_lines": "warn", **kwargs}
+    try:
+        reader = pd.read_csv(
+            path,
+            chunksize=chunksize,
+            encoding=encoding or detect_encoding(path),
+            **kwargs
+        )
+    except pd.errors.EmptyDataError:
+        return
+    with reader:
+        yield from reader
+
+
+def iter_csv_records(path: str) -> Iterator[list]:
+    """Yield every non-blank CSV record as a list of strings, header first.
+
+    Plain csv module, like CSVLoader: ragged rows come through as they are,
+    and it is much faster than pandas when every cell stays text anyway.
+    """
+    encoding = detect_encoding(path)
+    with open(path, newline="", encoding="utf-8-sig" if encoding == "utf-8" else encoding) as f:
+        for record in csv.reader(f):
+            if record:
+                yield record
+
+
+def iter_csv_documents(path: str) -> Iterator[Document]:
+    """Yield one Document per CSV row, in CSVLoader's "column: value" format.
+
+    As with CSVLoader's DictReader, missing values read "None" and extra
+    values are listed, comma-joined, under "None".
+    """
+    records = iter_csv_records(path)
+    header = next(records, None)
+    if header is None:
+        return
+    columns = [column.strip() for column in header]
+    for row, values in enumerate(records):
+        lines = [f"{column}: {value.strip()}" for column, value in zip(columns, values)]
+        lines.extend(f"{column}: None" for column in columns[len(values):])
+        if len(values) > len(columns):
+            lines.append("None: " + ",".join(value.strip() for value in values[len(columns):]))
+        yield Document(page_content="\n".join(lines), metadata={"source": path, "row": row})
+
+
+def iter_documents(path: str, filename: str) -> Iterator[Document]:
+    if filename.endswith(".csv"):
+        return iter_csv_documents(path)
+    if filename.endswith((".xls", ".xlsx")):
+        return iter_excel_documents(path)
+    if filename.endswith(".pdf"):
+        return iter_pdf_documents(path)
+    if filename.endswith(".docx"):
+        from langchain_community.document_loaders import Docx2txtLoader
+        return Docx2txtLoader(file_path=path).lazy_load()
+    raise ValueError(f"❌ Unsupported file type: {filename}")
+
+
+def iter_chunks(documents: Iterable[Document], text_splitter) -> Iterator[Document]:
+    for document in documents:
+        yield from text_splitter.split_documents([document])
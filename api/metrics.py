@@ -0,0 +1,341 @@
+import os
+import re
+import json
+import time
+import logging
+import inspect
+import threading
+import functools
+from contextvars import ContextVar
+from collections import defaultdict, deque
+from typing import Iterable, Iterator, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Keep the most recent observations per metric for percentile estimates.
+MAX_SAMPLES = 2048
+# With several API workers, each one writes its metrics here every
+# METRICS_FLUSH_SECONDS, and /metrics and /stats merge them, whichever
+# worker answers. Empty: every worker reports only itself.
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class Histogram:
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.count = 0
+        self.total = 0.0
+        self._recent = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self._recent.append(value)
+
+    def percentile(self, pct: float) -> float:
+        with self._lock:
+            recent = list(self._recent)
+        return percentile(recent, pct)
+
+    def state(self) -> dict:
+        with self._lock:
+            return {"count": self.count, "total": self.total, "samples": list(self._recent)}
+
+    def summary(self) -> dict:
+        return _summary(self.state())
+
+
+def _summary(state: dict) -> dict:
+    return {
+        "count": state["count"],
+        "mean": state["total"] / state["count"] if state["count"] else 0.0,
+        "p50": percentile(state["samples"], 50),
+        "p95": percentile(state["samples"], 95),
+        "p99": percentile(state["samples"], 99),
+    }
+
+
+_histograms = defaultdict(Histogram)
+_histograms_lock = threading.Lock()
+
+
+def histogram(name: str) -> Histogram:
+    with _histograms_lock:
+        return _histograms[name]
+
+
+def observe(name: str, value: float):
+    histogram(name).observe(value)
+
+
+_counters = defaultdict(int)
+
+
+def increment(name: str, value: int = 1):
+    with _histograms_lock:
+        _counters[name] += value
+
+
+def _local_state() -> dict:
+    with _histograms_lock:
+        items = list(_histograms.items())
+        counter_items = dict(_counters)
+    return {"histograms": {name: hist.state() for name, hist in items}, "counters": counter_items}
+
+
+_exporting = False
+
+
+def _export_path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+def _export_loop():
+    path = _export_path(os.getpid())
+    while True:
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump(_local_state(), f)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            logger.warning("Could not write metrics to %s", path, exc_info=True)
+        time.sleep(METRICS_FLUSH_SECONDS)
+
+
+def start_metrics_export():
+    """Share this process's metrics with its sibling workers through METRICS_DIR."""
+    global _exporting
+    if not METRICS_DIR or _exporting:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    # Files left behind by workers that were killed.
+    for entry in os.scandir(METRICS_DIR):
+        try:
+            if entry.stat().st_mtime < time.time() - 3600:
+                os.remove(entry.path)
+        except OSError:
+            pass
+    _exporting = True
+    threading.Thread(target=_export_loop, name="metrics-export", daemon=True).start()
+
+
+def stop_metrics_export():
+    if _exporting:
+        try:
+            os.remove(_export_path(os.getpid()))
+        except OSError:
+            pass
+
+
+def _state() -> dict:
+    """This process's metrics, plus its live sibling workers' when exporting."""
+    state = _local_state()
+    if not _exporting:
+        return state
+    histograms, counter_items = state["histograms"], state["counters"]
+    cutoff = time.time() - 3 * METRICS_FLUSH_SECONDS
+    for entry in os.scandir(METRICS_DIR):
+        # Our own file lags behind the live numbers; stale files belong to
+        # workers that have exited.
+        if not entry.name.endswith(".json") or entry.path == _export_path(os.getpid()):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                continue
+            with open(entry.path) as f:
+                other = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, hist in other["histograms"].items():
+            merged = histograms.setdefault(name, {"count": 0, "total": 0.0, "samples": []})
+            merged["count"] += hist["count"]
+            merged["total"] += hist["total"]
+            merged["samples"] = merged["samples"] + hist["samples"]
+        for name, value in other["counters"].items():
+            counter_items[name] = counter_items.get(name, 0) + value
+    return state
+
+
+def counters() -> dict:
+    return dict(sorted(_state()["counters"].items()))
+
+
+def snapshot() -> dict:
+    return {name: _summary(hist) for name, hist in sorted(_state()["histograms"].items())}
+
+
+# Stage durations of the request being served, for the Server-Timing header.
+# asyncio.to_thread copies the context, so stages run in worker threads are
+# attributed to the request that started them.
+_request_stages: ContextVar[Optional[dict]] = ContextVar("request_stages", default=None)
+_stages_lock = threading.Lock()
+
+
+def start_request() -> dict:
+    stages = {}
+    _request_stages.set(stages)
+    return stages
+
+
+def record(name: str, seconds: float):
+    observe(name, seconds)
+    stages = _request_stages.get()
+    if stages is not None:
+        with _stages_lock:
+            stages[name] = stages.get(name, 0.0) + seconds
+
+
+class timer:
+    """Time a block or a function into the ``name`` histogram.
+
+        with timer("embed_seconds"):
+            ...
+
+        @timer("history_read_seconds")
+        def get_history(...):
+            ...
+
+    Works on coroutine functions too.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self._starts = threading.local()
+
+    def __enter__(self):
+        self._starts.__dict__.setdefault("stack", []).append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._starts.stack.pop()
+        record(self.name, self.seconds)
+        return False
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def _async(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    record(self.name, time.perf_counter() - start)
+            return _async
+
+        @functools.wraps(func)
+        def _sync(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(self.name, time.perf_counter() - start)
+        return _sync
+
+
+_iter_stack = threading.local()
+
+
+def timed_iter(name: str, iterable: Iterable) -> Iterator:
+    """Yield from ``iterable``, recording the total time spent producing items.
+
+    Time spent inside a nested timed_iter is excluded, so wrapping a loader
+    in one and the splitter pulling from it in another gives separate parse
+    and split totals. The total is recorded once, when the iterator ends.
+    """
+    stack = _iter_stack.__dict__.setdefault("stack", [])
+    iterator = iter(iterable)
+    total = 0.0
+    try:
+        while True:
+            frame = [0.0]  # time spent in nested timed iterators
+            stack.append(frame)
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - start
+                stack.pop()
+                total += elapsed - frame[0]
+                if stack:
+                    stack[-1][0] += elapsed
+            yield item
+    finally:
+        record(name, total)
+
+
+_PROMETHEUS_NAME = re.compile(r"[^a-zA-Z0-9_:]")
+PROMETHEUS_PREFIX = "csv_ai_"
+
+
+def prometheus_text() -> str:
+    """All histograms (as summaries) and counters in Prometheus text format."""
+    lines = []
+    state = _state()
+    histograms = sorted(state["histograms"].items())
+    counter_items = sorted(state["counters"].items())
+    for name, hist in histograms:
+        metric = PROMETHEUS_PREFIX + _PROMETHEUS_NAME.sub("_", name)
+        lines.append(f"# TYPE {metric} summary")
+        for quantile in (0.5, 0.95, 0.99):
+            lines.append(f'{metric}{{quantile="{quantile}"}} {percentile(hist["samples"], quantile * 100)}')
+        lines.append(f"{metric}_sum {hist['total']}")
+        lines.append(f"{metric}_count {hist['count']}")
+    for name, value in counter_items:
+        metric = PROMETHEUS_PREFIX + _PROMETHEUS_NAME.sub("_", name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0"):
+    """Serve this process's ``GET /metrics`` from a background thread.
+
+    For processes without their own web API (the Streamlit UI). Only the
+    first call starts a server.
+    """
+    global _metrics_server
+    if _metrics_server is None:
+        with _metrics_server_lock:
+            if _metrics_server is None:
+                try:
+                    _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+                except OSError as e:
+                    logger.warning("Could not serve metrics on %s:%d: %s", host, port, e)
+                    _metrics_server = False
+                    return
+                _metrics_server.daemon_threads = True
+                threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+                logger.info("Serving metrics on http://%s:%d/metrics", host, port)
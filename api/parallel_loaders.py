@@ -0,0 +1,139 @@
+import os
+import math
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, Tuple
+
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+LOADER_WORKERS = int(os.getenv("LOADER_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+# Workers are spawned rather than forked: the API process already runs
+# threads (embedding, upserts) that a fork would copy mid-flight.
+LOADER_START_METHOD = os.getenv("LOADER_START_METHOD", "spawn")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=LOADER_WORKERS,
+                    mp_context=multiprocessing.get_context(LOADER_START_METHOD),
+                )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# Worker functions run in the pool and return plain tuples, so only text
+# crosses the process boundary.
+
+def _pdf_pages(path: str, first: int, last: int) -> List[Tuple[int, str]]:
+    import fitz
+    with fitz.open(path) as doc:
+        return [(number, doc[number].get_text()) for number in range(first, last)]
+
+
+def _excel_sheet(path: str, sheet: str) -> str:
+    import pandas as pd
+    frame = pd.read_excel(path, sheet_name=sheet, header=None, dtype=str)
+    return frame.dropna(how="all").to_csv(sep="\t", index=False, header=False, na_rep="")
+
+
+def _excel_frame(path: str, sheet: str, dtype=str):
+    import pandas as pd
+    return pd.read_excel(path, sheet_name=sheet, dtype=dtype).dropna(how="all")
+
+
+def _run(tasks: list) -> Iterator[tuple]:
+    """Yield ``(key, result)`` for ``(key, func, *args)`` tasks as they finish.
+
+    A single task runs inline; there is nothing to overlap it with.
+    """
+    if not tasks:
+        return
+    if len(tasks) == 1:
+        key, func, *args = tasks[0]
+        yield key, func(*args)
+        return
+    pool = get_pool()
+    futures = {pool.submit(func, *args): key for key, func, *args in tasks}
+    try:
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def pdf_task_size(total_pages: int, workers: int = LOADER_WORKERS) -> int:
+    # Enough tasks to keep every worker busy, capped so each range stays
+    # large enough that reopening the file per task is negligible.
+    return max(1, min(PDF_PAGES_PER_TASK, math.ceil(total_pages / (workers * 2))))
+
+
+def iter_pdf_documents(path: str, pages_per_task: int = None) -> Iterator[Document]:
+    """One Document per page, like PyMuPDFLoader, with page ranges extracted in parallel.
+
+    Pages are yielded as their range finishes, so they may arrive out of
+    order; ``metadata["page"]`` gives the position.
+    """
+    import fitz
+    with fitz.open(path) as doc:
+        total_pages = doc.page_count
+        doc_metadata = {key: value for key, value in (doc.metadata or {}).items() if value}
+    pages_per_task = pages_per_task or pdf_task_size(total_pages)
+
+    tasks = [
+        (first, _pdf_pages, path, first, min(first + pages_per_task, total_pages))
+        for first in range(0, total_pages, pages_per_task)
+    ]
+    for _, pages in _run(tasks):
+        for number, text in pages:
+            yield Document(page_content=text, metadata={
+                **doc_metadata, "source": path, "file_path": path, "page": number, "total_pages": total_pages,
+            })
+
+
+def sheet_names(path: str) -> List[str]:
+    import pandas as pd
+    with pd.ExcelFile(path) as workbook:
+        return list(workbook.sheet_names)
+
+
+def iter_excel_frames(path: str, dtype=str) -> Iterator[tuple]:
+    """Yield ``(sheet_name, DataFrame)`` per sheet as each one is parsed.
+
+    Cells are read as text unless ``dtype`` says otherwise (``None`` lets
+    pandas infer column types).
+    """
+    sheets = sheet_names(path)
+    tasks = [(sheet, _excel_frame, path, sheet, dtype) for sheet in sheets]
+    yield from _run(tasks)
+
+
+def iter_excel_documents(path: str) -> Iterator[Document]:
+    """One Document per sheet, sheets parsed in parallel."""
+    sheets = sheet_names(path)
+
+    tasks = [(index, _excel_sheet, path, sheet) for index, sheet in enumerate(sheets)]
+    for index, text in _run(tasks):
+        if text.strip():
+            yield Document(page_content=text, metadata={
+                "source": path, "page_name": sheets[index], "page_number": index + 1,
+            })
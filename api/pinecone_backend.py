@@ -0,0 +1,22 @@
+import uuid
+from typing import List, Optional
+
+from langchain_pinecone import PineconeVectorStore
+
+
+class PineconeBackend(PineconeVectorStore):
+    """PineconeVectorStore that can also upsert precomputed embeddings."""
+
+    def add_embeddings(self, texts: List[str], embeddings: List[List[float]], metadatas: Optional[List[dict]] = None, batch_size: int = 100) -> List[str]:
+        ids = [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = [
+            (vector_id, list(vector), {**metadata, self._text_key: text})
+            for vector_id, text, vector, metadata in zip(ids, texts, embeddings, metadatas)
+        ]
+        async_res = [
+            self.index.upsert(vectors=vectors[i:i + batch_size], namespace=self._namespace, async_req=True)
+            for i in range(0, len(vectors), batch_size)
+        ]
+        [res.get() for res in async_res]
+        return ids
@@ -0,0 +1,233 @@
+from collections import Counter
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from api.loaders import iter_csv_frames, CSV_ROWS_PER_BLOCK
+from api.parallel_loaders import iter_excel_frames, sheet_names
+
+# Per numeric column, quantiles and outlier rates are estimated from a
+# uniform sample of at most this many values.
+QUANTILE_SAMPLE_SIZE = 10000
+# Distinct values tracked exactly per categorical column before the count is
+# reported as a lower bound.
+MAX_TRACKED_VALUES = 10000
+NULL_RATIO_FLAG = 0.5
+MAX_SAMPLE_CELL_CHARS = 100
+# Tukey's "far out" fences: values more than this many IQRs outside the
+# quartiles are flagged.
+OUTLIER_IQR_FACTOR = 3.0
+
+
+def _bottom_k(keys: np.ndarray, k: int) -> np.ndarray:
+    if len(keys) <= k:
+        return np.arange(len(keys))
+    return np.argpartition(keys, k - 1)[:k]
+
+
+class _ColumnStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.dtypes = set()
+        self.count = 0
+        self.nulls = 0
+        # numeric
+        self.numeric_count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = None
+        self.max = None
+        self.sample = np.empty(0)
+        self.sample_keys = np.empty(0)
+        # categorical
+        self.values = Counter()
+        self.values_truncated = False
+
+    def update(self, series: pd.Series, rng: np.random.Generator):
+        self.dtypes.add(str(series.dtype))
+        self.count += len(series)
+        nulls = int(series.isna().sum())
+        self.nulls += nulls
+        values = series.dropna()
+        if values.empty:
+            return
+
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            array = values.to_numpy(dtype=np.float64)
+            self.numeric_count += len(array)
+            self.total += float(array.sum())
+            self.total_sq += float(np.square(array).sum())
+            low, high = float(array.min()), float(array.max())
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+            keys = np.concatenate([self.sample_keys, rng.random(len(array))])
+            sample = np.concatenate([self.sample, array])
+            keep = _bottom_k(keys, QUANTILE_SAMPLE_SIZE)
+            self.sample, self.sample_keys = sample[keep], keys[keep]
+        else:
+            counts = values.astype(str).value_counts()
+            if self.values_truncated or len(self.values) + len(counts) > MAX_TRACKED_VALUES:
+                # Keep only values already tracked plus the chunk's most
+                # frequent ones; counts become approximate past this point.
+                self.values_truncated = True
+                self.values.update(counts.head(MAX_TRACKED_VALUES // 10).to_dict())
+                self.values = Counter(dict(self.values.most_common(MAX_TRACKED_VALUES)))
+            else:
+                self.values.update(counts.to_dict())
+
+    @property
+    def is_numeric(self) -> bool:
+        return self.numeric_count > 0 and not self.values
+
+    def to_dict(self, total_rows: int, top_k: int) -> dict:
+        profile = {
+            "name": self.name,
+            "dtype": "/".join(sorted(self.dtypes)),
+            "nulls": self.nulls,
+            "null_ratio": self.nulls / total_rows if total_rows else 0.0,
+            "flags": [],
+        }
+        if self.is_numeric:
+            mean = self.total / self.numeric_count
+            variance = max(self.total_sq / self.numeric_count - mean * mean, 0.0)
+            std = variance ** 0.5
+            q25, q50, q75 = np.quantile(self.sample, [0.25, 0.5, 0.75]) if len(self.sample) else (None,) * 3
+            profile.update(min=self.min, max=self.max, mean=mean, std=std, p25=q25, p50=q50, p75=q75)
+            if len(self.sample) and q75 > q25:
+                fence = OUTLIER_IQR_FACTOR * (q75 - q25)
+                outside = (self.sample < q25 - fence) | (self.sample > q75 + fence)
+                outliers = round(float(np.mean(outside)) * self.numeric_count)
+                if outliers:
+                    profile["flags"].append(f"~{outliers} far outliers (beyond {OUTLIER_IQR_FACTOR:g} IQR)")
+            if self.min == self.max:
+                profile["flags"].append("constant")
+        else:
+            distinct = len(self.values)
+            profile["distinct"] = f">={distinct}" if self.values_truncated else distinct
+            profile["top_values"] = self.values.most_common(top_k)
+            non_null = self.count - self.nulls
+            if distinct == 1:
+                profile["flags"].append("constant")
+            elif not self.values_truncated and non_null > 1 and distinct == non_null:
+                profile["flags"].append("all values unique (identifier?)")
+        if len(self.dtypes) > 1:
+            profile["flags"].append("mixed types across the file")
+        if profile["null_ratio"] >= NULL_RATIO_FLAG:
+            profile["flags"].append(f"{profile['null_ratio']:.0%} missing")
+        return profile
+
+
+def profile_frames(frames: Iterable[pd.DataFrame], top_k: int = 5, sample_rows: int = 20, seed: int = 0) -> dict:
+    """Profile a dataset in one pass over its chunks.
+
+    Returns per-column statistics (dtype, nulls, min/max/mean/std and
+    quantiles for numeric columns, top values for the rest, anomaly flags)
+    and a small row sample stratified on a low-cardinality column.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    rows = 0
+    pool_size = max(sample_rows * 50, 1000)
+    pool = None
+    pool_keys = np.empty(0)
+
+    for frame in frames:
+        rows += len(frame)
+        for name in frame.columns:
+            if name not in columns:
+                columns[name] = _ColumnStats(str(name))
+            columns[name].update(frame[name], rng)
+
+        keys = np.concatenate([pool_keys, rng.random(len(frame))])
+        candidates = frame if pool is None else pd.concat([pool, frame], ignore_index=True)
+        keep = _bottom_k(keys, pool_size)
+        pool, pool_keys = candidates.iloc[keep].reset_index(drop=True), keys[keep]
+
+    column_profiles = [stats.to_dict(rows, top_k) for stats in columns.values()]
+    sample, strata = _stratified_sample(pool, columns, sample_rows, rng)
+    return {
+        "rows": rows,
+        "columns": column_profiles,
+        "sample": sample,
+        "stratified_by": strata,
+    }
+
+
+def _stratified_sample(pool: Optional[pd.DataFrame], columns: dict, size: int, rng: np.random.Generator):
+    if pool is None or pool.empty:
+        return pd.DataFrame(), None
+    strata = next(
+        (name for name, stats in columns.items()
+         if not stats.is_numeric and not stats.values_truncated and 2 <= len(stats.values) <= 20),
+        None
+    )
+    if strata is None or size >= len(pool):
+        return pool.head(size), None
+
+    groups = pool.groupby(pool[strata].astype(str), dropna=False, sort=False)
+    per_group = max(1, size // groups.ngroups)
+    parts = [group.iloc[rng.permutation(len(group))[:per_group]] for _, group in groups]
+    return pd.concat(parts).head(size), str(strata)
+
+
+def profile_csv(path: str, chunksize: int = CSV_ROWS_PER_BLOCK, **kwargs) -> dict:
+    return profile_frames(iter_csv_frames(path, chunksize), **kwargs)
+
+
+def profile_excel(path: str, **kwargs) -> dict:
+    """Profile each non-empty sheet; returns ``{sheet_name: profile}`` in workbook order."""
+    frames = dict(iter_excel_frames(path, dtype=None))
+    return {
+        sheet: profile_frames([frames[sheet]], **kwargs)
+        for sheet in sheet_names(path) if not frames[sheet].empty
+    }
+
+
+def _fmt(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+
+def render_profile(profile: dict) -> str:
+    """Render a profile as compact Markdown for the summary prompt."""
+    lines = [f"Rows: {profile['rows']}", f"Columns: {len(profile['columns'])}", ""]
+
+    numeric = [c for c in profile["columns"] if "mean" in c]
+    other = [c for c in profile["columns"] if "mean" not in c]
+    if numeric:
+        lines.append("Numeric columns:")
+        lines.append("| column | dtype | nulls | min | p25 | median | p75 | max | mean | std |")
+        lines.append("|---|---|---|---|---|---|---|---|---|---|")
+        for c in numeric:
+            lines.append("| " + " | ".join(_fmt(v) for v in (
+                c["name"], c["dtype"], c["nulls"], c["min"], c["p25"], c["p50"], c["p75"], c["max"], c["mean"], c["std"]
+            )) + " |")
+        lines.append("")
+    if other:
+        lines.append("Other columns:")
+        lines.append("| column | dtype | nulls | distinct | top values (count) |")
+        lines.append("|---|---|---|---|---|")
+        for c in other:
+            top = ", ".join(f"{value} ({count})" for value, count in c["top_values"])
+            lines.append(f"| {c['name']} | {c['dtype']} | {c['nulls']} | {c['distinct']} | {top} |")
+        lines.append("")
+
+    flagged = [c for c in profile["columns"] if c["flags"]]
+    if flagged:
+        lines.append("Possible anomalies:")
+        lines.extend(f"- {c['name']}: {'; '.join(c['flags'])}" for c in flagged)
+        lines.append("")
+
+    sample: pd.DataFrame = profile["sample"]
+    if not sample.empty:
+        heading = "Sample rows"
+        if profile["stratified_by"]:
+            heading += f" (stratified by {profile['stratified_by']})"
+        lines.append(heading + ":")
+        sample = sample.map(lambda v: v[:MAX_SAMPLE_CELL_CHARS] if isinstance(v, str) else v)
+        lines.append(sample.to_csv(index=False).strip())
+    return "\n".join(lines)
@@ -0,0 +1,62 @@
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+
+structured_summary_prompt = PromptTemplate.from_template("""
+        You are a helpful AI assistant. Summarize the following content in a **structured and detailed Markdown format**.
+
+        The summary should include:
+        - A high-level overview of the dataset
+        - Key statistics (means, counts, etc.)
+        - Notable trends or patterns
+        - Anomalies or issues
+        - Final conclusion
+
+        If possible, use:
+        - `###` headings for sections
+        - Bullet points
+        - Code blocks (```python) for examples
+        - Tables if relevant
+
+        --- Begin Dataset Content ---
+        {input}
+        --- End Dataset Content ---
+
+        Return only the structured summary.
+        """)
+
+# Map step of the map-reduce summarizer: one call per batch of chunks.
+chunk_summary_prompt = PromptTemplate.from_template("""
+        You are summarizing one part of a larger dataset. Write concise notes on this part:
+        the columns and kinds of values present, counts and ranges you can see, recurring
+        patterns, and anything that looks anomalous. Keep concrete numbers and names.
+
+        --- Begin Dataset Part ---
+        {input}
+        --- End Dataset Part ---
+
+        Return only the notes.
+        """)
+
+# Intermediate reduce step: merges several partial summaries into one.
+combine_summary_prompt = PromptTemplate.from_template("""
+        The following are notes on different parts of the same dataset. Merge them into a
+        single set of notes. Combine counts and ranges where possible, keep concrete numbers,
+        and drop repetition.
+
+        --- Begin Notes ---
+        {input}
+        --- End Notes ---
+
+        Return only the merged notes.
+        """)
+
+chat_format_hint = """
+Please format your answer using **Markdown**:
+- Use bullet points for lists
+- Use tables for tabular data
+- Wrap code (e.g. Python, SQL) in triple backticks (```python)
+"""
+
+chat_prompt = ChatPromptTemplate.from_messages([
+    ("system", f"You are a helpful data assistant. Use the following conversation history and file context to answer the user's question. {chat_format_hint}"),
+    ("user", "History:\n{history}\n\nContext:\n{context}\n\nQuestion: {question}")
+])
@@ -0,0 +1,132 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query.lower()).strip().rstrip("?.! ")
+
+
+class _FileEntries:
+    def __init__(self):
+        self.entries = OrderedDict()  # normalized query -> (unit vector, result, created)
+        self._matrix = None
+
+    def matrix(self) -> Tuple[List[str], np.ndarray]:
+        if self._matrix is None:
+            keys = list(self.entries)
+            vectors = [self.entries[key][0] for key in keys]
+            self._matrix = (keys, np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32))
+        return self._matrix
+
+    def changed(self):
+        self._matrix = None
+
+
+class QueryCache:
+    """Per-file cache of retrieval results, in front of the vector search.
+
+    Lookups try the normalized query text first (exact layer), then any
+    cached query whose embedding has cosine similarity of at least
+    ``threshold`` with the new one (semantic layer). Each file keeps at most
+    ``max_entries`` queries, evicted least-recently-used first; entries
+    expire after ``ttl`` seconds and at most ``max_files`` files are kept.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 600.0, threshold: float = 0.95, max_files: int = 1000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self.max_files = max_files
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _file(self, file_id: str, create: bool = False) -> Optional[_FileEntries]:
+        entries = self._files.get(file_id)
+        if entries is None and create:
+            entries = self._files[file_id] = _FileEntries()
+            while len(self._files) > self.max_files:
+                self._files.popitem(last=False)
+        if entries is not None:
+            self._files.move_to_end(file_id)
+        return entries
+
+    def get_exact(self, file_id: str, query: str) -> Optional[List[str]]:
+        key = normalize_query(query)
+        with self._lock:
+            entries = self._file(file_id)
+            entry = entries.entries.get(key) if entries else None
+            if entry is None:
+                return None
+            if self._expired(entry[2]):
+                del entries.entries[key]
+                entries.changed()
+                return None
+            entries.entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry[1]
+
+    def get_similar(self, file_id: str, vector) -> Optional[List[str]]:
+        """Best cached result within the cosine threshold; counts a miss otherwise."""
+        query = _unit(vector)
+        with self._lock:
+            entries = self._file(file_id)
+            if entries and entries.entries:
+                keys, matrix = entries.matrix()
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                key = keys[best]
+                entry = entries.entries[key]
+                if scores[best] >= self.threshold and not self._expired(entry[2]):
+                    entries.entries.move_to_end(key)
+                    self.semantic_hits += 1
+                    return entry[1]
+            self.misses += 1
+            return None
+
+    def put(self, file_id: str, query: str, vector, result: List[str]):
+        key = normalize_query(query)
+        with self._lock:
+            entries = self._file(file_id, create=True)
+            entries.entries[key] = (_unit(vector), result, time.time())
+            entries.entries.move_to_end(key)
+            while len(entries.entries) > self.max_entries:
+                entries.entries.popitem(last=False)
+            entries.changed()
+
+    def invalidate(self, file_id: str):
+        with self._lock:
+            self._files.pop(file_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "files": len(self._files),
+                "entries": sum(len(entries.entries) for entries in self._files.values()),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "threshold": self.threshold,
+            }
+
+
+def _unit(vector) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
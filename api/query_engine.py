@@ -0,0 +1,282 @@
+import re
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from api.metrics import observe
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES = {
+    "average": "mean", "avg": "mean", "mean": "mean",
+    "sum": "sum", "total": "sum",
+    "maximum": "max", "max": "max", "highest": "max", "largest": "max", "biggest": "max",
+    "minimum": "min", "min": "min", "lowest": "min", "smallest": "min",
+    "median": "median",
+    "standard deviation": "std", "std": "std",
+}
+AGG_LABELS = {
+    "mean": "Average", "sum": "Total", "max": "Maximum", "min": "Minimum",
+    "median": "Median", "std": "Standard deviation", "nunique": "Distinct values",
+}
+_AGG_PATTERN = "|".join(sorted((re.escape(word) for word in AGGREGATES), key=len, reverse=True))
+
+OPERATORS = {
+    ">=": ">=", "<=": "<=", "!=": "!=", "==": "==", "=": "==", ">": ">", "<": "<",
+    "is not": "!=", "not equal to": "!=",
+    "greater than or equal to": ">=", "at least": ">=",
+    "less than or equal to": "<=", "at most": "<=",
+    "greater than": ">", "more than": ">", "above": ">", "over": ">",
+    "less than": "<", "below": "<", "under": "<",
+    "equals": "==", "equal to": "==", "is": "==",
+}
+_OP_PATTERN = "|".join(sorted((re.escape(op) for op in OPERATORS), key=len, reverse=True))
+
+# Questions that need reasoning, plotting or free text go to the agent even
+# if they mention a column and an aggregate.
+NO_MATCH = "No rows match the filters."
+
+_AGENT_ONLY = re.compile(r"\b(why|explain|plot|chart|graph|visuali[sz]e|trend|correlat\w*|predict\w*|compare|insight\w*|summar\w*)\b")
+
+_COLUMN = r"\{c(\d+)\}"
+_QUOTED = re.compile(r"(?<!\w)('[^']*'|\"[^\"]*\")(?!\w)")
+_FILTER_CLAUSE = re.compile(rf"{_COLUMN}\s+({_OP_PATTERN})\s+(\{{q\d+\}}|[\w.\-]+)", re.IGNORECASE)
+_FILTER_START = re.compile(r"\b(where|with|whose|for which|when|if)\b\s+(?=\{c\d+\})", re.IGNORECASE)
+_GROUP = rf"(?:\s+(?:by|per|for each|for every|grouped by|across)\s+{_COLUMN})?"
+
+
+@dataclass
+class QueryPlan:
+    op: str
+    column: Optional[str] = None
+    agg: Optional[str] = None
+    group_by: Optional[str] = None
+    n: Optional[int] = None
+    ascending: bool = False
+    filters: List[Tuple[str, str, str]] = field(default_factory=list)
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().replace("_", " ").replace("-", " ")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _mark_columns(question: str, columns) -> Tuple[str, List[str], List[str]]:
+    """Replace quoted values with ``{qN}`` and column names with ``{cN}`` placeholders.
+
+    Column names match regardless of case and of spaces, ``_`` or ``-``
+    between words; the rest of the question is left as typed so that filter
+    values keep their case, dashes and signs.
+    """
+    literals = []
+
+    def quote(match) -> str:
+        literals.append(match.group(0)[1:-1])
+        return f"{{q{len(literals) - 1}}}"
+
+    text = _QUOTED.sub(quote, question)
+    text = " " + re.sub(r"\s+", " ", text).strip().rstrip("?.! ") + " "
+    found = []
+    for column in sorted(columns, key=lambda c: len(str(c)), reverse=True):
+        words = _normalize(str(column)).split()
+        if not words:
+            continue
+        name = r"[\s_\-]+".join(re.escape(word) for word in words)
+        pattern = re.compile(rf"(?<![\w{{\-]){name}(?![\w}}\-])", re.IGNORECASE)
+        if pattern.search(text):
+            text = pattern.sub(f"{{c{len(found)}}}", text)
+            found.append(column)
+    return text.strip(), found, literals
+
+
+def parse_question(question: str, columns) -> Optional[QueryPlan]:
+    """Map a simple question onto a QueryPlan, or None if it is not one we handle."""
+    text, found, literals = _mark_columns(question, columns)
+    if _AGENT_ONLY.search(text.lower()):
+        return None
+
+    def col(index: Optional[str]) -> Optional[str]:
+        return found[int(index)] if index is not None else None
+
+    filters = []
+    start = _FILTER_START.search(text)
+    if start:
+        clause_text = text[start.end():]
+        clauses = re.split(r"\s+and\s+", clause_text, flags=re.IGNORECASE)
+        for clause in clauses:
+            match = _FILTER_CLAUSE.fullmatch(clause.strip())
+            if not match:
+                return None
+            index, op, value = match.groups()
+            literal = re.fullmatch(r"\{q(\d+)\}", value)
+            filters.append((col(index), OPERATORS[op.lower()], literals[int(literal.group(1))] if literal else value))
+        text = text[:start.start()].strip()
+    # Filter values are out of the text now; the rest only has to match keywords.
+    text = _normalize(text)
+
+    text = re.sub(r"^(what is|what's|what are|show me|show|give me|find|get|tell me|list|calculate|compute)\s+", "", text)
+    text = re.sub(r"\b(the|of all|all)\s+", "", text).strip()
+
+    def plan(**kwargs) -> QueryPlan:
+        return QueryPlan(filters=filters, **kwargs)
+
+    if re.fullmatch(rf"(how many|number of|count|count of|total number of)\s+(rows|records|entries|lines)(?: in (?:data|dataset|file|table))?{_GROUP}", text) \
+            or re.fullmatch(rf"(row count|rows count){_GROUP}", text):
+        group = re.search(_COLUMN + r"$", text)
+        return plan(op="count", group_by=col(group.group(1)) if group else None)
+
+    if not filters:
+        if re.fullmatch(r"(how many|number of)\s+(columns|fields)(?: in (?:data|dataset|file|table))?", text):
+            return plan(op="n_columns")
+        if re.fullmatch(r"(which|what)?\s*(are )?(columns|fields|column names)(?: in (?:data|dataset|file|table))?", text):
+            return plan(op="columns")
+        if re.fullmatch(r"(shape|dimensions|size)(?: of (?:data|dataset|file|table))?", text):
+            return plan(op="shape")
+
+    match = re.fullmatch(rf"(?:how many\s+|number of\s+|count of\s+)?(?:unique|distinct)\s+(?:values\s+(?:of|in)\s+)?{_COLUMN}(?:\s+values)?{_GROUP}", text)
+    if match:
+        return plan(op="agg", agg="nunique", column=col(match.group(1)), group_by=col(match.group(2)))
+
+    match = re.fullmatch(rf"(?:(?:top\s+(\d+)\s+)?most (?:common|frequent)(?:\s+values?)?\s+(?:in|of|for)\s+|value counts (?:of|for)\s+){_COLUMN}", text)
+    if match:
+        return plan(op="value_counts", column=col(match.group(2)), n=int(match.group(1) or 5))
+
+    match = re.fullmatch(
+        rf"(top|bottom|highest|lowest|largest|smallest)\s+(\d+)\s+(?:(rows|records|entries)|{_COLUMN})\s+(?:by|in terms of|based on)\s+(?:({_AGG_PATTERN})\s+)?{_COLUMN}",
+        text
+    )
+    if match:
+        direction, n, rows, group, agg_word, target = match.groups()
+        ascending = direction in ("bottom", "lowest", "smallest")
+        if rows or group is None:
+            if agg_word:
+                return None
+            return plan(op="top", column=col(target), n=int(n), ascending=ascending)
+        return plan(
+            op="top_groups", column=col(target), group_by=col(group), n=int(n), ascending=ascending,
+            agg=AGGREGATES[agg_word] if agg_word else "sum"
+        )
+
+    match = re.fullmatch(rf"({_AGG_PATTERN})\s+(?:value\s+)?(?:of\s+|in\s+|for\s+)?{_COLUMN}{_GROUP}", text)
+    if match:
+        agg_word, target, group = match.groups()
+        return plan(op="agg", agg=AGGREGATES[agg_word], column=col(target), group_by=col(group))
+
+    return None
+
+
+def _filter(df: pd.DataFrame, filters) -> pd.DataFrame:
+    mask = pd.Series(True, index=df.index)
+    for column, op, raw in filters:
+        series = df[column]
+        if pd.api.types.is_numeric_dtype(series):
+            value = float(raw)
+        else:
+            series = series.astype(str).str.lower()
+            value = raw.lower()
+        if op == "==":
+            mask &= series == value
+        elif op == "!=":
+            mask &= series != value
+        elif op == ">":
+            mask &= series > value
+        elif op == ">=":
+            mask &= series >= value
+        elif op == "<":
+            mask &= series < value
+        elif op == "<=":
+            mask &= series <= value
+    return df[mask]
+
+
+def execute(df: pd.DataFrame, plan: QueryPlan):
+    # Compact frames hold low-cardinality text as ``category``. observed=True
+    # keeps groups (and counts) to the values present in the filtered rows
+    # rather than every category of the column.
+    if plan.filters:
+        df = _filter(df, plan.filters)
+        if df.empty:
+            # More likely a misread question than a real answer.
+            raise ValueError(NO_MATCH)
+
+    if plan.op == "count":
+        if plan.group_by is not None:
+            return df.groupby(plan.group_by, observed=True, sort=False).size().sort_values(ascending=False).rename("rows")
+        return len(df)
+    if plan.op == "n_columns":
+        return df.shape[1]
+    if plan.op == "columns":
+        return pd.Series([str(dtype) for dtype in df.dtypes], index=df.columns, name="dtype")
+    if plan.op == "shape":
+        return {"rows": df.shape[0], "columns": df.shape[1]}
+    if plan.op == "value_counts":
+        counts = df[plan.column].value_counts()
+        counts = counts[counts > 0]
+        # Break ties by value: a categorical column would otherwise rank them
+        # in category order and plain text in order of first appearance.
+        counts.index = counts.index.astype(object)
+        try:
+            counts = counts.sort_index().sort_values(ascending=False, kind="stable")
+        except TypeError:
+            pass
+        return counts.head(plan.n)
+    if plan.op == "top":
+        if plan.ascending:
+            return df.nsmallest(plan.n, plan.column)
+        return df.nlargest(plan.n, plan.column)
+    if plan.op == "top_groups":
+        grouped = df.groupby(plan.group_by, observed=True, sort=False)[plan.column].agg(plan.agg)
+        return grouped.nsmallest(plan.n) if plan.ascending else grouped.nlargest(plan.n)
+    if plan.op == "agg":
+        if plan.group_by is not None:
+            return df.groupby(plan.group_by, observed=True)[plan.column].agg(plan.agg)
+        return df[plan.column].agg(plan.agg)
+    raise ValueError(f"Unknown query op: {plan.op}")
+
+
+def format_result(result, plan: QueryPlan) -> str:
+    if isinstance(result, pd.DataFrame):
+        return result.to_markdown(index=False)
+    if isinstance(result, pd.Series):
+        return result.to_frame().to_markdown()
+    if isinstance(result, dict):
+        return "\n".join(f"- **{key}**: {value}" for key, value in result.items())
+    if plan.op == "count":
+        label = "Number of rows"
+    elif plan.op == "n_columns":
+        label = "Number of columns"
+    else:
+        label = f"{AGG_LABELS.get(plan.agg, plan.agg)} of `{plan.column}`"
+    if isinstance(result, float):
+        result = f"{result:,.4f}".rstrip("0").rstrip(".")
+    return f"**{label}**: {result}"
+
+
+def answer_question(df, question: str) -> Optional[str]:
+    """Answer ``question`` directly from ``df`` if it parses, else return None.
+
+    Only simple aggregate / filter / group-by / top-n questions are handled;
+    anything else (anything that fails to execute, a filter value that does
+    not parse for its column, or filters that match no rows) is left to the
+    LLM agent.
+    """
+    start = time.perf_counter()
+    plan = parse_question(question, list(df.columns))
+    if plan is None:
+        observe("analyze_parse_miss_seconds", time.perf_counter() - start)
+        logger.info("Query engine: no plan for %r (%.1f ms)", question, (time.perf_counter() - start) * 1000)
+        return None
+    try:
+        # Out-of-core frames (api.datasets.LazyFrame) run the plan themselves.
+        result = df.execute_plan(plan) if hasattr(df, "execute_plan") else execute(df, plan)
+        answer = format_result(result, plan)
+    except Exception as e:
+        logger.info("Query engine: plan %s failed for %r: %s", plan, question, e)
+        return None
+    elapsed = time.perf_counter() - start
+    observe("analyze_fast_path_seconds", elapsed)
+    logger.info("Query engine: answered %r without the LLM in %.1f ms", question, elapsed * 1000)
+    return answer
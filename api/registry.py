@@ -0,0 +1,212 @@
+import os
+import uuid
+import threading
+from dotenv import load_dotenv
+from api.vectorstores import LocalVectorStore
+from api.cache import SQLiteCache
+from api.embedding_cache import CachedEmbeddings
+from api.fingerprints import FileRegistry
+from api.query_cache import QueryCache
+from api.bm25 import BM25Store
+
+load_dotenv()
+
+INDEX_NAME = "csv-ai"
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Shared inference worker (python -m api.embedding_server). When set, this
+# process never loads the model itself.
+EMBEDDING_SERVER_URL = os.getenv("EMBEDDING_SERVER_URL", "")
+
+# "pinecone" (default) or "local" for the in-process NumPy store.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", "local_index")
+LOCAL_IVF_MIN_SIZE = int(os.getenv("LOCAL_IVF_MIN_SIZE", "50000"))
+LOCAL_IVF_NPROBE = int(os.getenv("LOCAL_IVF_NPROBE", "8"))
+
+# Set EMBEDDING_CACHE_PATH to an empty string to disable the cache.
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "cache/embeddings.sqlite")
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+
+FILE_REGISTRY_PATH = os.getenv("FILE_REGISTRY_PATH", "cache/files.sqlite")
+
+# Set SUMMARY_CACHE_PATH to an empty string to disable the cache.
+SUMMARY_CACHE_PATH = os.getenv("SUMMARY_CACHE_PATH", "cache/summaries.sqlite")
+SUMMARY_CACHE_MAX_MB = int(os.getenv("SUMMARY_CACHE_MAX_MB", "64"))
+SUMMARY_CACHE_TTL = float(os.getenv("SUMMARY_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Retrieval results per file_id; set QUERY_CACHE_MAX_ENTRIES=0 to disable.
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "600"))
+QUERY_CACHE_THRESHOLD = float(os.getenv("QUERY_CACHE_THRESHOLD", "0.95"))
+QUERY_CACHE_MAX_FILES = int(os.getenv("QUERY_CACHE_MAX_FILES", "1000"))
+
+# Per-file keyword indexes for hybrid retrieval; set BM25_INDEX_DIR to an
+# empty string to use dense search only.
+BM25_INDEX_DIR = os.getenv("BM25_INDEX_DIR", "cache/bm25")
+
+# One embedding model and one vector-store client per process. Everything in
+# the API goes through get_embedding()/get_vectorstore() instead of building
+# its own, so the sentence-transformer weights are loaded exactly once.
+_lock = threading.RLock()
+_ready = threading.Event()
+_embedding = None
+_vectorstore = None
+_embedding_cache = None
+_file_registry = None
+_summary_cache = None
+_query_cache = None
+_bm25_store = None
+
+
+def get_embedding_cache():
+    global _embedding_cache
+    if _embedding_cache is None and EMBEDDING_CACHE_PATH:
+        with _lock:
+            if _embedding_cache is None:
+                _embedding_cache = SQLiteCache(EMBEDDING_CACHE_PATH, max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+    return _embedding_cache
+
+
+def load_local_embedding():
+    # sentence-transformers pulls in torch; import it only when a process
+    # actually runs the model.
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+def get_embedding():
+    global _embedding
+    if _embedding is None:
+        with _lock:
+            if _embedding is None:
+                if EMBEDDING_SERVER_URL:
+                    from api.embedding_client import RemoteEmbeddings
+                    embedding = RemoteEmbeddings(EMBEDDING_SERVER_URL)
+                else:
+                    embedding = load_local_embedding()
+                cache = get_embedding_cache()
+                if cache is not None:
+                    embedding = CachedEmbeddings(embedding, EMBEDDING_MODEL, cache)
+                _embedding = embedding
+    return _embedding
+
+
+def _create_vectorstore():
+    if VECTOR_BACKEND == "pinecone":
+        from api.pinecone_backend import PineconeBackend
+        return PineconeBackend(index_name=INDEX_NAME, embedding=get_embedding())
+    if VECTOR_BACKEND == "local":
+        return LocalVectorStore(
+            embedding=get_embedding(),
+            index_dir=LOCAL_INDEX_DIR,
+            ivf_min_size=LOCAL_IVF_MIN_SIZE,
+            nprobe=LOCAL_IVF_NPROBE
+        )
+    raise ValueError(f"Unknown VECTOR_BACKEND: {VECTOR_BACKEND}")
+
+
+def get_vectorstore():
+    global _vectorstore
+    if _vectorstore is None:
+        with _lock:
+            if _vectorstore is None:
+                _vectorstore = _create_vectorstore()
+    return _vectorstore
+
+
+def get_summary_cache():
+    global _summary_cache
+    if _summary_cache is None and SUMMARY_CACHE_PATH:
+        with _lock:
+            if _summary_cache is None:
+                _summary_cache = SQLiteCache(
+                    SUMMARY_CACHE_PATH,
+                    max_bytes=SUMMARY_CACHE_MAX_MB * 1024 * 1024,
+                    ttl=SUMMARY_CACHE_TTL
+                )
+    return _summary_cache
+
+
+def get_query_cache():
+    global _query_cache
+    if _query_cache is None and QUERY_CACHE_MAX_ENTRIES > 0:
+        with _lock:
+            if _query_cache is None:
+                _query_cache = QueryCache(
+                    max_entries=QUERY_CACHE_MAX_ENTRIES,
+                    ttl=QUERY_CACHE_TTL,
+                    threshold=QUERY_CACHE_THRESHOLD,
+                    max_files=QUERY_CACHE_MAX_FILES
+                )
+    return _query_cache
+
+
+def get_bm25_store():
+    global _bm25_store
+    if _bm25_store is None and BM25_INDEX_DIR:
+        with _lock:
+            if _bm25_store is None:
+                _bm25_store = BM25Store(BM25_INDEX_DIR)
+    return _bm25_store
+
+
+def get_file_registry():
+    global _file_registry
+    if _file_registry is None:
+        with _lock:
+            if _file_registry is None:
+                _file_registry = FileRegistry(FILE_REGISTRY_PATH)
+    return _file_registry
+
+
+# Per-file caches (retrieval results, loaded BM25 indexes) live in each
+# worker process. Changes are announced through the shared file registry
+# and picked up by the other workers before their next lookup.
+_process_token = uuid.uuid4().hex
+_invalidation_seq = None
+_invalidation_lock = threading.Lock()
+
+
+def _forget_cached(file_ids):
+    """Drop local cached state for ``file_ids`` (None means every file)."""
+    cache = get_query_cache()
+    store = get_bm25_store()
+    if file_ids is None:
+        if cache is not None:
+            cache.clear()
+        if store is not None:
+            store.forget_all()
+        return
+    for file_id in file_ids:
+        if cache is not None:
+            cache.invalidate(file_id)
+        if store is not None:
+            store.forget(file_id)
+
+
+def invalidate_file(file_id: str):
+    """Drop cached state for ``file_id`` here and in every other worker."""
+    _forget_cached([file_id])
+    get_file_registry().log_invalidation(file_id, _process_token)
+
+
+def sync_invalidations():
+    """Apply invalidations announced by other workers since the last call."""
+    global _invalidation_seq
+    with _invalidation_lock:
+        _invalidation_seq, file_ids = get_file_registry().invalidations_since(_invalidation_seq, _process_token)
+    if file_ids is None or file_ids:
+        _forget_cached(file_ids)
+
+
+def warm_up():
+    # A first encode pulls the weights into memory and initialises the
+    # tokenizer, so the first real query does not pay for it.
+    get_embedding().embed_query("warm up")
+    get_vectorstore()
+    sync_invalidations()
+    _ready.set()
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
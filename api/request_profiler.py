@@ -0,0 +1,57 @@
+import os
+import time
+import uuid
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Off by default: profiling slows the profiled request down several times.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "cache/profiles")
+
+
+def wants_profile(request) -> bool:
+    """A request opts in with ``?profile=1`` or an ``X-Profile`` header."""
+    if not PROFILING_ENABLED:
+        return False
+    return request.query_params.get("profile") == "1" or "x-profile" in request.headers
+
+
+class RequestProfiler:
+    """pyinstrument when installed (it follows awaits), cProfile otherwise.
+
+    cProfile only sees the event loop thread, and anything else the loop
+    runs while the request is in flight; profile on an otherwise idle server.
+    """
+
+    def __init__(self):
+        try:
+            from pyinstrument import Profiler
+            self._profiler = Profiler(async_mode="enabled")
+            self.kind = "pyinstrument"
+        except ImportError:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self.kind = "cprofile"
+
+    def start(self):
+        if self.kind == "pyinstrument":
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+
+    def stop(self, label: str) -> str:
+        """Stop and write the profile under PROFILE_DIR; returns its path."""
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{uuid.uuid4().hex[:8]}"
+        if self.kind == "pyinstrument":
+            self._profiler.stop()
+            path = os.path.join(PROFILE_DIR, f"{name}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._profiler.output_html())
+        else:
+            self._profiler.disable()
+            path = os.path.join(PROFILE_DIR, f"{name}.prof")
+            self._profiler.dump_stats(path)
+        logger.info("Wrote %s profile to %s", self.kind, path)
+        return path
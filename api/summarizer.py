@@ -0,0 +1,175 @@
+import os
+import time
+import hashlib
+import asyncio
+from typing import AsyncIterator, Iterable, Iterator, List
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.output_parsers import StrOutputParser
+
+from api.loaders import iter_csv_documents, iter_chunks
+from api.parallel_loaders import iter_excel_documents
+from api.profiling import profile_csv, profile_excel, profile_frames, render_profile
+from api.prompts import structured_summary_prompt, chunk_summary_prompt, combine_summary_prompt
+
+MAP_BATCH_CHARS = int(os.getenv("SUMMARY_MAP_BATCH_CHARS", "12000"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+REDUCE_FAN_IN = int(os.getenv("SUMMARY_REDUCE_FAN_IN", "4"))
+
+SUMMARY_MODES = ("profile", "map_reduce", "stuff")
+
+# Changes whenever any of the summary prompts is edited, so cached summaries
+# from older prompts are not served.
+PROMPT_VERSION = hashlib.sha256("\0".join(
+    prompt.template for prompt in (structured_summary_prompt, chunk_summary_prompt, combine_summary_prompt)
+).encode("utf-8")).hexdigest()[:16]
+
+
+def summary_cache_key(file_hash: str, model_name: str, mode: str) -> str:
+    return f"{file_hash}:{model_name}:{mode}:{PROMPT_VERSION}"
+
+
+def batch_texts(texts: Iterable[str], max_chars: int) -> Iterator[str]:
+    batch = []
+    size = 0
+    for text in texts:
+        if batch and size + len(text) > max_chars:
+            yield "\n".join(batch)
+            batch = []
+            size = 0
+        batch.append(text)
+        size += len(text) + 1
+    if batch:
+        yield "\n".join(batch)
+
+
+async def bounded_map(func, items: Iterable, concurrency: int) -> List:
+    """Await ``func(item)`` for every item, at most ``concurrency`` at a time.
+
+    Items are pulled from the iterable only when a slot is free, so a lazy
+    source is never read far ahead of the calls. Results keep input order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results = {}
+
+    async def _run(index, item):
+        try:
+            results[index] = await func(item)
+        finally:
+            semaphore.release()
+
+    tasks = []
+    try:
+        for index, item in enumerate(items):
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(_run(index, item)))
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return [results[index] for index in range(len(tasks))]
+
+
+async def map_reduce_partials(
+    llm,
+    texts: Iterable[str],
+    timings: dict,
+    batch_chars: int = MAP_BATCH_CHARS,
+    concurrency: int = SUMMARY_CONCURRENCY,
+    fan_in: int = REDUCE_FAN_IN,
+) -> str:
+    """Run the map and intermediate reduce stages and return the final input.
+
+    Chunk texts are packed into batches of up to ``batch_chars`` and each
+    batch is summarized concurrently (map). Partial summaries are merged
+    ``fan_in`` at a time until at most ``fan_in`` remain (reduce tree).
+    Input that fits in a single batch is returned as is.
+    """
+    map_chain = chunk_summary_prompt | llm | StrOutputParser()
+    combine_chain = combine_summary_prompt | llm | StrOutputParser()
+    timings.update(map_calls=0, reduce_levels=0, reduce_calls=0)
+
+    batches = batch_texts(texts, batch_chars)
+    first = next(batches, None)
+    second = next(batches, None)
+    if second is None:
+        return first or ""
+
+    def _all_batches():
+        yield first
+        yield second
+        yield from batches
+
+    start = time.perf_counter()
+    partials = await bounded_map(lambda text: map_chain.ainvoke({"input": text}), _all_batches(), concurrency)
+    timings["map_calls"] = len(partials)
+    timings["map_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    while len(partials) > fan_in:
+        groups = ["\n\n".join(partials[i:i + fan_in]) for i in range(0, len(partials), fan_in)]
+        partials = await bounded_map(lambda text: combine_chain.ainvoke({"input": text}), groups, concurrency)
+        timings["reduce_levels"] += 1
+        timings["reduce_calls"] += len(partials)
+    timings["reduce_seconds"] = time.perf_counter() - start
+    return "\n\n".join(partials)
+
+
+async def prepare_summary_input(path: str, filename: str, llm, mode: str, timings: dict) -> str:
+    """Build the ``{input}`` for ``structured_summary_prompt`` from a file on disk.
+
+    ``profile`` renders column statistics and a row sample, so the prompt
+    grows with the number of columns rather than rows; ``map_reduce`` and
+    ``stuff`` work from the raw rows.
+    """
+    is_excel = filename.endswith((".xls", ".xlsx"))
+    if mode == "profile":
+        start = time.perf_counter()
+        if is_excel:
+            profiles = await asyncio.to_thread(profile_excel, path)
+        else:
+            profiles = {None: await asyncio.to_thread(profile_csv, path)}
+        timings["profile_seconds"] = time.perf_counter() - start
+        if len(profiles) <= 1:
+            return render_profile(next(iter(profiles.values()), profile_frames([])))
+        return "\n\n".join(f"## Sheet: {sheet}\n{render_profile(profile)}" for sheet, profile in profiles.items())
+
+    if is_excel:
+        documents = iter_excel_documents(path)
+    else:
+        documents = iter_csv_documents(path)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    texts = (chunk.page_content for chunk in iter_chunks(documents, text_splitter))
+
+    if mode == "stuff":
+        return "\n".join(texts)
+    if mode == "map_reduce":
+        return await map_reduce_partials(llm, texts, timings)
+    raise ValueError(f"Unknown summary mode: {mode}")
+
+
+async def summarize_file(path: str, filename: str, llm, mode: str = "profile"):
+    """Summarize a CSV/Excel file on disk and return ``(summary, timings)``."""
+    timings = {}
+    final_input = await prepare_summary_input(path, filename, llm, mode, timings)
+    start = time.perf_counter()
+    summary = await (structured_summary_prompt | llm | StrOutputParser()).ainvoke({"input": final_input})
+    timings["final_seconds"] = time.perf_counter() - start
+    return summary, timings
+
+
+async def stream_summary(path: str, filename: str, llm, mode: str, timings: dict) -> AsyncIterator[str]:
+    """Like summarize_file, but yields the final summary token by token.
+
+    ``timings`` is filled in as the stages finish, including
+    ``first_token_seconds`` for the final prompt.
+    """
+    final_input = await prepare_summary_input(path, filename, llm, mode, timings)
+    start = time.perf_counter()
+    chain = structured_summary_prompt | llm | StrOutputParser()
+    async for token in chain.astream({"input": final_input}):
+        if "first_token_seconds" not in timings:
+            timings["first_token_seconds"] = time.perf_counter() - start
+        yield token
+    timings["final_seconds"] = time.perf_counter() - start
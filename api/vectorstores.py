@@ -0,0 +1,322 @@
+import json
+import os
+import re
+import hashlib
+import shutil
+import logging
+import threading
+from typing import Iterable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+
+logger = logging.getLogger(__name__)
+
+_SAFE_PARTITION = re.compile(r"[\w-]+")
+DEFAULT_PARTITION = "_default"
+
+
+class _Partition:
+    def __init__(self, path: str):
+        self.path = path
+        self.dim = None
+        self.matrix = None
+        self.docs = []
+        # (centroids, lists, size): IVF index over the first ``size`` rows;
+        # rows appended after the last build are searched exactly until the
+        # index is rebuilt.
+        self.ivf = None
+        # Rows removed by id; the files are append-only, so they are only
+        # skipped at search time.
+        self.deleted = frozenset()
+        self._building = threading.Lock()
+        self.load()
+
+    # Searches run without the store lock. Writers extend ``docs`` first and
+    # only then swap in a larger ``matrix`` (and a new ``ivf`` tuple), so the
+    # rows of whatever matrix a reader picks up always have their docs.
+    # ``deleted`` is likewise replaced, never changed in place.
+    @property
+    def size(self) -> int:
+        return 0 if self.matrix is None else len(self.matrix)
+
+    @property
+    def ivf_size(self) -> int:
+        return 0 if self.ivf is None else self.ivf[2]
+
+    def _map(self):
+        if self.docs:
+            self.matrix = np.memmap(
+                os.path.join(self.path, "vectors.f32"),
+                dtype=np.float32, mode="r", shape=(len(self.docs), self.dim)
+            )
+
+    def load(self):
+        meta_path = os.path.join(self.path, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path) as f:
+            self.dim = json.load(f)["dim"]
+        with open(os.path.join(self.path, "docs.jsonl"), encoding="utf-8") as f:
+            self.docs = [json.loads(line) for line in f if line.strip()]
+        self._map()
+        deleted_path = os.path.join(self.path, "deleted.json")
+        if os.path.exists(deleted_path):
+            with open(deleted_path) as f:
+                self.deleted = frozenset(json.load(f))
+        ivf_path = os.path.join(self.path, "ivf.npz")
+        if os.path.exists(ivf_path):
+            ivf = np.load(ivf_path)
+            if int(ivf["size"]) <= self.size:
+                centroids = ivf["centroids"]
+                self.ivf = (centroids, _split_lists(ivf["assignments"], len(centroids)), int(ivf["size"]))
+
+    def append(self, vectors: np.ndarray, docs: List[dict]):
+        if self.dim is None:
+            os.makedirs(self.path, exist_ok=True)
+            self.dim = int(vectors.shape[1])
+            with open(os.path.join(self.path, "meta.json"), "w") as f:
+                json.dump({"dim": self.dim}, f)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}.")
+        with open(os.path.join(self.path, "vectors.f32"), "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(os.path.join(self.path, "docs.jsonl"), "a", encoding="utf-8") as f:
+            for doc in docs:
+                f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+        self.docs.extend(docs)
+        self._map()
+
+    def delete_rows(self, rows: Iterable[int]) -> int:
+        rows = {row for row in rows if 0 <= row < self.size} - self.deleted
+        if rows:
+            deleted = self.deleted | rows
+            with open(os.path.join(self.path, "deleted.json"), "w") as f:
+                json.dump(sorted(deleted), f)
+            self.deleted = deleted
+        return len(rows)
+
+    def needs_ivf(self, min_size: int) -> bool:
+        return self.size >= min_size and self.size > self.ivf_size * 1.25
+
+    def build_ivf_if_needed(self, min_size: int) -> bool:
+        """Build the index unless it is fresh or another thread is building it."""
+        if not self.needs_ivf(min_size) or not self._building.acquire(blocking=False):
+            return False
+        try:
+            if self.needs_ivf(min_size):
+                self.build_ivf()
+        finally:
+            self._building.release()
+        return True
+
+    def build_ivf(self, iterations: int = 10, seed: int = 0):
+        # Works on one snapshot of the matrix; rows appended meanwhile are
+        # searched exactly until the next build.
+        matrix = self.matrix
+        n = len(matrix)
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(matrix[np.sort(rng.choice(n, size=min(n, nlist * 64), replace=False))])
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assignments == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+        assignments = np.empty(n, dtype=np.int32)
+        for start in range(0, n, 65536):
+            block = np.asarray(matrix[start:start + 65536])
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        np.savez(os.path.join(self.path, "ivf.npz"), centroids=centroids, assignments=assignments, size=n)
+        self.ivf = (centroids, _split_lists(assignments, nlist), n)
+
+    def search(self, query: np.ndarray, k: int, nprobe: int):
+        # Snapshot the index before the matrix: an index never covers more
+        # rows than the matrix that was mapped when it was published.
+        ivf, matrix, deleted = self.ivf, self.matrix, self.deleted
+        if matrix is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if ivf is not None:
+            centroids, lists, ivf_size = ivf
+            probe = np.argsort(-(centroids @ query))[:nprobe]
+            candidates = np.sort(np.concatenate(
+                [lists[c] for c in probe] + [np.arange(ivf_size, len(matrix))]
+            ))
+            scores = np.asarray(matrix[candidates]) @ query
+        else:
+            candidates = None
+            scores = np.asarray(matrix) @ query
+        if deleted:
+            rows = np.arange(len(scores)) if candidates is None else candidates
+            scores[np.isin(rows, np.fromiter(deleted, dtype=np.int64, count=len(deleted)))] = -np.inf
+            k = min(k, int(np.isfinite(scores).sum()))
+        k = min(k, len(scores))
+        if k == 0:
+            return np.empty(0, dtype=np.int64), scores[:0]
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        indices = top if candidates is None else candidates[top]
+        return indices, scores[top]
+
+
+def _split_lists(assignments: np.ndarray, nlist: int):
+    order = np.argsort(assignments, kind="stable")
+    bounds = np.searchsorted(assignments[order], np.arange(nlist + 1))
+    return [order[bounds[c]:bounds[c + 1]] for c in range(nlist)]
+
+
+def _normalize(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class LocalVectorStore(VectorStore):
+    """In-process vector store.
+
+    Vectors are kept L2-normalised in one float32 file per ``file_id``
+    partition and memory-mapped for search, so a query only touches the
+    partition it filters on. Partitions with at least ``ivf_min_size``
+    vectors get a k-means IVF index and are searched over ``nprobe`` lists;
+    smaller ones are searched exactly. The index is (re)built by the writer
+    after an upsert, outside the store lock; a partition loaded without a
+    current index gets one built in the background while it is searched
+    exactly.
+    """
+
+    def __init__(self, embedding, index_dir: str, ivf_min_size: int = 50000, nprobe: int = 8):
+        self._embedding = embedding
+        self.index_dir = index_dir
+        self.ivf_min_size = ivf_min_size
+        self.nprobe = nprobe
+        self._partitions = {}
+        self._lock = threading.RLock()
+        os.makedirs(index_dir, exist_ok=True)
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    def _partition_path(self, key: str) -> str:
+        if not _SAFE_PARTITION.fullmatch(key):
+            key = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.index_dir, key)
+
+    def _partition(self, key: str) -> _Partition:
+        path = self._partition_path(key)
+        with self._lock:
+            if path not in self._partitions:
+                self._partitions[path] = _Partition(path)
+            return self._partitions[path]
+
+    def _all_partition_keys(self) -> List[str]:
+        # Directory names are already safe partition keys.
+        return sorted(
+            name for name in os.listdir(self.index_dir)
+            if os.path.isdir(os.path.join(self.index_dir, name))
+        )
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self._embedding.embed_documents(texts), metadatas)
+
+    def add_embeddings(self, texts: List[str], embeddings: List[List[float]], metadatas: Optional[List[dict]] = None) -> List[str]:
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = _normalize(embeddings)
+        groups = {}
+        for row, (text, metadata) in enumerate(zip(texts, metadatas)):
+            key = str(metadata.get("file_id", DEFAULT_PARTITION))
+            groups.setdefault(key, []).append(row)
+
+        ids = []
+        partitions = []
+        with self._lock:
+            for key, rows in groups.items():
+                partition = self._partition(key)
+                offset = partition.size
+                partition.append(
+                    vectors[rows],
+                    [{"page_content": texts[r], "metadata": metadatas[r]} for r in rows]
+                )
+                partitions.append(partition)
+                ids.extend(f"{key}:{offset + i}" for i in range(len(rows)))
+        for partition in partitions:
+            self._build_ivf(partition)
+        return ids
+
+    def _build_ivf(self, partition: _Partition):
+        try:
+            partition.build_ivf_if_needed(self.ivf_min_size)
+        except OSError:
+            # The partition was deleted while its index was being built.
+            logger.warning("Could not build the IVF index in %s", partition.path, exc_info=True)
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None):
+        filter = dict(filter or {})
+        file_id = filter.pop("file_id", None)
+        keys = [str(file_id)] if file_id is not None else self._all_partition_keys()
+        query = _normalize(embedding)[0]
+        # Over-fetch when there are extra metadata filters to apply afterwards.
+        fetch_k = k * 4 if filter else k
+
+        results = []
+        for key in keys:
+            partition = self._partition(key)
+            if partition.needs_ivf(self.ivf_min_size) and not partition._building.locked():
+                threading.Thread(target=self._build_ivf, args=(partition,), daemon=True).start()
+            indices, scores = partition.search(query, fetch_k, self.nprobe)
+            for index, score in zip(indices, scores):
+                doc = partition.docs[index]
+                if all(doc["metadata"].get(name) == value for name, value in filter.items()):
+                    results.append((Document(page_content=doc["page_content"], metadata=doc["metadata"]), float(score)))
+        results.sort(key=lambda pair: pair[1], reverse=True)
+        return results[:k]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, filter)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs):
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    def delete(self, ids: Optional[List[str]] = None, filter: Optional[dict] = None, **kwargs) -> bool:
+        """Delete the vectors with the given ids, or a whole file_id partition."""
+        if ids:
+            rows = {}
+            for vector_id in ids:
+                key, _, row = str(vector_id).rpartition(":")
+                if key and row.isdigit():
+                    rows.setdefault(key, set()).add(int(row))
+            removed = 0
+            with self._lock:
+                for key, key_rows in rows.items():
+                    if os.path.isdir(self._partition_path(key)):
+                        removed += self._partition(key).delete_rows(key_rows)
+            return removed > 0
+        if not filter or "file_id" not in filter:
+            raise ValueError("LocalVectorStore.delete needs filter={'file_id': ...}.")
+        key = str(filter["file_id"])
+        path = self._partition_path(key)
+        with self._lock:
+            self._partitions.pop(path, None)
+            if not os.path.isdir(path):
+                return False
+            shutil.rmtree(path)
+        return True
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding, metadatas: Optional[List[dict]] = None, index_dir: str = ".csv_ai_index", **kwargs):
+        store = cls(embedding=embedding, index_dir=index_dir, **kwargs)
+        store.add_texts(texts, metadatas)
+        return store
@@ -0,0 +1,101 @@
+"""Check a pytest-benchmark run against the stored baseline.
+
+    pytest benchmarks --benchmark-json=bench.json
+    python -m benchmarks.compare bench.json
+    python -m benchmarks.compare bench.json --update   # accept as the new baseline
+
+Medians are compared relative to the calibration benchmark
+(benchmarks/test_calibration.py) from the same run, so a baseline recorded on
+one machine still holds on a faster or slower one. Exits with status 1 when
+any benchmark is more than ``--tolerance`` (default 50%) slower than its
+baseline, or when a baseline benchmark did not run (skipped for a missing
+dependency, or a different BENCH_ROWS). Benchmarks missing from the baseline
+are listed as new and do not fail the check.
+"""
+import os
+import sys
+import json
+import argparse
+
+import pandas as pd
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+CALIBRATION = "benchmarks/test_calibration.py::test_calibration"
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {
+        bench["fullname"]: {"median": bench["stats"]["median"], "mean": bench["stats"]["mean"], "rounds": bench["stats"]["rounds"]}
+        for bench in data["benchmarks"]
+    }
+
+
+def machine_speed(results: dict, baseline: dict) -> float:
+    """How much slower this run's machine is than the baseline's."""
+    if CALIBRATION not in results or CALIBRATION not in baseline:
+        raise SystemExit(f"{CALIBRATION} is missing from the results or the baseline")
+    return results[CALIBRATION]["median"] / baseline[CALIBRATION]["median"]
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> pd.DataFrame:
+    speed = machine_speed(results, baseline)
+    rows = []
+    for name in sorted(set(results) | set(baseline)):
+        if name == CALIBRATION:
+            continue
+        current, previous = results.get(name), baseline.get(name)
+        row = {
+            "benchmark": name,
+            "median_ms": round(current["median"] * 1000, 3) if current else None,
+            "baseline_ms": round(previous["median"] * speed * 1000, 3) if previous else None,
+            "ratio": None,
+        }
+        if current is None:
+            row["status"] = "MISSING"
+        elif previous is None:
+            row["status"] = "new"
+        else:
+            expected = previous["median"] * speed
+            ratio = current["median"] / expected if expected else 1.0
+            row.update(ratio=round(ratio, 2), status="REGRESSION" if ratio > 1 + tolerance else "ok")
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("results", help="file written by pytest --benchmark-json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+
+    results = load_results(args.results)
+    if args.update:
+        if CALIBRATION not in results:
+            raise SystemExit(f"{CALIBRATION} is missing from {args.results}; run the whole suite")
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Wrote {len(results)} benchmarks to {args.baseline}")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    report = compare(results, baseline, args.tolerance)
+    print(f"machine speed vs baseline: {machine_speed(results, baseline):.2f}x (baseline_ms is scaled by it)")
+    print(report.to_string(index=False))
+    regressions = report[report["status"] == "REGRESSION"]
+    missing = report[report["status"] == "MISSING"]
+    if len(regressions):
+        print(f"\n{len(regressions)} benchmark(s) more than {args.tolerance:.0%} slower than the baseline")
+    if len(missing):
+        print(f"\n{len(missing)} baseline benchmark(s) did not run")
+    if len(regressions) or len(missing):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
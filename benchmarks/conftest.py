@@ -0,0 +1,65 @@
+"""Offline setup for the pytest-benchmark suite.
+
+    pytest benchmarks --benchmark-json=bench.json
+    python -m benchmarks.compare bench.json
+
+Nothing leaves the machine: vectors go to the local NumPy store instead of
+Pinecone, embeddings come from a deterministic fake of the same width as
+all-MiniLM-L6-v2, and chat/summaries use the "fake" LLM from api/llm.py
+(enabled with ALLOW_FAKE_LLM).
+Caches and the history store live in a temporary directory, so every round
+does the full work.
+
+BENCH_ROWS picks the fixture sizes (default "1000,100000"); the full sweep
+is BENCH_ROWS=1000,100000,1000000.
+"""
+import os
+import shutil
+import tempfile
+
+_state_dir = tempfile.mkdtemp(prefix="csv-ai-bench-")
+# Set before anything under api/ is imported: those modules read their
+# settings at import time.
+os.environ.update({
+    "VECTOR_BACKEND": "local",
+    "LOCAL_INDEX_DIR": os.path.join(_state_dir, "local_index"),
+    "EMBEDDING_CACHE_PATH": "",
+    "SUMMARY_CACHE_PATH": "",
+    "QUERY_CACHE_MAX_ENTRIES": "0",
+    "EMBEDDING_SERVER_URL": "",
+    "FILE_REGISTRY_PATH": os.path.join(_state_dir, "files.sqlite"),
+    "JOB_DB_PATH": os.path.join(_state_dir, "jobs.sqlite"),
+    "BM25_INDEX_DIR": os.path.join(_state_dir, "bm25"),
+    "FRAME_CACHE_DIR": os.path.join(_state_dir, "frames"),
+    "DATASET_CACHE_DIR": os.path.join(_state_dir, "datasets"),
+    "HISTORY_BACKEND": "sqlite",
+    "HISTORY_SQLITE_PATH": os.path.join(_state_dir, "history.sqlite"),
+    "HF_HUB_OFFLINE": "1",
+    "ALLOW_FAKE_LLM": "1",
+})
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from api import registry
+
+BENCH_ROWS = [int(rows) for rows in os.getenv("BENCH_ROWS", "1000,100000").split(",")]
+BENCH_ROUNDS = int(os.getenv("BENCH_ROUNDS", "3"))
+FAKE_MODEL = "fake-bench"
+EMBEDDING_SIZE = 384
+
+
+@pytest.fixture(scope="session", autouse=True)
+def offline_backends():
+    registry._embedding = DeterministicFakeEmbedding(size=EMBEDDING_SIZE)
+    yield
+    from api.jobs import get_job_manager
+    from api.parallel_loaders import shutdown_pool
+    get_job_manager().shutdown()
+    shutdown_pool()
+    shutil.rmtree(_state_dir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session", params=BENCH_ROWS, ids=lambda rows: f"{rows}rows")
+def rows(request):
+    return request.param
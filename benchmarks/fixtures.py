@@ -0,0 +1,93 @@
+"""Synthetic CSV/XLSX/PDF files for the benchmark suite.
+
+Files are generated once per (format, rows) under BENCH_DATA_DIR and reused
+by later runs; the content is seeded, so every run sees the same bytes.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+BENCH_DATA_DIR = os.getenv("BENCH_DATA_DIR", "cache/bench-data")
+BLOCK_ROWS = 100000
+# Rows rendered per PDF page.
+PDF_ROWS_PER_PAGE = 50
+
+REGIONS = np.array(["north", "south", "east", "west", "central", "online", "export", "partner"])
+WORDS = np.array("late damaged refund priority repeat bulk discount gift return express".split())
+
+
+def frame(rows: int, offset: int = 0, seed: int = 0) -> pd.DataFrame:
+    """Order-like rows: ids, a few categories, numbers, dates and short text."""
+    rng = np.random.default_rng(seed + offset)
+    ids = np.arange(offset, offset + rows)
+    return pd.DataFrame({
+        "order_id": ids,
+        "sku": [f"SKU-{i % 50000:05d}" for i in ids],
+        "region": REGIONS[rng.integers(0, len(REGIONS), rows)],
+        "order_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+        "quantity": rng.integers(1, 50, rows),
+        "unit_price": rng.gamma(2.0, 20.0, rows).round(2),
+        "note": [" ".join(words) for words in WORDS[rng.integers(0, len(WORDS), (rows, 3))]],
+    })
+
+
+def frames(rows: int, seed: int = 0):
+    for offset in range(0, rows, BLOCK_ROWS):
+        yield frame(min(BLOCK_ROWS, rows - offset), offset, seed)
+
+
+def _path(kind: str, rows: int) -> str:
+    os.makedirs(BENCH_DATA_DIR, exist_ok=True)
+    return os.path.join(BENCH_DATA_DIR, f"orders_{rows}.{kind}")
+
+
+def csv_file(rows: int) -> str:
+    path = _path("csv", rows)
+    if os.path.exists(path):
+        return path
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        for i, block in enumerate(frames(rows)):
+            block.to_csv(f, index=False, header=i == 0)
+    os.replace(tmp_path, path)
+    return path
+
+
+def xlsx_file(rows: int) -> str:
+    """Needs openpyxl; rows are split over sheets of at most 1M rows."""
+    path = _path("xlsx", rows)
+    if os.path.exists(path):
+        return path
+    # pandas picks the writer from the extension, so keep ".xlsx" last.
+    tmp_path = _path("tmp.xlsx", rows)
+    sheet_rows = 1000000
+    with pd.ExcelWriter(tmp_path, engine="openpyxl") as writer:
+        for sheet, offset in enumerate(range(0, rows, sheet_rows)):
+            data = pd.concat(list(frames(min(sheet_rows, rows - offset), seed=offset)), ignore_index=True)
+            data.to_excel(writer, sheet_name=f"orders_{sheet + 1}", index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def pdf_file(rows: int) -> str:
+    """Needs PyMuPDF; PDF_ROWS_PER_PAGE rows of text per page."""
+    import fitz
+
+    path = _path("pdf", rows)
+    if os.path.exists(path):
+        return path
+    tmp_path = f"{path}.tmp"
+    document = fitz.open()
+    for block in frames(rows):
+        lines = block.to_string(index=False, header=False).splitlines()
+        for start in range(0, len(lines), PDF_ROWS_PER_PAGE):
+            page = document.new_page()
+            page.insert_text((36, 36), "\n".join(lines[start:start + PDF_ROWS_PER_PAGE]), fontsize=6)
+    document.save(tmp_path)
+    document.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+FILES = {"csv": csv_file, "xlsx": xlsx_file, "pdf": pdf_file}
@@ -0,0 +1,67 @@
+"""Compare chat-history write cost against conversation length.
+
+    python -m benchmarks.history_writes --turns 200
+
+"rewrite" stores the whole message list on every turn, as save_history
+did with Mongo's $set; "append" uses the per-message SQLite store from
+api/db.py. Both run against a temporary SQLite file.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from api.db import SQLiteHistoryStore
+
+
+def _message(i):
+    return {"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " * 40}
+
+
+def run_rewrite(path, turns):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users_history (session_id TEXT PRIMARY KEY, history TEXT)")
+    history = []
+    timings = []
+    for turn in range(turns):
+        history.extend([_message(2 * turn), _message(2 * turn + 1)])
+        start = time.perf_counter()
+        conn.execute("INSERT OR REPLACE INTO users_history VALUES (?, ?)", ("s", json.dumps(history)))
+        conn.commit()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_append(path, turns):
+    store = SQLiteHistoryStore(path)
+    timings = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        store.append("s", [_message(2 * turn), _message(2 * turn + 1)])
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rewrite = run_rewrite(os.path.join(tmp, "rewrite.sqlite"), args.turns)
+        append = run_append(os.path.join(tmp, "append.sqlite"), args.turns)
+
+    step = max(1, args.turns // 10)
+    print(f"{'turn':>6} {'rewrite ms':>12} {'append ms':>12}")
+    for turn in range(step - 1, args.turns, step):
+        window = slice(max(0, turn - step + 1), turn + 1)
+        r = sum(rewrite[window]) / len(rewrite[window]) * 1000
+        a = sum(append[window]) / len(append[window]) * 1000
+        print(f"{turn + 1:>6} {r:>12.3f} {a:>12.3f}")
+    print(f"{'total':>6} {sum(rewrite) * 1000:>12.1f} {sum(append) * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compare dense, BM25 and hybrid (RRF) retrieval on exact lookups in a CSV.
+
+    python -m benchmarks.hybrid_retrieval --csv data.csv --column sku --queries 200
+
+The file is chunked by rows, embedded into a temporary local vector store
+and indexed with BM25. Each query asks for the row holding one value of
+``--column`` (default: the first column). A hit means one of the returned
+chunks contains that row; "dense k=<candidates>" is the raise-k workaround
+the hybrid search replaces.
+"""
+import os
+
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+from api.bm25 import BM25Builder, BM25Index, reciprocal_rank_fusion
+from api.chunking import iter_csv_chunks
+from api.ingest import ingest_chunks
+from api.metrics import percentile
+from api.registry import get_embedding
+from api.vectorstores import LocalVectorStore
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", required=True)
+    parser.add_argument("--column")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frame = pd.read_csv(args.csv, dtype=str, keep_default_na=False)
+    column = args.column or frame.columns[0]
+    rows = random.Random(args.seed).sample(range(len(frame)), min(args.queries, len(frame)))
+    queries = [(row, f"Show me the record where {column} is {frame.at[row, column]}") for row in rows]
+
+    embedding = get_embedding()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalVectorStore(embedding, os.path.join(tmp, "vectors"))
+        builder = BM25Builder()
+        ranges = {}
+
+        def _chunks():
+            for chunk in iter_csv_chunks(args.csv):
+                ranges[chunk.page_content] = (chunk.metadata["row_start"], chunk.metadata["row_end"])
+                builder.add(chunk.page_content)
+                yield chunk
+
+        stats = ingest_chunks(_chunks(), store, embedding)
+        start = time.perf_counter()
+        builder.save(os.path.join(tmp, "bm25"))
+        index = BM25Index(os.path.join(tmp, "bm25"))
+        print(f"chunks: {stats.chunks}, embed+upsert: {stats.seconds:.1f}s, bm25 build: {time.perf_counter() - start:.2f}s")
+
+        def dense(query, k):
+            return [doc.page_content for doc in store.similarity_search(query, k=k)]
+
+        def sparse(query, k):
+            return [index.text(doc) for doc, _ in index.search(query, k)]
+
+        strategies = {
+            f"dense k={args.k}": lambda q: dense(q, args.k),
+            f"dense k={args.candidates}": lambda q: dense(q, args.candidates),
+            "bm25": lambda q: sparse(q, args.k),
+            "hybrid rrf": lambda q: reciprocal_rank_fusion([dense(q, args.candidates), sparse(q, args.candidates)], args.k),
+        }
+        results = []
+        for name, search in strategies.items():
+            hits = 0
+            latencies = []
+            for row, query in queries:
+                start = time.perf_counter()
+                texts = search(query)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found = [ranges[text] for text in texts if text in ranges]
+                hits += any(first <= row <= last for first, last in found)
+            results.append({
+                "strategy": name,
+                "returned": len(texts),
+                "recall": round(hits / len(queries), 3),
+                "p50_ms": round(percentile(latencies, 50), 2),
+                "p99_ms": round(percentile(latencies, 99), 2),
+                "mean_ms": round(statistics.mean(latencies), 2),
+            })
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Measure /load-retriever latency against a running API.
+
+    python -m benchmarks.retrieval_latency --url http://localhost:8000 --file-id <id>
+
+Run it once against the old build and once against the new one to compare
+p50/p99.
+"""
+import argparse
+import statistics
+import time
+
+import requests
+
+from api.metrics import percentile
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--file-id", required=True)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--query", default="What columns does this file have?")
+    args = parser.parse_args()
+
+    session = requests.Session()
+    latencies = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        response = session.post(f"{args.url}/load-retriever/{args.file_id}", json={"query": args.query})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    print(f"requests: {len(latencies)}")
+    print(f"p50: {percentile(latencies, 50):.1f} ms")
+    print(f"p99: {percentile(latencies, 99):.1f} ms")
+    print(f"mean: {statistics.mean(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measure API worker start-up: import time, warm-up time and memory.
+
+    python -m benchmarks.startup --repeats 5
+    python -m benchmarks.startup --repeats 5 --server-url http://127.0.0.1:8100
+
+Every run is a fresh interpreter. "import" is ``import api.app``, which a
+uvicorn worker does before it accepts connections. "warm" adds
+``registry.warm_up()``. That is a model load plus a first encode, or, with
+--server-url, one round trip to the shared inference worker
+(``python -m api.embedding_server``). "heavy" lists the large libraries the
+import pulled in. Peak RSS is per worker, so N workers cost roughly N times
+that.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+import pandas as pd
+
+HEAVY = [
+    "torch", "transformers", "sentence_transformers", "langchain_huggingface",
+    "langchain_google_genai", "langchain_pinecone", "pinecone", "langchain_community",
+]
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import api.app
+result = {"import_s": time.perf_counter() - start, "heavy": [m for m in HEAVY if m in sys.modules]}
+if WARM:
+    from api.registry import warm_up
+    warm_up()
+    result["warm_s"] = time.perf_counter() - start
+result["rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps(result))
+"""
+
+
+def probe(warm: bool, env: dict) -> dict:
+    code = f"HEAVY = {HEAVY!r}\nWARM = {warm!r}\n{PROBE}"
+    output = subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--server-url", default="", help="use the shared embedding server at this URL")
+    parser.add_argument("--vector-backend", default="local")
+    parser.add_argument("--no-warm", action="store_true", help="only measure the import")
+    args = parser.parse_args()
+
+    env = {**os.environ, "VECTOR_BACKEND": args.vector_backend, "EMBEDDING_SERVER_URL": args.server_url}
+    runs = [probe(not args.no_warm, env) for _ in range(args.repeats)]
+    summary = {
+        "embedding": args.server_url or "in-process",
+        "import_s": round(statistics.median(run["import_s"] for run in runs), 3),
+        "rss_mb": round(statistics.median(run["rss_mb"] for run in runs), 1),
+    }
+    if not args.no_warm:
+        summary["warm_s"] = round(statistics.median(run["warm_s"] for run in runs), 3)
+    print(pd.DataFrame([summary]).to_string(index=False))
+    print("heavy modules imported by api.app:", ", ".join(runs[-1]["heavy"]) or "none")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare row-aware chunking of a CSV with the character splitter.
+
+    python -m benchmarks.tabular_chunking --csv data.csv --queries 100
+
+Both strategies are ingested into a temporary local vector store with the
+configured embedding model. Retrieval quality is recall@k on row lookups:
+the query is one row rendered as "column: value" pairs, and a hit means
+one of the top-k chunks contains that row.
+"""
+import os
+
+# Measure real embedding cost, not cache hits from an earlier run.
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+
+import argparse
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from api.api_utils import text_splitter
+from api.chunking import iter_csv_chunks
+from api.ingest import ingest_chunks
+from api.loaders import iter_csv_documents, iter_chunks
+from api.registry import get_embedding
+from api.vectorstores import LocalVectorStore
+
+
+def _dir_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+
+def _covers(document, row):
+    metadata = document.metadata
+    if "row_start" in metadata:
+        return metadata["row_start"] <= row <= metadata["row_end"]
+    return metadata.get("row") == row
+
+
+def run(name, chunks, queries, k, embedding):
+    with tempfile.TemporaryDirectory() as index_dir:
+        store = LocalVectorStore(embedding, index_dir)
+        stats = ingest_chunks(chunks, store, embedding)
+        index_mb = _dir_mb(index_dir)
+
+        hits = 0
+        start = time.perf_counter()
+        for row, query in queries:
+            results = store.similarity_search(query, k=k)
+            hits += any(_covers(document, row) for document in results)
+        query_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    return {
+        "strategy": name,
+        "chunks": stats.chunks,
+        "ingest_s": round(stats.seconds, 2),
+        "index_mb": round(index_mb, 2),
+        f"recall@{k}": round(hits / len(queries), 3),
+        "query_ms": round(query_ms, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", required=True)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frame = pd.read_csv(args.csv, dtype=str, keep_default_na=False)
+    rows = random.Random(args.seed).sample(range(len(frame)), min(args.queries, len(frame)))
+    queries = [
+        (row, "\n".join(f"{column}: {value}" for column, value in frame.iloc[row].items()))
+        for row in rows
+    ]
+    embedding = get_embedding()
+
+    results = [
+        run("characters", iter_chunks(iter_csv_documents(args.csv), text_splitter), queries, args.k, embedding),
+        run("rows", iter_csv_chunks(args.csv), queries, args.k, embedding),
+    ]
+    print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import pytest
+
+from api.frame_cache import FrameCache, content_hash
+from api.frames import read_compact_frame
+from benchmarks import fixtures
+from benchmarks.conftest import BENCH_ROUNDS
+
+
+@pytest.fixture(params=["csv", "xlsx"])
+def upload(request, rows):
+    if request.param == "xlsx":
+        pytest.importorskip("openpyxl")
+    with open(fixtures.FILES[request.param](rows), "rb") as f:
+        return f.read(), f"orders.{request.param}"
+
+
+def test_read_compact_frame(benchmark, upload):
+    # First load of a file in Analyze CSV: parse and shrink dtypes.
+    data, filename = upload
+    df, stats = benchmark.pedantic(read_compact_frame, args=(data, filename), rounds=BENCH_ROUNDS, iterations=1)
+    benchmark.extra_info.update(stats.to_dict())
+
+
+def test_frame_cache_hit(benchmark, upload, tmp_path):
+    # Reopening a file seen before: read back from the Parquet cache.
+    data, filename = upload
+    cache = FrameCache(str(tmp_path / "frames"))
+    key = content_hash(data)
+    cache.load(key, data, filename)
+    df, info = benchmark(cache.load, key, data, filename)
+    assert info["source"] == "parquet"
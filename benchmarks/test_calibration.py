@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+
+def calibration_workload():
+    # Fixed mix of the work the suite does (parsing, DataFrame ops, Python
+    # loops, vector maths), so a faster or slower machine scales it the same
+    # way. benchmarks.compare divides every median by this one.
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        "key": rng.integers(0, 100, 50_000).astype(str),
+        "value": rng.random(50_000),
+    })
+    text = frame.to_csv(index=False)
+    grouped = frame.groupby("key")["value"].agg(["sum", "mean"])
+    words = {}
+    for token in text.replace(",", " ").split():
+        words[token] = words.get(token, 0) + 1
+    matrix = rng.random((256, 384), dtype=np.float32)
+    scores = matrix @ matrix.T
+    return len(grouped), len(words), float(scores.max())
+
+
+def test_calibration(benchmark):
+    benchmark(calibration_workload)
@@ -0,0 +1,27 @@
+import uuid
+
+import pytest
+
+from api.db import append_history, get_history
+
+TURN = [
+    {"role": "user", "content": "Which region had the highest revenue last quarter? " * 4},
+    {"role": "assistant", "content": "The north region had the highest revenue, followed by online. " * 8},
+]
+
+
+@pytest.fixture(params=[0, 1000], ids=lambda turns: f"{turns}turns")
+def session_id(request):
+    session_id = str(uuid.uuid4())
+    for _ in range(request.param):
+        append_history(session_id, TURN)
+    return session_id
+
+
+def test_append_history(benchmark, session_id):
+    # Cost of one chat turn's write; should not grow with the session length.
+    benchmark(append_history, session_id, TURN)
+
+
+def test_get_recent_history(benchmark, session_id):
+    benchmark(get_history, session_id, limit=20)
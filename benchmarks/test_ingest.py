@@ -0,0 +1,44 @@
+import asyncio
+import uuid
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from api.api_utils import load_split_store_document, delete_doc_from_pinecone
+from benchmarks import fixtures
+from benchmarks.conftest import BENCH_ROUNDS
+
+# Modules the fixture generators (and the loaders) need per format.
+REQUIRES = {"csv": None, "xlsx": "openpyxl", "pdf": "fitz"}
+
+
+@pytest.mark.parametrize("kind", list(fixtures.FILES))
+def test_load_split_store_document(benchmark, kind, rows):
+    if REQUIRES[kind]:
+        pytest.importorskip(REQUIRES[kind])
+    path = fixtures.FILES[kind](rows)
+    ingested = []
+
+    def cleanup():
+        # Drop the previous round's vectors and claim, or the upload would be
+        # deduplicated by content hash.
+        while ingested:
+            asyncio.run(delete_doc_from_pinecone(ingested.pop()))
+
+    def setup():
+        cleanup()
+        upload = UploadFile(file=open(path, "rb"), filename=f"orders.{kind}")
+        return (upload, str(uuid.uuid4())), {}
+
+    def ingest(upload, file_id):
+        try:
+            file_id, stats = asyncio.run(load_split_store_document(upload, file_id))
+        finally:
+            upload.file.close()
+        ingested.append(file_id)
+        return stats
+
+    stats = benchmark.pedantic(ingest, setup=setup, rounds=BENCH_ROUNDS, iterations=1)
+    cleanup()
+    assert stats is not None and stats.chunks > 0
+    benchmark.extra_info.update(rows=rows, chunks=stats.chunks, chunks_per_sec=stats.chunks_per_sec)
@@ -0,0 +1,41 @@
+import asyncio
+import uuid
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from api.api_utils import load_split_store_document, delete_doc_from_pinecone
+from api.chat_service import retrieve_context
+from benchmarks import fixtures
+
+QUERIES = [
+    "Show me the order for SKU-01042",
+    "Which region had the most returns?",
+    "orders with damaged express notes",
+    "what was the unit price of order 512",
+]
+
+
+@pytest.fixture(scope="module")
+def indexed_file(rows):
+    path = fixtures.csv_file(rows)
+    with open(path, "rb") as f:
+        file_id, _ = asyncio.run(load_split_store_document(UploadFile(file=f, filename="orders.csv"), str(uuid.uuid4())))
+    yield file_id
+    asyncio.run(delete_doc_from_pinecone(file_id))
+
+
+def test_retrieve_context(benchmark, indexed_file):
+    # The query cache is disabled in conftest, so every call embeds the
+    # query and searches both indexes.
+    loop = asyncio.new_event_loop()
+    queries = iter(QUERIES * 10000)
+
+    def retrieve():
+        return loop.run_until_complete(retrieve_context(indexed_file, next(queries), {}))
+
+    try:
+        chunks = benchmark(retrieve)
+    finally:
+        loop.close()
+    assert chunks
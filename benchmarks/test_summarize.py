@@ -0,0 +1,32 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from api.app import app
+from api.summarizer import SUMMARY_MODES
+from benchmarks import fixtures
+from benchmarks.conftest import BENCH_ROUNDS, FAKE_MODEL
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("mode", SUMMARY_MODES)
+def test_summarize(benchmark, client, mode, rows):
+    with open(fixtures.csv_file(rows), "rb") as f:
+        data = f.read()
+
+    def summarize():
+        response = client.post(
+            "/summarize",
+            files={"file": ("orders.csv", data, "text/csv")},
+            data={"model_name": FAKE_MODEL, "api_key": "offline", "mode": mode},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    result = benchmark.pedantic(summarize, rounds=BENCH_ROUNDS, iterations=1)
+    assert result["cache"] == "disabled"
+    benchmark.extra_info.update(result["timings"])
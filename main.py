@@ -1,10 +1,19 @@
+import os
 import streamlit as st
+from api.metrics import serve_metrics
 from src.summarize import summarize
 from src.home_page import home_page
 from src.analyze import analyze
 from src.chat import chat
 
+# History reads/writes, chat/summarize turns, Analyze timings and TTFT are
+# measured in this process, so it serves its own /metrics.
+UI_METRICS_PORT = int(os.getenv("UI_METRICS_PORT", "8502"))
+
+
 def main():
+    if UI_METRICS_PORT:
+        serve_metrics(UI_METRICS_PORT)
     st.set_page_config(page_title="CSV AI", page_icon="🧾", layout="wide")
     st.sidebar.title("🔐 API Configuration")
 
@@ -1,17 +1,71 @@
+import os
 import streamlit as st
-import pandas as pd
-import tempfile
+import time
 import uuid
+import logging
 from dotenv import load_dotenv
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_experimental.agents import create_pandas_dataframe_agent
 from langchain_community.chat_message_histories import StreamlitChatMessageHistory
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+from api.datasets import LazyFrame, OUT_OF_CORE_MIN_MB, get_dataset_store
+from api.frame_cache import get_frame_cache, stream_hash
+from api.history import ConversationWindow
+from api.query_engine import answer_question
+from api.metrics import observe, timer
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
+# Parsed frames kept in memory across reruns and sessions; older ones fall
+# back to the Parquet copy on disk. Sessions only read the shared frame; the
+# agent, which runs generated code, gets its own copy.
+FRAME_MEMORY_ENTRIES = int(os.getenv("ANALYZE_FRAME_MEMORY_ENTRIES", "4"))
+# In out-of-core mode the LLM agent works on the first rows only; simple
+# questions still run over the whole dataset through the query engine.
+AGENT_SAMPLE_ROWS = int(os.getenv("ANALYZE_AGENT_SAMPLE_ROWS", "100000"))
+
+
+def upload_hash(uploaded_file) -> str:
+    # Hash each upload once per session instead of on every rerun, reading
+    # it in blocks rather than copying it whole.
+    hashes = st.session_state.setdefault("analyze_upload_hashes", {})
+    if uploaded_file.file_id not in hashes:
+        hashes[uploaded_file.file_id] = stream_hash(uploaded_file)
+    return hashes[uploaded_file.file_id]
+
+
+@st.cache_resource(max_entries=FRAME_MEMORY_ENTRIES, show_spinner="Loading file...")
+def load_frame(file_hash, filename, _uploaded_file):
+    if filename.endswith(".csv") and _uploaded_file.size >= OUT_OF_CORE_MIN_MB * 1024 * 1024:
+        frame = get_dataset_store().load(file_hash, _uploaded_file)
+        return frame, {"source": "dataset", "files": len(frame.files), "disk_mb": frame.disk_mb()}
+    return get_frame_cache().load(file_hash, _uploaded_file.getvalue(), filename)
+
+
+def get_agent(file_hash, model_name, api_key, df):
+    # One agent per session: with allow_dangerous_code the agent can modify
+    # its dataframe in place, so it must never see the frame other sessions
+    # share.
+    key = (file_hash, model_name, api_key)
+    cached = st.session_state.get("analyze_agent")
+    if cached is None or cached[0] != key:
+        agent_df = df.head(AGENT_SAMPLE_ROWS) if isinstance(df, LazyFrame) else df.copy()
+        llm = ChatGoogleGenerativeAI(model=model_name, google_api_key=api_key)
+        agent = create_pandas_dataframe_agent(
+            llm=llm,
+            df=agent_df,
+            allow_dangerous_code=True,
+            verbose=False,
+        )
+        st.session_state.analyze_agent = cached = (key, agent)
+    return cached[1]
+
+
 def analyze(model_name, api_key):
     st.set_page_config(page_title="CSV AI Agent", layout="wide")
     st.title("🧠 CSV & Excel Agent")
@@ -23,42 +77,69 @@ def analyze(model_name, api_key):
         st.warning("Please upload a file to continue.")
         return
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=uploaded_file.name) as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        tmp_file_path = tmp_file.name
-
+    file_hash = upload_hash(uploaded_file)
     try:
-        if uploaded_file.name.endswith(".csv"):
-            df = pd.read_csv(tmp_file_path)
-        else:
-            df = pd.read_excel(tmp_file_path)
+        df, load_info = load_frame(file_hash, uploaded_file.name, uploaded_file)
     except Exception as e:
         st.error(f"❌ Failed to read file: {e}")
         return
 
-    llm = ChatGoogleGenerativeAI(model=model_name, google_api_key=api_key)
+    if load_info["source"] == "dataset":
+        st.sidebar.caption(
+            f"💽 Out-of-core: {df.shape[0]:,} rows in {load_info['files']} Parquet files "
+            f"({load_info['disk_mb']:.1f} MB on disk). The AI agent sees the first {AGENT_SAMPLE_ROWS:,} rows."
+        )
+    elif load_info.get("saved_mb"):
+        st.sidebar.caption(
+            f"🗜️ {df.shape[0]:,} rows in {load_info['memory_mb']:.1f} MB "
+            f"({load_info['saved_mb']:.1f} MB saved with compact dtypes)"
+        )
+    else:
+        st.sidebar.caption(f"🗜️ {df.shape[0]:,} rows in {load_info['memory_mb']:.1f} MB")
 
-    base_agent = create_pandas_dataframe_agent(
-        llm=llm,
-        df=df,
-        allow_dangerous_code=True,
-        verbose=False,
-    )
+    base_agent = get_agent(file_hash, model_name, api_key, df)
 
     if "session_id" not in st.session_state:
         st.session_state.session_id = str(uuid.uuid4())
 
     history = StreamlitChatMessageHistory(key="chat_messages")
 
+    if "analyze_history_window" not in st.session_state:
+        st.session_state.analyze_history_window = ConversationWindow.from_messages([
+            {"role": "user" if isinstance(m, HumanMessage) else "assistant", "content": m.content}
+            for m in history.messages
+        ])
+    window = st.session_state.analyze_history_window
+
     for msg in history.messages:
         role = "user" if isinstance(msg, HumanMessage) else "assistant"
         st.chat_message(role).write(msg.content)
 
+    if "analyze_counts" not in st.session_state:
+        st.session_state.analyze_counts = {"direct": 0, "agent": 0}
+    counts = st.session_state.analyze_counts
+
     if prompt := st.chat_input("Ask something about your data or chat normally..."):
         st.chat_message("user").write(prompt)
         history.add_user_message(prompt)
 
-
+        # Simple aggregate/filter/group-by/top-n questions are answered with
+        # pandas directly; only the rest go through the LLM agent.
+        start = time.perf_counter()
+        direct_answer = answer_question(df, prompt)
+        if direct_answer is not None:
+            elapsed = time.perf_counter() - start
+            observe("analyze_direct_seconds", elapsed)
+            counts["direct"] += 1
+            history.add_ai_message(direct_answer)
+            window.add({"role": "user", "content": prompt})
+            window.add({"role": "assistant", "content": direct_answer})
+            st.chat_message("assistant").write(direct_answer)
+            st.caption(f"⚡ Answered directly from the data in {elapsed * 1000:.0f} ms (no LLM call). "
+                       f"{counts['direct']} of {counts['direct'] + counts['agent']} questions skipped the LLM.")
+            prompt = None
+
+    if prompt:
         format_hint = """
         Please format your answer using **Markdown**:
         - Use bullet points for lists
@@ -67,23 +148,35 @@ def analyze(model_name, api_key):
         - Use headings (###) for section titles
         """
 
+        system_prompt = "You are an intelligent AI assistant who can both remember context and analyze data. If user ask the question which is not related to csv,xls,xlsx file just say i don't have access you can only ask about your csv,xls,xlsx."
+        if isinstance(df, LazyFrame) and len(df) > AGENT_SAMPLE_ROWS:
+            system_prompt += f" The dataframe you can access holds only the first {AGENT_SAMPLE_ROWS} of {len(df)} rows; say so when an answer depends on the full data."
         chat_prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an intelligent AI assistant who can both remember context and analyze data. If user ask the question which is not related to csv,xls,xlsx file just say i don't have access you can only ask about your csv,xls,xlsx."),
+            ("system", system_prompt),
             MessagesPlaceholder(variable_name="history"),
             ("human", "{user_input}\n\n" + format_hint)
         ])
+        # Only the token-budgeted window (plus a rolling summary of older
+        # turns) goes into the prompt, not the whole transcript.
         previous_turns = [
-            HumanMessage(content=m.content) if isinstance(m, HumanMessage) else AIMessage(content=m.content)
-            for m in history.messages[:-1] 
+            HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"])
+            for m in window.messages
         ]
+        if window.summary:
+            previous_turns.insert(0, SystemMessage(content=f"Summary of earlier conversation:\n{window.summary}"))
+        window.add({"role": "user", "content": prompt})
         chat_messages = chat_prompt.format_messages(
             history=previous_turns,
             user_input=prompt
         )
         with st.spinner("Generating answer..."):
             try:
-                response = base_agent.invoke(chat_messages)
+                with timer("analyze_agent_seconds") as agent_timer:
+                    response = base_agent.invoke(chat_messages)
+                counts["agent"] += 1
+                logger.info("Analyze: agent answered %r in %.1f s", prompt, agent_timer.seconds)
                 history.add_ai_message(response['output'])
+                window.add({"role": "assistant", "content": response['output']})
                 st.chat_message("assistant").write(response['output'])
 
             except Exception as e:
@@ -91,5 +184,7 @@ def analyze(model_name, api_key):
 
     if reset:
         history.clear()
+        window.clear()
+        st.session_state.analyze_counts = {"direct": 0, "agent": 0}
         st.session_state.session_id = str(uuid.uuid4())
         st.rerun()
@@ -0,0 +1,58 @@
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = os.getenv("CSV_AI_API_URL", "http://localhost:8000")
+UPLOAD_URL = f"{API_URL}/upload-doc"
+JOBS_URL = f"{API_URL}/jobs"
+DELETE_URL = f"{API_URL}/delete-doc"
+CHAT_URL = f"{API_URL}/chat"
+SUMMARIZE_URL = f"{API_URL}/summarize/stream"
+
+_session = None
+_session_lock = threading.Lock()
+# Streamlit runs each browser session's script in its own thread, so
+# counters are kept per thread: other sessions' requests are not counted.
+_counters = threading.local()
+
+
+def _count_request(response, *args, **kwargs):
+    for counter in getattr(_counters, "active", ()):
+        counter.count += 1
+
+
+class RequestCounter:
+    """Count the API round trips the current thread makes inside the block.
+
+        with RequestCounter() as round_trips:
+            ...
+        round_trips.count
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        _counters.__dict__.setdefault("active", []).append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _counters.active.remove(self)
+        return False
+
+
+def get_session() -> requests.Session:
+    """Process-wide HTTP session, so calls to the API reuse keep-alive connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.hooks["response"].append(_count_request)
+                _session = session
+    return _session
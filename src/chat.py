@@ -1,17 +1,56 @@
 import streamlit as st
+import time
 import uuid
-import requests
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
 
-from api.db import get_history, delete_history, save_history
+from api.db import get_history, count_history, delete_history, append_history
+from api.history import ConversationWindow
+from src.api_client import get_session, RequestCounter, UPLOAD_URL, DELETE_URL, CHAT_URL, JOBS_URL
+from src.streaming import sse_tokens, timed_tokens
+from api.metrics import timer
 
 load_dotenv()
 
-UPLOAD_URL = "http://localhost:8000/upload-doc"
-DELETE_URL = "http://localhost:8000/delete-doc"
-RETRIEVER_URL = "http://localhost:8000/load-retriever"
+# Messages loaded from the history store at a time; older ones are fetched
+# on demand.
+HISTORY_PAGE_SIZE = 50
+# Seconds between ingestion progress polls while a file is being indexed.
+JOB_POLL_SECONDS = 1.0
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def ingest_progress():
+    """Poll the background ingestion job without blocking the rest of the page."""
+    session = st.session_state
+    if not session.get("ingest_job_id"):
+        return
+    try:
+        response = get_session().get(f"{JOBS_URL}/{session.ingest_job_id}")
+        response.raise_for_status()
+        job = response.json()
+    except Exception as e:
+        st.warning(f"⚠️ Could not fetch ingestion progress: {str(e)}")
+        return
+
+    if job["stage"] == "done":
+        session.ingest_job_id = None
+        session.retriever_ready = True
+        st.success("✅ Document processed and ready!")
+        st.rerun(scope="app")
+    elif job["stage"] in ("failed", "cancelled"):
+        session.ingest_job_id = None
+        session.file_id = None
+        session.retriever_ready = False
+        st.error(f"❌ Processing {job['stage']}: {job.get('error') or ''}")
+    else:
+        st.info(
+            f"⏳ Indexing: {job['rows_parsed']:,} rows/pages parsed, "
+            f"{job['chunks_embedded']:,} chunks embedded, {job['vectors_upserted']:,} vectors stored"
+        )
+        if job["queryable"] and not session.retriever_ready:
+            # Partial index: questions can be asked while the rest lands.
+            session.retriever_ready = True
+            st.rerun(scope="app")
 
 
 def chat(model_name, api_key):
@@ -26,13 +65,21 @@ def chat(model_name, api_key):
     if "retriever_ready" not in st.session_state:
         st.session_state.retriever_ready = False
 
+    if "ingest_job_id" not in st.session_state:
+        st.session_state.ingest_job_id = None
+
     if "messages" not in st.session_state:
-        history = get_history(st.session_state.session_id)
+        history = get_history(st.session_state.session_id, limit=HISTORY_PAGE_SIZE)
+        st.session_state.older_messages = 0
         if history and isinstance(history, list):
             st.session_state.messages = history
+            st.session_state.older_messages = count_history(st.session_state.session_id) - len(history)
         else:
             st.session_state.messages = [{"role": "assistant", "content": "Hi! Upload a file and ask me anything about it."}]
 
+    if "history_window" not in st.session_state:
+        st.session_state.history_window = ConversationWindow.from_messages(st.session_state.messages)
+
     session = st.session_state
 
     with st.sidebar:
@@ -41,17 +88,24 @@ def chat(model_name, api_key):
         if st.button("🔄 Reset Chat"):
             delete_history(session.session_id)
             session.messages = [{"role": "assistant", "content": "✅ Chat reset. Upload a new file to begin."}]
+            session.history_window = ConversationWindow.from_messages(session.messages)
+            session.older_messages = 0
             session.file_id = None
             session.retriever_ready = False
+            session.ingest_job_id = None
 
         uploaded_file = st.file_uploader("📁 Upload CSV, Excel, PDF, or DOCX", type=["csv", "xls", "xlsx", "pdf", "docx"])
         if uploaded_file and not session.file_id:
             session.file_id = str(uuid.uuid4())
-            with st.spinner("Uploading and processing file..."):
+            with st.spinner("Uploading file..."):
                 try:
                     files = {"file": (uploaded_file.name, uploaded_file.getvalue())}
-                    response = requests.post(UPLOAD_URL, files=files)
-                    if response.status_code == 200:
+                    response = get_session().post(UPLOAD_URL, files=files)
+                    if response.status_code == 202:
+                        result = response.json()
+                        session.file_id = result["file_id"]
+                        session.ingest_job_id = result["job_id"]
+                    elif response.status_code == 200:
                         result = response.json()
                         session.file_id = result["file_id"]
                         session.retriever_ready = True
@@ -63,15 +117,18 @@ def chat(model_name, api_key):
                     st.error(f"❌ Upload error: {str(e)}")
                     session.file_id = None
 
+        ingest_progress()
+
         if st.button("❌ Delete Uploaded Document"):
             if session.file_id:
                 with st.spinner("Deleting from vector DB..."):
                     try:
-                        response = requests.delete(f"{DELETE_URL}/{session.file_id}")
+                        response = get_session().delete(f"{DELETE_URL}/{session.file_id}")
                         if response.status_code == 200:
                             st.success("✅ Document deleted.")
                             session.file_id = None
                             session.retriever_ready = False
+                            session.ingest_job_id = None
                         else:
                             st.error("❌ Deletion failed: " + response.text)
                     except Exception as e:
@@ -83,10 +140,27 @@ def chat(model_name, api_key):
             st.markdown(f"**Session ID**: `{session.session_id}`")
             st.markdown(f"**File ID**: `{session.file_id}`")
             st.markdown(f"**Messages**: `{len(session.messages)}`")
+            st.markdown(f"**Prompt history**: `{len(session.history_window.messages)}` messages, `{session.history_window.tokens}` tokens")
+            if session.get("last_ttft") is not None:
+                st.markdown(f"**Time to first token**: `{session.last_ttft:.2f}s`")
+            if session.get("last_round_trips") is not None:
+                st.markdown(f"**API round trips last turn**: `{session.last_round_trips}`")
+            if session.get("last_turn_seconds") is not None:
+                st.markdown(f"**Last turn**: `{session.last_turn_seconds:.2f}s`")
+            if session.get("last_timings"):
+                st.json(session.last_timings, expanded=False)
+
+    if session.get("older_messages", 0) > 0 and st.button(f"⬆️ Load older messages ({session.older_messages})"):
+        older = get_history(session.session_id, limit=HISTORY_PAGE_SIZE, skip=count_history(session.session_id) - session.older_messages)
+        session.messages = older + session.messages
+        session.older_messages -= len(older)
 
     for msg in session.messages:
         st.chat_message(msg["role"]).markdown(msg["content"])
 
+    if session.ingest_job_id and session.retriever_ready:
+        st.caption("⏳ The file is still being indexed; answers use the part indexed so far.")
+
     if prompt := st.chat_input("Ask your question here..."):
         if not session.retriever_ready:
             st.warning("⚠️ Please upload and process a file first.")
@@ -94,47 +168,36 @@ def chat(model_name, api_key):
 
         st.chat_message("user").markdown(prompt)
         session.messages.append({"role": "user", "content": prompt})
+        session.history_window.add(session.messages[-1])
 
+        turn = timer("chat_turn_seconds")
         try:
-            response = requests.post(f"{RETRIEVER_URL}/{session.file_id}", json={"query": prompt})
-            response.raise_for_status()
-            context_chunks = response.json().get("context", [])
-            context = "\n\n".join(context_chunks)
-        except Exception as e:
-            st.error(f"❌ Retrieval error: {str(e)}")
-            return
-
-        history_str = ""
-        for m in session.messages:
-            if m["role"] in ["user", "assistant"]:
-                prefix = "User" if m["role"] == "user" else "Assistant"
-                history_str += f"{prefix}: {m['content']}\n"
-
-        format_hint = """
-Please format your answer using **Markdown**:
-- Use bullet points for lists
-- Use tables for tabular data
-- Wrap code (e.g. Python, SQL) in triple backticks (```python)
-"""
-        prompt_template = ChatPromptTemplate.from_messages([
-            ("system", f"You are a helpful data assistant. Use the following conversation history and file context to answer the user's question. {format_hint}"),
-            ("user", "History:\n{history}\n\nContext:\n{context}\n\nQuestion: {question}")
-        ])
-
-        try:
-            llm = GoogleGenerativeAI(model=model_name, google_api_key=api_key)
-            chain = prompt_template | llm
-            result = chain.invoke({
-                "history": history_str,
-                "context": context,
-                "question": prompt
-            })
-
-            answer = getattr(result, "content", str(result))
-            st.chat_message("assistant").markdown(answer)
+            body = {
+                "query": prompt,
+                "model_name": model_name,
+                "api_key": api_key,
+                "history": session.history_window.messages,
+                "summary": session.history_window.summary
+            }
+            start = time.perf_counter()
+            with turn, RequestCounter() as round_trips, get_session().post(f"{CHAT_URL}/{session.file_id}/stream", json=body, stream=True) as response:
+                if response.status_code != 200:
+                    st.error(f"❌ Chat error: {response.text}")
+                    return
+                timing = {}
+                answer = st.chat_message("assistant").write_stream(
+                    timed_tokens(sse_tokens(response, timing), "chat_ttft_seconds", timing, start)
+                )
+            session.last_ttft = timing.get("ttft")
+            session.last_turn_seconds = turn.seconds
+            # Server-side stage timings from the closing "done" event.
+            session.last_timings = timing.get("done", {}).get("timings")
+            session.last_round_trips = round_trips.count
             session.messages.append({"role": "assistant", "content": answer})
+            session.history_window.add(session.messages[-1])
 
-            save_history(session.session_id, session.messages)
+            # One write per turn with just the new messages.
+            append_history(session.session_id, session.messages[-2:])
 
         except Exception as e:
             st.error(f"❌ LLM Error: {str(e)}")
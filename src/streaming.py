@@ -0,0 +1,46 @@
+import json
+import time
+
+from api.metrics import observe
+
+
+def iter_sse_events(response):
+    """Yield ``(event, data)`` pairs from a text/event-stream response."""
+    event = None
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            event = None
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            yield event or "message", json.loads(line[len("data:"):].strip())
+
+
+def timed_tokens(tokens, metric: str, result: dict, start: float):
+    """Pass tokens through, recording time-to-first-token under ``metric``.
+
+    ``start`` is ``time.perf_counter()`` taken just before the request was
+    sent, so the upload and the server's work before its first token count.
+    ``result["ttft"]`` holds the measured seconds once the first token is
+    seen, so callers can show it next to the answer.
+    """
+    for token in tokens:
+        if "ttft" not in result:
+            result["ttft"] = time.perf_counter() - start
+            observe(metric, result["ttft"])
+        yield token
+
+
+def sse_tokens(response, result: dict):
+    """Yield summary/answer tokens from an SSE response.
+
+    The payload of the closing "done" event is stored in ``result["done"]``;
+    an "error" event is raised as RuntimeError.
+    """
+    for event, data in iter_sse_events(response):
+        if event == "error":
+            raise RuntimeError(data.get("detail", "Streaming failed"))
+        if event == "done":
+            result["done"] = data
+        elif "token" in data:
+            yield data["token"]
@@ -1,13 +1,14 @@
+import time
 import streamlit as st
 from dotenv import load_dotenv
-import os
-import tempfile
-import requests
+from src.api_client import get_session, SUMMARIZE_URL
+from src.streaming import sse_tokens, timed_tokens
+from api.metrics import timer
 
 
 load_dotenv()
 
-def summarize(model_name, api_key, api_url="http://localhost:8000/summarize/"):
+def summarize(model_name, api_key, api_url=SUMMARIZE_URL):
     st.write("# Summary of CSV/Excel")
     st.write("Upload your document here.")
 
@@ -20,25 +21,22 @@ def summarize(model_name, api_key, api_url="http://localhost:8000/summarize/"):
             try:
                 st.info("🔄 Sending file to API for summarization...")
 
-                with tempfile.NamedTemporaryFile(delete=False, suffix=uploaded_file.name) as temp:
-                    temp.write(uploaded_file.getvalue())
-                    temp_path = temp.name
-
-                with open(temp_path, "rb") as f:
-                    files = {"file": (uploaded_file.name, f, uploaded_file.type)}
-                    data = {
-                        "model_name": model_name,
-                        "api_key": api_key
-                    }
-                    response = requests.post(api_url, files=files, data=data)
-
-                os.remove(temp_path)
-
-                if response.status_code == 200:
-                    summary = response.json().get("summary")
-                    st.success(summary)
-                else:
-                    st.error(f"❌ API Error: {response.json().get('error')}")
+                files = {"file": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)}
+                data = {
+                    "model_name": model_name,
+                    "api_key": api_key
+                }
+                start = time.perf_counter()
+                with timer("summarize_turn_seconds"), get_session().post(api_url, files=files, data=data, stream=True) as response:
+                    if response.status_code == 200:
+                        result = {}
+                        st.write_stream(timed_tokens(sse_tokens(response, result), "summarize_ttft_seconds", result, start))
+                        if result.get("done", {}).get("cache") == "hit":
+                            st.caption("⚡ Served from the summary cache.")
+                        elif "ttft" in result:
+                            st.caption(f"⏱️ First token after {result['ttft']:.2f}s")
+                    else:
+                        st.error(f"❌ API Error: {response.json().get('detail')}")
 
             except Exception as e:
                 st.error(f"❌ Unexpected Error: {str(e)}")
@@ -0,0 +1,51 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.api_client import RequestCounter, get_session
+
+
+class _Ok(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Ok)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+def test_counts_only_requests_made_inside_the_block(url):
+    get_session().get(url)
+    with RequestCounter() as round_trips:
+        get_session().get(url)
+        get_session().get(url)
+    get_session().get(url)
+    assert round_trips.count == 2
+
+
+def test_other_threads_are_not_counted(url):
+    # Another browser session (or the job-status poll) in its own thread.
+    other = threading.Thread(target=lambda: [get_session().get(url) for _ in range(5)])
+    with RequestCounter() as round_trips:
+        other.start()
+        other.join()
+        get_session().get(url)
+    assert round_trips.count == 1
+
+
+def test_nested_counters_both_count(url):
+    with RequestCounter() as outer:
+        get_session().get(url)
+        with RequestCounter() as inner:
+            get_session().get(url)
+    assert (outer.count, inner.count) == (2, 1)
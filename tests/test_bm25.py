@@ -0,0 +1,108 @@
+import math
+from collections import Counter
+
+import pytest
+
+from api.bm25 import B, K1, BM25Builder, BM25Index, BM25Store, reciprocal_rank_fusion, tokenize
+
+TEXTS = [
+    "order SKU-1042 shipped to Berlin",
+    "order SKU-2077 returned from Paris",
+    "invoice for SKU-1042 paid in full, paid early",
+    "customer asked about delivery to Berlin and Paris",
+    "",
+]
+
+
+def _index(path, texts=TEXTS):
+    builder = BM25Builder()
+    for text in texts:
+        builder.add(text)
+    builder.save(str(path))
+    return BM25Index(str(path))
+
+
+def _reference_scores(texts, query):
+    docs = [Counter(tokenize(text)) for text in texts]
+    avgdl = sum(sum(doc.values()) for doc in docs) / len(docs)
+    scores = []
+    for doc in docs:
+        length = sum(doc.values())
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in other for other in docs)
+            if not doc[term]:
+                continue
+            idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * doc[term] * (K1 + 1) / (doc[term] + K1 * (1 - B + B * length / avgdl))
+        scores.append(score)
+    return scores
+
+
+def test_compound_identifiers_are_kept_whole_and_split():
+    assert tokenize("Ship SKU-1042 to a.b@c.com") == [
+        "ship", "sku", "1042", "to", "a", "b", "c", "com", "sku-1042", "a.b@c.com"
+    ]
+
+
+@pytest.mark.parametrize("query", ["berlin", "paid SKU-1042", "order to paris", "delivery"])
+def test_scores_match_the_bm25_formula(tmp_path, query):
+    index = _index(tmp_path / "index")
+    expected = _reference_scores(TEXTS, query)
+
+    results = index.search(query, k=10)
+
+    assert [doc for doc, _ in results] == sorted(
+        (doc for doc, score in enumerate(expected) if score), key=lambda doc: -expected[doc]
+    )
+    for doc, score in results:
+        assert score == pytest.approx(expected[doc], rel=1e-5)
+
+
+def test_exact_identifier_outranks_its_parts(tmp_path):
+    index = _index(tmp_path / "index")
+
+    results = index.search("SKU-1042", k=5)
+
+    # SKU-2077 only shares the "sku" part.
+    assert {doc for doc, _ in results[:2]} == {0, 2}
+    assert [doc for doc, _ in results[2:]] == [1]
+
+
+def test_unknown_terms_and_empty_indexes_find_nothing(tmp_path):
+    assert _index(tmp_path / "index").search("tokyo", k=3) == []
+    assert _index(tmp_path / "empty", texts=[]).search("berlin", k=3) == []
+
+
+def test_texts_round_trip(tmp_path):
+    index = _index(tmp_path / "index")
+    assert [index.text(doc) for doc in range(len(index))] == TEXTS
+
+
+def test_store_reloads_a_replaced_index(tmp_path):
+    store = BM25Store(str(tmp_path / "bm25"))
+    builder = BM25Builder()
+    builder.add("berlin")
+    store.save("f1", builder)
+    first = store.get("f1")
+    assert store.get("f1") is first
+
+    builder.add("paris")
+    store.save("f1", builder)
+    assert len(store.get("f1")) == 2
+
+    store.delete("f1")
+    assert store.get("f1") is None
+
+
+def test_fusion_rewards_agreement_between_rankings():
+    dense = ["a", "b", "c", "d"]
+    keyword = ["c", "a", "e"]
+
+    assert reciprocal_rank_fusion([dense, keyword], k=3) == ["a", "c", "b"]
+    assert reciprocal_rank_fusion([dense, keyword], k=10) == ["a", "c", "b", "e", "d"]
+
+
+def test_fusion_of_a_single_ranking_keeps_its_order():
+    assert reciprocal_rank_fusion([["x", "y", "z"]], k=2) == ["x", "y"]
+    assert reciprocal_rank_fusion([[], []], k=2) == []
@@ -0,0 +1,96 @@
+import sqlite3
+
+import pytest
+
+from api import cache
+from api.cache import SQLiteCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    return clock
+
+
+def _summed(store):
+    return store._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, clock):
+    store = SQLiteCache(str(tmp_path / "cache.sqlite"), max_bytes=30)
+    store.set_many({"a": b"x" * 10, "b": b"x" * 10, "c": b"x" * 10})
+    assert store.get("a") == b"x" * 10
+
+    store.set("d", b"x" * 10)
+
+    assert store.get_many(["a", "b", "c", "d"]).keys() == {"a", "c", "d"}
+    assert store._bytes() == 30
+
+
+def test_an_entry_larger_than_the_cache_is_not_kept(tmp_path, clock):
+    store = SQLiteCache(str(tmp_path / "cache.sqlite"), max_bytes=30)
+    store.set("a", b"x" * 10)
+
+    store.set("big", b"x" * 40)
+
+    assert len(store) == 0 and store._bytes() == 0
+
+
+def test_triggers_keep_the_total_in_step(tmp_path, clock):
+    store = SQLiteCache(str(tmp_path / "cache.sqlite"), max_bytes=1000)
+    store.set_many({"a": b"x" * 10, "b": b"x" * 20})
+    assert store._bytes() == _summed(store) == 30
+
+    store.set("a", b"x" * 50)
+    assert store._bytes() == _summed(store) == 70
+
+    store.delete("b")
+    assert store._bytes() == _summed(store) == 50
+
+
+def test_total_is_shared_between_connections(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    first = SQLiteCache(path, max_bytes=30)
+    second = SQLiteCache(path, max_bytes=30)
+    first.set_many({"a": b"x" * 10, "b": b"x" * 10})
+
+    second.set("c", b"x" * 20)
+
+    assert first._bytes() == second._bytes() == 30
+    assert first.get_many(["a", "b", "c"]).keys() == {"b", "c"}
+
+
+def test_existing_entries_seed_the_total(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+        " created REAL NOT NULL, accessed REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO entries VALUES ('a', x'00', 12, 0, 0), ('b', x'00', 8, 0, 0)")
+    conn.commit()
+    conn.close()
+
+    assert SQLiteCache(path, max_bytes=1000)._bytes() == 20
+
+
+def test_expired_entries_are_misses_and_purged_on_write(tmp_path, clock):
+    store = SQLiteCache(str(tmp_path / "cache.sqlite"), max_bytes=1000, ttl=5)
+    store.set("a", b"x")
+    assert store.get("a") == b"x"
+
+    clock.now += 10
+    assert store.get("a") is None
+    store.set("b", b"y")
+    assert len(store) == 1
+    assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
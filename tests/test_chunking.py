@@ -0,0 +1,76 @@
+import pytest
+
+from api.chunking import iter_csv_chunks, pack_rows
+from api.history import count_tokens
+
+HEADER = ["region", "channel", "units"]
+
+
+def _rows(n):
+    return [(i, ["North" if i % 2 else "South", "web", str(i)]) for i in range(n)]
+
+
+def _chunk_tokens(chunk):
+    return sum(count_tokens(line) + 1 for line in chunk.page_content.split("\n"))
+
+
+def test_every_chunk_has_the_header_and_whole_rows_in_order():
+    chunks = list(pack_rows(HEADER, _rows(40), {"source": "orders.csv"}, max_tokens=40))
+
+    assert len(chunks) > 1
+    lines = []
+    for chunk in chunks:
+        header, *rows = chunk.page_content.split("\n")
+        assert header == "region,channel,units"
+        assert chunk.metadata["rows"] == len(rows)
+        assert chunk.metadata["source"] == "orders.csv"
+        lines.extend(rows)
+    assert lines == [",".join(values) for _, values in _rows(40)]
+
+
+def test_row_ranges_cover_every_row_without_overlap():
+    chunks = list(pack_rows(HEADER, _rows(40), {}, max_tokens=40))
+
+    ranges = [(chunk.metadata["row_start"], chunk.metadata["row_end"]) for chunk in chunks]
+    assert ranges[0][0] == 0 and ranges[-1][1] == 39
+    assert all(end + 1 == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert all(end - start + 1 == chunk.metadata["rows"] for (start, end), chunk in zip(ranges, chunks))
+
+
+@pytest.mark.parametrize("max_tokens", [20, 40, 300])
+def test_chunks_stay_within_the_token_budget(max_tokens):
+    chunks = list(pack_rows(HEADER, _rows(100), {}, max_tokens=max_tokens))
+
+    assert all(_chunk_tokens(chunk) <= max_tokens for chunk in chunks)
+    # A chunk is only closed when the next row would not fit.
+    for chunk, following in zip(chunks, chunks[1:]):
+        next_line = following.page_content.split("\n")[1]
+        assert _chunk_tokens(chunk) + count_tokens(next_line) + 1 > max_tokens
+
+
+def test_a_row_larger_than_the_budget_is_its_own_chunk():
+    rows = [(0, ["North", "web", "1"]), (1, ["South", "web " * 100, "2"]), (2, ["East", "store", "3"])]
+
+    chunks = list(pack_rows(HEADER, rows, {}, max_tokens=30))
+
+    assert [(chunk.metadata["row_start"], chunk.metadata["row_end"]) for chunk in chunks] == [(0, 0), (1, 1), (2, 2)]
+
+
+def test_values_are_quoted_like_csv_and_metadata_is_not_shared():
+    metadata = {"source": "orders.csv"}
+
+    chunks = list(pack_rows(["name", "note"], [(0, ["Smith, J", 'said "hi"'])], metadata))
+
+    assert chunks[0].page_content == 'name,note\n"Smith, J","said ""hi"""'
+    assert metadata == {"source": "orders.csv"}
+    assert list(pack_rows(HEADER, [], metadata)) == []
+
+
+def test_csv_files_are_packed_with_stripped_values(tmp_path):
+    path = tmp_path / "orders.csv"
+    path.write_text(" region , units\nNorth , 3\n\nSouth,5,extra\n", encoding="utf-8")
+
+    chunks = list(iter_csv_chunks(str(path)))
+
+    assert [chunk.page_content for chunk in chunks] == ["region,units\nNorth,3\nSouth,5,extra"]
+    assert chunks[0].metadata == {"source": str(path), "row_start": 0, "row_end": 1, "rows": 2}
@@ -0,0 +1,57 @@
+import gc
+import os
+
+import pandas as pd
+import pytest
+
+from api.datasets import DatasetStore
+from api.query_engine import answer_question
+
+
+def _csv(tmp_path, name, rows=2000):
+    path = tmp_path / f"{name}.csv"
+    pd.DataFrame({
+        "region": [["North", "South", "West"][i % 3] for i in range(rows)],
+        "units": range(rows),
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Room for one dataset only, so every load evicts the others it can.
+    return DatasetStore(str(tmp_path / "datasets"), max_bytes=1)
+
+
+def test_lazy_frame_answers_from_parquet(tmp_path, store):
+    frame = store.load("a", _csv(tmp_path, "a"))
+
+    assert frame.shape == (2000, 2)
+    assert answer_question(frame, "how many rows where region is 'north'") == "**Number of rows**: 667"
+    assert answer_question(frame, "maximum units") == "**Maximum of `units`**: 1999"
+    assert answer_question(frame, "how many rows where units > 5000") is None
+
+
+def test_datasets_with_open_frames_are_not_evicted(tmp_path, store):
+    first = store.load("a", _csv(tmp_path, "a"))
+    store.load("b", _csv(tmp_path, "b"))
+
+    assert os.path.isdir(store.path("a"))
+    assert answer_question(first, "total units by region where units < 3") is not None
+
+
+def test_datasets_are_evicted_once_their_frames_are_gone(tmp_path, store):
+    store.load("a", _csv(tmp_path, "a"))
+    gc.collect()
+    store.load("b", _csv(tmp_path, "b"))
+
+    assert not os.path.isdir(store.path("a"))
+    assert os.path.isdir(store.path("b"))
+
+
+def test_reloading_a_converted_dataset_reuses_it(tmp_path, store):
+    path = _csv(tmp_path, "a")
+    first = store.load("a", path)
+    os.remove(path)
+
+    assert store.load("a", path).shape == first.shape
@@ -0,0 +1,166 @@
+import threading
+
+import pytest
+
+from api import db
+from api.db import MemoryHistoryStore, MongoHistoryStore, SQLiteHistoryStore
+
+
+class _Cursor:
+    def __init__(self, docs, projection):
+        self._docs = docs
+        self._projection = projection
+
+    def sort(self, key, direction):
+        self._docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def skip(self, n):
+        self._docs = self._docs[n:]
+        return self
+
+    def limit(self, n):
+        self._docs = self._docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter([{key: doc[key] for key, keep in self._projection.items() if keep and key in doc} for doc in self._docs])
+
+
+class _Collection:
+    # The few pymongo calls MongoHistoryStore makes, over a list of dicts.
+    def __init__(self):
+        self.docs = []
+
+    def _matching(self, query):
+        return [doc for doc in self.docs if all(doc.get(key) == value for key, value in query.items())]
+
+    def find(self, query, projection):
+        return _Cursor(self._matching(query), projection)
+
+    def find_one(self, query, projection=None):
+        found = self._matching(query)
+        return dict(found[0]) if found else None
+
+    def find_one_and_update(self, query, update, upsert, return_document):
+        found = self._matching(query)
+        doc = found[0] if found else None
+        if doc is None:
+            doc = dict(query)
+            self.docs.append(doc)
+        for key, value in update["$inc"].items():
+            doc[key] = doc.get(key, 0) + value
+        return dict(doc)
+
+    def insert_many(self, docs, ordered=True):
+        self.docs.extend(dict(doc) for doc in docs)
+
+    def delete_many(self, query):
+        self.docs = [doc for doc in self.docs if doc not in self._matching(query)]
+
+    def delete_one(self, query):
+        found = self._matching(query)
+        if found:
+            self.docs.remove(found[0])
+
+
+def _mongo_store():
+    store = MongoHistoryStore.__new__(MongoHistoryStore)
+    store.turns, store.sessions, store.legacy = _Collection(), _Collection(), _Collection()
+    store._return_after = None
+    return store
+
+
+@pytest.fixture(params=["mongo", "sqlite", "memory"])
+def store(request, tmp_path):
+    if request.param == "mongo":
+        return _mongo_store()
+    if request.param == "sqlite":
+        return SQLiteHistoryStore(str(tmp_path / "history.sqlite"))
+    return MemoryHistoryStore()
+
+
+def _turn(i):
+    return [{"role": "user", "content": f"q{i}"}, {"role": "assistant", "content": f"a{i}"}]
+
+
+def test_appended_messages_come_back_oldest_first(store):
+    store.append("s1", _turn(0))
+    store.append("s1", _turn(1))
+    store.append("s1", [])
+    store.append("s2", _turn(9))
+
+    assert store.get("s1") == _turn(0) + _turn(1)
+    assert store.count("s1") == 4
+    assert store.count("nobody") == 0 and store.get("nobody") == []
+
+
+def test_limit_and_skip_page_back_from_the_newest(store):
+    for i in range(3):
+        store.append("s1", _turn(i))
+
+    assert store.get("s1", limit=2) == _turn(2)
+    assert store.get("s1", limit=2, skip=2) == _turn(1)
+    assert store.get("s1", skip=4) == _turn(0)
+    assert store.get("s1", limit=5, skip=5) == [{"role": "user", "content": "q0"}]
+
+
+def test_delete_removes_only_that_session(store):
+    store.append("s1", _turn(0))
+    store.append("s2", _turn(1))
+
+    store.delete("s1")
+
+    assert store.get("s1") == [] and store.count("s1") == 0
+    assert store.get("s2") == _turn(1)
+    store.append("s1", _turn(2))
+    assert store.get("s1") == _turn(2)
+
+
+def test_mongo_moves_legacy_sessions_to_per_message_rows():
+    store = _mongo_store()
+    store.legacy.docs.append({"session_id": "s1", "history": _turn(0) + _turn(1)})
+
+    assert store.get("s1", limit=2) == _turn(1)
+
+    assert store.legacy.docs == []
+    assert store.count("s1") == 4
+    assert store.get("s1") == _turn(0) + _turn(1)
+
+
+def test_save_history_writes_only_the_new_tail(monkeypatch):
+    store = MemoryHistoryStore()
+    monkeypatch.setattr(db, "_store", store)
+    db.save_history("s1", _turn(0))
+
+    db.save_history("s1", _turn(0) + _turn(1))
+
+    assert db.get_history("s1") == _turn(0) + _turn(1)
+    assert db.count_history("s1") == 4
+
+
+def test_sqlite_appends_from_several_workers_get_distinct_seqs(tmp_path):
+    # One store per thread: separate connections, like separate API workers.
+    path = str(tmp_path / "history.sqlite")
+    stores = [SQLiteHistoryStore(path) for _ in range(4)]
+    errors = []
+
+    def append(store, worker):
+        try:
+            for turn in range(25):
+                store.append("s1", [{"role": "user", "content": f"{worker}:{turn}"},
+                                    {"role": "assistant", "content": f"{worker}:{turn}"}])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=append, args=(store, i)) for i, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    history = stores[0].get("s1")
+    assert stores[0].count("s1") == len(history) == 200
+    # Each turn's two messages stay next to each other.
+    assert all(history[i]["content"] == history[i + 1]["content"] for i in range(0, 200, 2))
@@ -0,0 +1,148 @@
+import asyncio
+import io
+import os
+import socket
+import threading
+import time
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from starlette.datastructures import UploadFile
+
+from api import api_utils, fingerprints, jobs, registry
+from api.fingerprints import FileRegistry
+from api.jobs import JobManager, JobStore
+from api.vectorstores import LocalVectorStore
+
+CSV = b"region,units\n" + b"".join(b"North,%d\n" % i for i in range(50))
+
+
+@pytest.fixture
+def files(tmp_path):
+    return FileRegistry(str(tmp_path / "files.sqlite"))
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    # Per-process singletons pointed at tmp_path, with a fake embedding.
+    embedding = DeterministicFakeEmbedding(size=8)
+    monkeypatch.setattr(registry, "BM25_INDEX_DIR", "")
+    monkeypatch.setattr(registry, "_embedding", embedding)
+    monkeypatch.setattr(registry, "_vectorstore", LocalVectorStore(embedding, str(tmp_path / "index")))
+    monkeypatch.setattr(registry, "_file_registry", FileRegistry(str(tmp_path / "files.sqlite")))
+    monkeypatch.setattr(registry, "_query_cache", None)
+    monkeypatch.setattr(registry, "_bm25_store", None)
+    monkeypatch.setattr(jobs, "_job_manager", None)
+    return tmp_path
+
+
+def _upload(file_id):
+    upload = UploadFile(io.BytesIO(CSV), filename="orders.csv")
+    return asyncio.run(api_utils.submit_ingest_job(upload, file_id))
+
+
+def _busy_manager(path):
+    manager = JobManager(workers=1, store=JobStore(str(path / "jobs.sqlite")))
+    started, release = threading.Event(), threading.Event()
+    manager.submit("blocker", "blocker.csv", lambda job: started.set() or release.wait(5))
+    assert started.wait(5)
+    return manager, release
+
+
+def _finished(job):
+    deadline = time.time() + 10
+    while job.stage not in jobs.FINISHED and time.time() < deadline:
+        time.sleep(0.01)
+    return job.stage
+
+
+def test_claim_reuses_the_file_id_and_counts_references(files):
+    assert files.claim("csv:abc", "f1") == ("f1", True)
+    assert files.claim("csv:abc", "f2") == ("f1", False)
+    assert files.claim("csv:def", "f3") == ("f3", True)
+
+    assert files.release("f1") == 1
+    assert files.release("f1") == 0
+    assert files.release("f1") is None
+    assert files.claim("csv:abc", "f4") == ("f4", True)
+
+
+def test_forget_drops_every_reference(files):
+    files.claim("csv:abc", "f1")
+    files.claim("csv:abc", "f2")
+
+    files.forget("f1")
+
+    assert files.release("f1") is None
+    assert files.claim("csv:abc", "f5") == ("f5", True)
+
+
+def test_claims_are_shared_between_connections(tmp_path):
+    first = FileRegistry(str(tmp_path / "files.sqlite"))
+    second = FileRegistry(str(tmp_path / "files.sqlite"))
+
+    assert first.claim("csv:abc", "f1") == ("f1", True)
+    assert second.claim("csv:abc", "f2") == ("f1", False)
+    assert first.release("f1") == 1
+
+
+def test_invalidations_skip_the_caller_own_records(files):
+    latest, file_ids = files.invalidations_since(None, "worker-a")
+    assert file_ids == []
+
+    files.log_invalidation("f1", "worker-b")
+    files.log_invalidation("f2", "worker-a")
+    files.log_invalidation("f1", "worker-b")
+
+    seq, file_ids = files.invalidations_since(latest, "worker-a")
+    assert file_ids == ["f1"]
+    assert files.invalidations_since(seq, "worker-a") == (seq, [])
+
+
+def test_pruned_invalidations_report_unknown_changes(files, monkeypatch):
+    latest, _ = files.invalidations_since(None, "worker-a")
+    files.log_invalidation("f1", "worker-b")
+    monkeypatch.setattr(fingerprints, "INVALIDATION_LOG_SECONDS", -1)
+    files.log_invalidation("f2", "worker-b")
+
+    seq, file_ids = files.invalidations_since(latest, "worker-a")
+    assert file_ids is None
+    assert seq == latest + 2
+
+
+def test_upload_dropped_at_shutdown_releases_its_claim(api, monkeypatch):
+    manager, release = _busy_manager(api)
+    monkeypatch.setattr(jobs, "_job_manager", manager)
+    file_id, job, deduplicated = _upload("first")
+    assert (file_id, job.stage, deduplicated) == ("first", jobs.QUEUED, False)
+
+    manager.shutdown()
+    release.set()
+    monkeypatch.setattr(jobs, "_job_manager", JobManager(workers=1, store=JobStore(str(api / "jobs.sqlite"))))
+
+    file_id, job, deduplicated = _upload("second")
+    assert (file_id, deduplicated) == ("second", False)
+    assert _finished(job) == jobs.DONE
+    jobs._job_manager.shutdown()
+
+
+def test_upload_of_a_killed_worker_is_recovered_before_dedupe(api, monkeypatch):
+    manager, release = _busy_manager(api)
+    monkeypatch.setattr(jobs, "_job_manager", manager)
+    _, job, _ = _upload("first")
+    # Same pid with another start time: the worker that queued it is gone.
+    manager.store._conn.execute(
+        "UPDATE jobs SET owner = ? WHERE id = ?", (f"{socket.gethostname()}:{os.getpid()}:1", job.id)
+    )
+    manager.store._conn.commit()
+    restarted = JobManager(workers=1, store=JobStore(str(api / "jobs.sqlite")))
+    monkeypatch.setattr(jobs, "_job_manager", restarted)
+    try:
+        file_id, second, deduplicated = _upload("second")
+        assert (file_id, deduplicated) == ("second", False)
+        assert restarted.get(job.id).stage == jobs.FAILED
+        assert _finished(second) == jobs.DONE
+    finally:
+        manager.shutdown()
+        release.set()
+        restarted.shutdown()
@@ -0,0 +1,61 @@
+import io
+
+import pandas as pd
+import pytest
+
+from api.frames import compact_frame, read_compact_csv
+from api.query_engine import answer_question
+
+CSV = "\n".join(
+    ["region,channel,units,price,order_id"]
+    + [f"{region},{channel},{units},{units * 1.5},{i}" for i, (region, channel, units) in enumerate(
+        [("North", "web", 3), ("South", "store", 5), ("North", "store", 2), ("West", "web", 9),
+         ("East", "web", 1), ("North", "web", 4), ("South", "web", 7), ("East", "store", 6)] * 3
+    )]
+) + "\n"
+
+
+@pytest.fixture
+def raw():
+    return pd.read_csv(io.StringIO(CSV))
+
+
+@pytest.fixture
+def compact():
+    df, stats = read_compact_csv(io.StringIO(CSV), chunksize=10)
+    assert stats.rows == 24
+    return df
+
+
+def test_low_cardinality_text_becomes_category(raw, compact):
+    assert isinstance(compact["region"].dtype, pd.CategoricalDtype)
+    assert isinstance(compact["channel"].dtype, pd.CategoricalDtype)
+    assert compact["units"].dtype == "int8"
+    assert compact["price"].dtype == "float32"
+    pd.testing.assert_frame_equal(compact.astype(raw.dtypes.to_dict()), raw)
+
+
+def test_chunks_share_one_set_of_categories(compact):
+    assert sorted(compact["region"].cat.categories) == ["East", "North", "South", "West"]
+
+
+def test_high_cardinality_text_stays_text():
+    df = compact_frame(pd.DataFrame({"code": ["a", "b", "c", "d"], "kind": ["x", "x", "y", "x"]}))
+    assert not isinstance(df["code"].dtype, pd.CategoricalDtype)
+    assert isinstance(df["kind"].dtype, pd.CategoricalDtype)
+
+
+@pytest.mark.parametrize("question", [
+    "number of rows by region",
+    "number of rows by region where channel is 'store'",
+    "total units by region where channel = 'web'",
+    "average price per channel where region is 'North'",
+    "top 2 region by total units where channel is 'store'",
+    "bottom 2 region by average units where units > 2",
+    "top 3 most common values of region where channel is 'web'",
+    "unique values of region where units >= 5",
+])
+def test_compact_frames_answer_like_plain_ones(raw, compact, question):
+    answer = answer_question(compact, question)
+    assert answer is not None
+    assert answer == answer_question(raw, question)
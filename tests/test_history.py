@@ -0,0 +1,56 @@
+from api.history import ConversationWindow, count_tokens, extractive_summary
+
+
+def _message(role, words):
+    return {"role": role, "content": " ".join(f"word{i}" for i in range(words))}
+
+
+def _recording_summarizer(evicted):
+    def summarize(summary, message, max_tokens):
+        evicted.append(message)
+        return f"{summary}|{message['content'][:6]}"
+    return summarize
+
+
+def test_window_keeps_the_newest_messages_within_budget():
+    messages = [_message("user" if i % 2 else "assistant", 20) for i in range(10)]
+    budget = 3 * count_tokens(messages[0]["content"])
+
+    window = ConversationWindow.from_messages(messages, max_tokens=budget)
+
+    assert window.messages == messages[-3:]
+    assert window.tokens == sum(count_tokens(m["content"]) for m in messages[-3:]) <= budget
+
+
+def test_evicted_messages_are_summarized_oldest_first():
+    evicted = []
+    window = ConversationWindow(max_tokens=1, summarizer=_recording_summarizer(evicted))
+    messages = [{"role": "user", "content": f"turn {i}"} for i in range(3)]
+
+    for message in messages:
+        window.add(message)
+
+    assert evicted == messages[:2]
+    assert window.summary == "|turn 0|turn 1"
+    # The newest message stays even though it alone is over the budget.
+    assert window.messages == messages[-1:]
+
+
+def test_other_roles_are_ignored_and_clear_resets():
+    window = ConversationWindow()
+    window.add({"role": "system", "content": "be brief"})
+    window.add({"role": "user", "content": "hello"})
+
+    assert window.messages == [{"role": "user", "content": "hello"}]
+    window.clear()
+    assert (window.messages, window.summary, window.tokens) == ([], "", 0)
+
+
+def test_extractive_summary_drops_its_oldest_lines_past_the_budget():
+    summary = ""
+    for i in range(50):
+        summary = extractive_summary(summary, {"role": "user", "content": f"question number {i}"}, max_tokens=30)
+
+    assert count_tokens(summary) <= 30
+    assert summary.splitlines()[-1] == "User: question number 49"
+    assert extractive_summary("", {"role": "assistant", "content": "x" * 500}, 400).endswith("x…")
@@ -0,0 +1,60 @@
+import sys
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from api.ingest import ingest_chunks
+
+
+class _Store:
+    def __init__(self, fail_after=None):
+        self.rows = []
+        self.fail_after = fail_after
+
+    def add_embeddings(self, texts, vectors, metadatas):
+        if self.fail_after is not None and len(self.rows) >= self.fail_after:
+            raise RuntimeError("upsert failed")
+        self.rows.extend(zip(texts, metadatas))
+
+
+def _chunks(n):
+    return (Document(page_content=f"chunk {i}", metadata={"i": i}) for i in range(n))
+
+
+def test_every_chunk_is_embedded_and_upserted_once():
+    store, events = _Store(), []
+    stats = ingest_chunks(_chunks(25), store, DeterministicFakeEmbedding(size=4), batch_size=4, workers=2,
+                          on_progress=lambda event, count: events.append((event, count)))
+
+    assert (stats.chunks, stats.batches) == (25, 7)
+    assert sorted(metadata["i"] for _, metadata in store.rows) == list(range(25))
+    assert sum(count for event, count in events if event == "upserted") == 25
+    assert sum(count for event, count in events if event == "embedded") == 25
+
+
+def test_upsert_errors_stop_the_ingest():
+    with pytest.raises(RuntimeError, match="upsert failed"):
+        ingest_chunks(_chunks(100), _Store(fail_after=8), DeterministicFakeEmbedding(size=4), batch_size=4)
+
+
+def test_progress_callback_can_cancel():
+    def cancel(event, count):
+        if event == "upserted":
+            raise RuntimeError("cancelled")
+
+    store = _Store()
+    with pytest.raises(RuntimeError, match="cancelled"):
+        ingest_chunks(_chunks(100), store, DeterministicFakeEmbedding(size=4), batch_size=4, on_progress=cancel)
+    assert len(store.rows) < 100
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc/self/statm")
+def test_peak_rss_is_measured_per_ingest():
+    # An earlier, larger allocation raises the process peak but must not
+    # show up as this ingest's peak.
+    block = b"x" * (200 * 1024 * 1024)
+    del block
+    stats = ingest_chunks(_chunks(10), _Store(), DeterministicFakeEmbedding(size=4), batch_size=4)
+
+    assert 0 < stats.peak_rss_mb < stats.process_peak_rss_mb - 100
@@ -0,0 +1,157 @@
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from api import jobs
+from api.jobs import Job, JobCancelled, JobManager, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite"))
+
+
+def _busy(started: threading.Event):
+    def run(job):
+        started.set()
+        while True:
+            job.progress("parsed", 1)
+            time.sleep(0.01)
+    return run
+
+
+def _unfinished(store, job_id, owner, age=0.0):
+    job = Job(id=job_id, file_id=f"file-{job_id}", filename="orders.csv", stage=jobs.RUNNING)
+    store.save(job)
+    store._conn.execute("UPDATE jobs SET owner = ?, updated = ? WHERE id = ?", (owner, time.time() - age, job_id))
+    store._conn.commit()
+
+
+def test_shutdown_discards_jobs_that_never_started(store):
+    manager = JobManager(workers=1, store=store)
+    started = threading.Event()
+    running = manager.submit("file-a", "a.csv", _busy(started))
+    assert started.wait(5)
+    discarded = []
+    queued = manager.submit("file-b", "b.csv", lambda job: {"rows": 1}, discard=discarded.append)
+
+    manager.shutdown()
+
+    assert discarded == [queued]
+    assert store.get(queued.id).stage == jobs.CANCELLED
+    deadline = time.time() + 5
+    while running.stage != jobs.CANCELLED and time.time() < deadline:
+        time.sleep(0.01)
+    assert running.stage == jobs.CANCELLED
+
+
+def test_job_cancelled_while_queued_still_runs_to_clean_up(store):
+    manager = JobManager(workers=1, store=store)
+    started, release = threading.Event(), threading.Event()
+    manager.submit("file-a", "a.csv", lambda job: started.set() or release.wait(5))
+    assert started.wait(5)
+    calls = []
+
+    def run(job):
+        calls.append(job.id)
+        job.progress("parsed", 0)
+
+    queued = manager.submit("file-b", "b.csv", run)
+    assert manager.cancel_file("file-b") == 1
+    release.set()
+    deadline = time.time() + 5
+    while queued.stage != jobs.CANCELLED and time.time() < deadline:
+        time.sleep(0.01)
+    assert calls == [queued.id]
+    assert queued.stage == jobs.CANCELLED
+    manager.shutdown()
+
+
+def test_jobs_of_an_exited_process_are_taken_once(store):
+    # Same pid with another start time: the pid was recycled.
+    _unfinished(store, "dead", f"{socket.gethostname()}:{os.getpid()}:1")
+    _unfinished(store, "alive", store.owner)
+
+    taken = store.take_abandoned()
+
+    assert [job.id for job in taken] == ["dead"]
+    assert store.get("dead").stage == jobs.FAILED
+    assert store.get("dead").error
+    assert store.get("alive").stage == jobs.RUNNING
+    assert store.take_abandoned() == []
+
+
+def test_stale_jobs_are_abandoned(store):
+    _unfinished(store, "stale", "elsewhere:1:1", age=jobs.JOB_STALE_SECONDS + 1)
+    _unfinished(store, "fresh", "elsewhere:1:1")
+
+    assert [job.id for job in store.take_abandoned()] == ["stale"]
+    assert [job.id for job in store.active_for_file("file-fresh")] == ["fresh"]
+
+
+def test_heartbeat_keeps_queued_jobs_fresh(store, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_SYNC_SECONDS", 0.05)
+    manager = JobManager(workers=1, store=store)
+    started, release = threading.Event(), threading.Event()
+    manager.submit("file-a", "a.csv", lambda job: started.set() or release.wait(5))
+    assert started.wait(5)
+    queued = manager.submit("file-b", "b.csv", lambda job: None)
+    store._conn.execute("UPDATE jobs SET updated = 0 WHERE id = ?", (queued.id,))
+    store._conn.commit()
+    time.sleep(0.3)
+
+    assert store.take_abandoned() == []
+    release.set()
+    manager.shutdown()
+
+
+def test_recover_abandoned_cleans_up_each_job(store):
+    _unfinished(store, "dead", f"{socket.gethostname()}:{os.getpid()}:1")
+    manager = JobManager(workers=1, store=store)
+    cleaned = []
+
+    manager.recover_abandoned(lambda job: cleaned.append(job.file_id))
+    manager.recover_abandoned(lambda job: cleaned.append(job.file_id))
+
+    assert cleaned == ["file-dead"]
+    manager.shutdown()
+
+
+def test_progress_raises_once_cancelled():
+    job = Job(id="j", file_id="f", filename="orders.csv")
+    job.progress("upserted", 3)
+    job.cancel()
+    with pytest.raises(JobCancelled):
+        job.progress("upserted", 3)
+    assert job.vectors_upserted == 3
+
+
+def test_run_tracks_a_job_in_the_calling_thread(store):
+    manager = JobManager(workers=1, store=store)
+
+    job = manager.run("file-a", "a.csv", lambda job: {"rows": 3})
+
+    assert (job.stage, job.stats) == (jobs.DONE, {"rows": 3})
+    assert store.get(job.id).stage == jobs.DONE
+    manager.shutdown()
+
+
+def test_run_is_cancelled_from_another_worker(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_SYNC_SECONDS", 0.01)
+    manager = JobManager(workers=1, store=store)
+    other = JobManager(workers=1, store=JobStore(str(tmp_path / "jobs.sqlite")))
+    started, finished = threading.Event(), []
+    runner = threading.Thread(target=lambda: finished.append(manager.run("file-a", "a.csv", _busy(started))))
+    runner.start()
+    assert started.wait(5)
+
+    assert other.cancel_file("file-a") == 1
+    runner.join(5)
+
+    assert finished[0].stage == jobs.CANCELLED
+    assert other.get(finished[0].id).stage == jobs.CANCELLED
+    manager.shutdown()
+    other.shutdown()
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from api import query_cache, registry
+from api.fingerprints import FileRegistry
+from api.query_cache import QueryCache
+
+
+class _Clock:
+    now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(query_cache, "time", clock)
+    return clock
+
+
+def _turned(angle):
+    # Unit vector ``angle`` radians away from [1, 0, 0].
+    return [np.cos(angle), np.sin(angle), 0.0]
+
+
+def test_exact_hits_ignore_case_spacing_and_punctuation():
+    cache = QueryCache()
+    cache.put("f1", "Total units by region?", [1.0, 0.0, 0.0], ["ctx"])
+
+    assert cache.get_exact("f1", "  total   UNITS by region ") == ["ctx"]
+    assert cache.get_exact("f1", "total units") is None
+    assert cache.get_exact("f2", "total units by region") is None
+    assert cache.stats()["exact_hits"] == 1
+
+
+def test_semantic_hits_need_the_threshold():
+    cache = QueryCache(threshold=0.95)
+    cache.put("f1", "total units by region", [1.0, 0.0, 0.0], ["ctx"])
+
+    assert cache.get_similar("f1", _turned(0.1)) == ["ctx"]
+    assert cache.get_similar("f1", _turned(0.5)) is None
+    assert cache.get_similar("f2", [1.0, 0.0, 0.0]) is None
+    stats = cache.stats()
+    assert (stats["semantic_hits"], stats["misses"]) == (1, 2)
+
+
+def test_semantic_lookup_returns_the_closest_entry():
+    cache = QueryCache(threshold=0.5)
+    cache.put("f1", "a", [1.0, 0.0, 0.0], ["a"])
+    cache.put("f1", "b", [0.0, 1.0, 0.0], ["b"])
+
+    assert cache.get_similar("f1", [0.2, 1.0, 0.0]) == ["b"]
+    assert cache.get_similar("f1", [2.0, 0.1, 0.0]) == ["a"]
+
+
+def test_least_recently_used_queries_are_evicted():
+    cache = QueryCache(max_entries=2)
+    cache.put("f1", "a", [1.0, 0.0, 0.0], ["a"])
+    cache.put("f1", "b", [0.0, 1.0, 0.0], ["b"])
+    cache.get_exact("f1", "a")
+
+    cache.put("f1", "c", [0.0, 0.0, 1.0], ["c"])
+
+    assert cache.get_exact("f1", "b") is None
+    assert cache.get_exact("f1", "a") == ["a"]
+    assert cache.get_similar("f1", [0.0, 1.0, 0.0]) is None
+
+
+def test_entries_expire(clock):
+    cache = QueryCache(ttl=60, threshold=0.9)
+    cache.put("f1", "a", [1.0, 0.0, 0.0], ["a"])
+
+    clock.now += 61
+
+    assert cache.get_similar("f1", [1.0, 0.0, 0.0]) is None
+    assert cache.get_exact("f1", "a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_invalidate_drops_only_that_file():
+    cache = QueryCache(max_files=2)
+    cache.put("f1", "a", [1.0, 0.0, 0.0], ["a"])
+    cache.put("f2", "a", [1.0, 0.0, 0.0], ["a"])
+
+    cache.invalidate("f1")
+
+    assert cache.get_exact("f1", "a") is None
+    assert cache.get_exact("f2", "a") == ["a"]
+    cache.put("f3", "a", [1.0, 0.0, 0.0], ["a"])
+    cache.put("f4", "a", [1.0, 0.0, 0.0], ["a"])
+    assert cache.stats()["files"] == 2
+
+
+def test_other_workers_drop_invalidated_files(tmp_path, monkeypatch):
+    cache = QueryCache()
+    monkeypatch.setattr(registry, "_query_cache", cache)
+    monkeypatch.setattr(registry, "_bm25_store", None)
+    monkeypatch.setattr(registry, "BM25_INDEX_DIR", "")
+    monkeypatch.setattr(registry, "_file_registry", FileRegistry(str(tmp_path / "files.sqlite")))
+    monkeypatch.setattr(registry, "_invalidation_seq", None)
+    registry.sync_invalidations()
+    cache.put("f1", "a", [1.0, 0.0, 0.0], ["a"])
+    cache.put("f2", "a", [1.0, 0.0, 0.0], ["a"])
+
+    # Announced by another worker: only picked up on the next sync.
+    registry.get_file_registry().log_invalidation("f1", "other-worker")
+    assert cache.get_exact("f1", "a") == ["a"]
+    registry.sync_invalidations()
+
+    assert cache.get_exact("f1", "a") is None
+    assert cache.get_exact("f2", "a") == ["a"]
@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from api.query_engine import answer_question, execute, parse_question
+
+COLUMNS = ["sku", "unit_price", "delta", "Region", "order date"]
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "sku": ["SKU-0042", "SKU-0043", "SKU-0042", "SKU-0044"],
+        "unit_price": [2.0, 3.0, 5.0, 7.0],
+        "delta": [-10, -3, 4, 8],
+        "Region": ["North", "South", "North", "West"],
+        "order date": ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"],
+    })
+
+
+@pytest.mark.parametrize("question, op, agg, column, group_by", [
+    ("How many rows in the dataset?", "count", None, None, None),
+    ("number of rows by region", "count", None, None, "Region"),
+    ("What's the average unit_price?", "agg", "mean", "unit_price", None),
+    ("total unit-price per Region", "agg", "sum", "unit_price", "Region"),
+    ("Maximum Unit Price", "agg", "max", "unit_price", None),
+    ("unique values of order date", "agg", "nunique", "order date", None),
+    ("how many columns", "n_columns", None, None, None),
+])
+def test_parse_keywords_and_columns(question, op, agg, column, group_by):
+    plan = parse_question(question, COLUMNS)
+    assert (plan.op, plan.agg, plan.column, plan.group_by) == (op, agg, column, group_by)
+
+
+@pytest.mark.parametrize("question, filters", [
+    ("how many rows where sku = 'SKU-0042'", [("sku", "==", "SKU-0042")]),
+    ("how many rows where sku is SKU-0042", [("sku", "==", "SKU-0042")]),
+    ("how many rows where delta < -5", [("delta", "<", "-5")]),
+    ('count rows where Region is "North West" and delta >= 0.5',
+     [("Region", "==", "North West"), ("delta", ">=", "0.5")]),
+    ("how many rows WHERE Region IS NOT 'West'", [("Region", "!=", "West")]),
+])
+def test_parse_keeps_filter_values(question, filters):
+    assert parse_question(question, COLUMNS).filters == filters
+
+
+@pytest.mark.parametrize("question", [
+    "why is the average unit price so high?",
+    "plot unit price by region",
+    "how many rows where sku sounds like 42",
+    "tell me a joke",
+])
+def test_parse_leaves_other_questions_to_the_agent(question):
+    assert parse_question(question, COLUMNS) is None
+
+
+def test_answer_filters_on_original_values(df):
+    assert answer_question(df, "how many rows where sku = 'SKU-0042'") == "**Number of rows**: 2"
+    assert answer_question(df, "how many rows where delta < -5") == "**Number of rows**: 1"
+    assert answer_question(df, "average unit price where sku is 'SKU-0042'") == "**Average of `unit_price`**: 3.5"
+
+
+def test_answer_falls_back_when_a_value_does_not_parse(df):
+    assert answer_question(df, "how many rows where delta > ten") is None
+
+
+def test_answer_falls_back_when_no_rows_match(df):
+    assert answer_question(df, "average unit price where sku is 'SKU-9999'") is None
+
+
+@pytest.fixture
+def compact_df(df):
+    # What api.frames.compact_frame makes of low-cardinality text.
+    return df.astype({"sku": "category", "Region": "category"})
+
+
+def test_groups_after_a_filter_only_cover_matching_rows(compact_df):
+    assert answer_question(compact_df, "number of rows by Region where sku = 'SKU-0042'") == (
+        "| Region   |   rows |\n|:---------|-------:|\n| North    |      2 |"
+    )
+    result = execute(compact_df, parse_question("total unit price by Region where delta > 0", COLUMNS))
+    assert result.to_dict() == {"North": 5.0, "West": 7.0}
+
+
+def test_top_groups_and_value_counts_skip_unobserved_categories(compact_df):
+    plan = parse_question("bottom 3 Region by total unit_price where delta > 0", COLUMNS)
+    assert execute(compact_df, plan).to_dict() == {"North": 5.0, "West": 7.0}
+    plan = parse_question("top 5 most common values of sku where delta > 0", COLUMNS)
+    assert execute(compact_df, plan).to_dict() == {"SKU-0042": 1, "SKU-0044": 1}
@@ -0,0 +1,145 @@
+import threading
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from api.vectorstores import LocalVectorStore, _Partition
+
+DIM = 8
+
+
+def _vectors(n, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+
+
+def _store(path, **kwargs):
+    return LocalVectorStore(DeterministicFakeEmbedding(size=DIM), str(path), **kwargs)
+
+
+def _add(store, vectors, file_id="f1"):
+    texts = [f"row {i}" for i in range(len(vectors))]
+    return store.add_embeddings(texts, vectors.tolist(), [{"file_id": file_id, "row": i} for i in range(len(vectors))])
+
+
+def _search(store, vector, k=3, file_id="f1", **filters):
+    return store.similarity_search_by_vector_with_score(vector.tolist(), k, {"file_id": file_id, **filters})
+
+
+def test_upsert_returns_ids_and_search_finds_nearest(tmp_path):
+    store = _store(tmp_path)
+    vectors = _vectors(50)
+    ids = _add(store, vectors)
+
+    assert ids[:2] == ["f1:0", "f1:1"] and len(ids) == 50
+    results = _search(store, vectors[7])
+    assert results[0][0].page_content == "row 7"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+
+def test_search_only_touches_the_filtered_partition(tmp_path):
+    store = _store(tmp_path)
+    vectors = _vectors(10)
+    _add(store, vectors, "f1")
+    _add(store, vectors, "f2")
+
+    assert {doc.metadata["file_id"] for doc, _ in _search(store, vectors[0], k=10, file_id="f2")} == {"f2"}
+    assert _search(store, vectors[0], k=2, file_id="f1", row=4)[0][0].metadata["row"] == 4
+
+
+def test_deleted_rows_are_skipped_and_persisted(tmp_path):
+    store = _store(tmp_path)
+    vectors = _vectors(5)
+    _add(store, vectors)
+
+    assert store.delete(ids=["f1:2", "f1:3", "f1:99", "nope"])
+    assert not store.delete(ids=["f1:2"])
+    rows = {doc.metadata["row"] for doc, _ in _search(store, vectors[2], k=10)}
+    assert rows == {0, 1, 4}
+
+    reopened = _store(tmp_path)
+    assert {doc.metadata["row"] for doc, _ in _search(reopened, vectors[2], k=10)} == {0, 1, 4}
+
+
+def test_delete_swaps_in_a_new_set(tmp_path):
+    partition = _Partition(str(tmp_path / "p"))
+    partition.append(_vectors(4), [{"page_content": str(i), "metadata": {}} for i in range(4)])
+    before = partition.deleted
+
+    partition.delete_rows([1])
+
+    assert before == frozenset() and partition.deleted == frozenset({1})
+
+
+def test_delete_by_file_id_removes_the_partition(tmp_path):
+    store = _store(tmp_path)
+    _add(store, _vectors(3))
+
+    assert store.delete(filter={"file_id": "f1"})
+    assert _search(store, _vectors(1)[0]) == []
+    with pytest.raises(ValueError):
+        store.delete(filter={})
+
+
+def test_ivf_index_is_built_on_upsert_and_used_for_search(tmp_path):
+    store = _store(tmp_path, ivf_min_size=200, nprobe=4)
+    vectors = _vectors(400)
+    _add(store, vectors)
+
+    partition = store._partition("f1")
+    assert partition.ivf_size == 400
+    assert _search(store, vectors[123], k=1)[0][0].metadata["row"] == 123
+
+    # Rows past the index are searched exactly until the next rebuild.
+    _add(store, _vectors(10, seed=1))
+    assert partition.ivf_size == 400
+    assert _search(store, _vectors(10, seed=1)[9], k=1)[0][0].metadata["row"] == 9
+
+
+def test_searches_do_not_wait_for_an_index_build(tmp_path, monkeypatch):
+    vectors = _vectors(300)
+    _add(_store(tmp_path), vectors)
+    store = _store(tmp_path, ivf_min_size=200)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_build(self, **kwargs):
+        started.set()
+        release.wait(5)
+
+    monkeypatch.setattr(_Partition, "build_ivf", slow_build)
+    try:
+        assert _search(store, vectors[42], k=1)[0][0].metadata["row"] == 42
+        assert started.wait(5)
+        done = []
+        searcher = threading.Thread(target=lambda: done.append(_search(store, vectors[5], k=1)))
+        searcher.start()
+        searcher.join(2)
+        assert done and done[0][0][0].metadata["row"] == 5
+    finally:
+        release.set()
+
+
+def test_concurrent_search_and_delete(tmp_path):
+    store = _store(tmp_path)
+    vectors = _vectors(2000)
+    _add(store, vectors)
+    errors = []
+
+    def search():
+        try:
+            for i in range(200):
+                _search(store, vectors[i], k=5)
+        except Exception as e:
+            errors.append(e)
+
+    searchers = [threading.Thread(target=search) for _ in range(4)]
+    for thread in searchers:
+        thread.start()
+    for row in range(0, 2000, 2):
+        store.delete(ids=[f"f1:{row}"])
+    for thread in searchers:
+        thread.join()
+
+    assert errors == []
+    assert all(doc.metadata["row"] % 2 for doc, _ in _search(store, vectors[10], k=20))